@@ -0,0 +1,194 @@
+import operator
+
+import numpy as np
+import pandas as pd
+
+from sheet_configs import CARTOGRAPHIE_SHEETS
+
+INSTALLED_COL = "Quantité SE installée"
+AVAILABLE_COL = "Sous-ensemble relais disponible (révisé)"
+AWAITING_COL = "Sous-ensemble en attente révision"
+IN_PROGRESS_COL = "Sous-ensemble encours de révision"
+REVISABLE_COL = "Corps de Sous-ensembles disponibles (révisable)"
+CRITICITY_COL = "Criticité"
+
+# Most severe first; alert tables are sorted in this order
+SEVERITIES = ["critical", "warning", "info"]
+
+# Minimum relais to keep in stock per Criticité
+CRITICITY_MIN_AVAILABLE = {"AA": 2, "A": 1}
+
+# Alert rules, evaluated on every Cartographie sheet unless "sheets" says
+# otherwise. Each condition compares a column, or the ratio of two columns,
+# with a value ("value") or with another column ("other"); a rule fires on
+# the rows where all its conditions hold. Messages are formatted with the
+# row's columns.
+ALERT_RULES = [
+    {
+        "name": "no-relais",
+        "severity": "critical",
+        "conditions": [
+            {"column": AVAILABLE_COL, "op": "==", "value": 0},
+            {"column": AWAITING_COL, "op": ">", "value": 0}
+        ],
+        "message": "Critical: {Equipement} - {Sous-ensemble} has 0 available and {" + AWAITING_COL
+                   + ":g} awaiting revision."
+    },
+    *[
+        {
+            "name": f"relais-below-minimum-{criticity}",
+            "severity": "warning",
+            "conditions": [
+                {"column": CRITICITY_COL, "op": "==", "value": criticity},
+                {"column": AVAILABLE_COL, "op": "<", "value": minimum}
+            ],
+            "message": "{Equipement} - {Sous-ensemble} (criticité " + criticity + ") has {" + AVAILABLE_COL
+                       + ":g} relais available, minimum is " + str(minimum) + "."
+        }
+        for criticity, minimum in CRITICITY_MIN_AVAILABLE.items()
+    ],
+    {
+        "name": "low-coverage",
+        "severity": "warning",
+        "conditions": [
+            {"column": CRITICITY_COL, "op": "in", "value": ["AA", "A"]},
+            {"ratio": [AVAILABLE_COL, INSTALLED_COL], "op": "<", "value": 0.25}
+        ],
+        "message": "{Equipement} - {Sous-ensemble}: {" + AVAILABLE_COL + ":g} relais for {" + INSTALLED_COL
+                   + ":g} installed (below 25% coverage)."
+    },
+    {
+        "name": "revision-backlog",
+        "severity": "warning",
+        "conditions": [
+            {"column": AWAITING_COL, "op": ">", "value": 0},
+            {"column": AWAITING_COL, "op": ">=", "other": INSTALLED_COL}
+        ],
+        "message": "{Equipement} - {Sous-ensemble}: {" + AWAITING_COL + ":g} awaiting revision for {"
+                   + INSTALLED_COL + ":g} installed."
+    },
+    {
+        "name": "stale-revision",
+        "severity": "info",
+        "conditions": [
+            {"column": AWAITING_COL, "op": ">", "value": 0},
+            {"column": IN_PROGRESS_COL, "op": "==", "value": 0}
+        ],
+        "message": "{Equipement} - {Sous-ensemble}: {" + AWAITING_COL
+                   + ":g} awaiting revision, none in progress."
+    }
+]
+
+ALERT_COLUMNS = ["severity", "sheet", "row", "Equipement", "Sous-ensemble", CRITICITY_COL, "rule", "message"]
+
+_OPERATORS = {"==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+              ">": operator.gt, ">=": operator.ge}
+
+
+def _operand(condition, arrays):
+    if "ratio" in condition:
+        numerator, denominator = (arrays[col] for col in condition["ratio"])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # No denominator means no coverage to measure: the row never matches
+            return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), np.nan)
+    return arrays[condition["column"]]
+
+
+def compile_condition(condition):
+    # Turns a condition dict into a function of the column arrays returning
+    # a boolean mask
+    op = condition["op"]
+    if op == "in":
+        values = list(condition["value"])
+        return lambda arrays: np.isin(_operand(condition, arrays), values)
+    if op not in _OPERATORS:
+        raise ValueError(f"Unknown operator {op!r} in alert condition {condition}")
+    compare = _OPERATORS[op]
+    if "other" in condition:
+        other = condition["other"]
+        return lambda arrays: compare(_operand(condition, arrays), arrays[other])
+    value = condition["value"]
+    return lambda arrays: compare(_operand(condition, arrays), value)
+
+
+def condition_columns(condition):
+    columns = list(condition.get("ratio", [])) or [condition["column"]]
+    if "other" in condition:
+        columns.append(condition["other"])
+    return columns
+
+
+class AlertRule:
+    # A rule compiled once: its conditions become mask functions that are
+    # and-ed over whole column arrays
+
+    def __init__(self, rule):
+        if rule["severity"] not in SEVERITIES:
+            raise ValueError(f"Unknown severity {rule['severity']!r} in alert rule {rule['name']}")
+        self.name = rule["name"]
+        self.severity = rule["severity"]
+        self.sheets = rule.get("sheets", CARTOGRAPHIE_SHEETS)
+        self.message = rule["message"]
+        self.conditions = [compile_condition(condition) for condition in rule["conditions"]]
+        self.columns = {col for condition in rule["conditions"] for col in condition_columns(condition)}
+
+    def mask(self, arrays, sheet_mask):
+        mask = sheet_mask.copy()
+        with np.errstate(invalid="ignore"):
+            for condition in self.conditions:
+                mask &= condition(arrays)
+        return mask
+
+
+class AlertEngine:
+    # Evaluates every rule over the Cartographie sheets stacked into one set
+    # of column arrays, so the cost per rule is a few array comparisons over
+    # the whole fleet
+
+    def __init__(self, rules=ALERT_RULES):
+        self.rules = [AlertRule(rule) for rule in rules]
+        self.columns = set().union(*(rule.columns for rule in self.rules))
+
+    def evaluate(self, frames, sheets=CARTOGRAPHIE_SHEETS):
+        # One alert per (row, rule), most severe first, then in sheet order
+        parts = []
+        for sheet_name in sheets:
+            df = frames.get(sheet_name)
+            if df is not None and not df.empty:
+                columns = dict.fromkeys(["Equipement", "Sous-ensemble", CRITICITY_COL, *sorted(self.columns)])
+                part = df.reindex(columns=list(columns))
+                part.insert(0, "sheet", sheet_name)
+                part.insert(1, "row", df.index.to_numpy())
+                parts.append(part)
+        if not parts:
+            return pd.DataFrame(columns=ALERT_COLUMNS)
+        table = pd.concat(parts, ignore_index=True)
+        arrays = {col: table[col].to_numpy(dtype=float) if pd.api.types.is_numeric_dtype(table[col])
+                  else table[col].to_numpy(dtype=object) for col in self.columns}
+        sheet_codes, sheet_names = pd.factorize(table["sheet"])
+
+        hits, rule_ids = [], []
+        for rule_id, rule in enumerate(self.rules):
+            sheet_mask = np.isin(sheet_codes, [i for i, name in enumerate(sheet_names) if name in rule.sheets])
+            rows = np.flatnonzero(rule.mask(arrays, sheet_mask))
+            hits.append(rows)
+            rule_ids.append(np.full(len(rows), rule_id))
+        hits = np.concatenate(hits)
+        rule_ids = np.concatenate(rule_ids)
+
+        # Only the rows that fired are formatted
+        records = table.iloc[hits].to_dict("records")
+        alerts = pd.DataFrame({
+            "severity": pd.Categorical([self.rules[i].severity for i in rule_ids], categories=SEVERITIES,
+                                       ordered=True),
+            "sheet": table["sheet"].to_numpy()[hits],
+            "row": table["row"].to_numpy()[hits],
+            "Equipement": table["Equipement"].to_numpy()[hits],
+            "Sous-ensemble": table["Sous-ensemble"].to_numpy()[hits],
+            CRITICITY_COL: table[CRITICITY_COL].to_numpy()[hits],
+            "rule": [self.rules[i].name for i in rule_ids],
+            "message": [self.rules[i].message.format_map(record) for i, record in zip(rule_ids, records)],
+            "_order": hits,
+        })
+        alerts = alerts.sort_values(["severity", "_order"], kind="stable")
+        return alerts.drop(columns="_order").reset_index(drop=True)
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from alerts import AVAILABLE_COL, AWAITING_COL, IN_PROGRESS_COL, INSTALLED_COL, REVISABLE_COL
+from sheet_index import EQUIPMENT_COLUMNS, SOUS_ENSEMBLE_COLUMNS, find_column
+
+ATELIER_COL = "Atelier"
+STOCK_COLUMNS = [INSTALLED_COL, AVAILABLE_COL, AWAITING_COL, IN_PROGRESS_COL, REVISABLE_COL]
+
+
+def join_keys(df):
+    # (Equipement, Sous-ensemble) of every row as one string, with case and
+    # runs of whitespace ignored since the two workbooks are typed separately
+    equipment_col = find_column(df.columns, EQUIPMENT_COLUMNS)
+    sous_ensemble_col = find_column(df.columns, SOUS_ENSEMBLE_COLUMNS)
+    if equipment_col is None or sous_ensemble_col is None:
+        return None
+
+    def normalize(values):
+        return values.astype("string").str.split().str.join(" ").str.casefold()
+    return normalize(df[equipment_col]) + "\x1f" + normalize(df[sous_ensemble_col])
+
+
+class AtelierIndex:
+    # Hash index from (Equipement, Sous-ensemble) to the workshop sheet that
+    # lists it, built once from the atelier workbook; when a pair appears in
+    # two workshops the first sheet wins
+
+    def __init__(self, frames):
+        self.ateliers = {}
+        for sheet_name, df in frames.items():
+            keys = join_keys(df)
+            if keys is None:
+                continue
+            for key in keys.dropna().unique():
+                self.ateliers.setdefault(key, sheet_name)
+
+    def lookup(self, df):
+        # Atelier of every row of df, NaN when no workshop lists it
+        keys = join_keys(df)
+        if keys is None:
+            return pd.Series(pd.NA, index=df.index, dtype=object)
+        return keys.map(self.ateliers).astype(object)
+
+
+def attach_ateliers(df, index):
+    df[ATELIER_COL] = index.lookup(df).to_numpy()
+    return df
+
+
+def atelier_stock(df):
+    # Stock columns summed per workshop
+    if ATELIER_COL not in df.columns:
+        return pd.DataFrame(columns=STOCK_COLUMNS)
+    columns = [col for col in STOCK_COLUMNS if col in df.columns]
+    return df.groupby(ATELIER_COL)[columns].sum()
@@ -0,0 +1,230 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from alerts import AlertEngine
+from budget import BudgetRollup
+from compaction import memory_report, set_value
+from dashboard_stats import FleetAlerts, SheetStats
+from filtering import filter_mask
+from generate_workbook import generate_workbook
+from ingestion import cell_coordinates, load_workbook
+from sheet_configs import SHEET_CONFIGS
+from sheet_index import SheetIndex
+from writeback import merge_cells
+
+try:
+    from table_models import DataFrameModel
+except ImportError:
+    # The equipment table model needs PyQt6; the engine steps do not
+    DataFrameModel = None
+
+# End-to-end timings of the app's hot paths on synthetic workbooks:
+#   python benchmarks/bench_app.py --rows 1000 10000 100000 --out bench.json
+#   python benchmarks/bench_app.py --rows 1000 --compare bench.json
+# Every step runs once for its time, then once more under tracemalloc for
+# its peak memory (tracemalloc slows the code it traces). The saves edit
+# copies: each pass gets fresh frames and a fresh copy of the workbook, so
+# neither pass sees the other's edits and the generated workbook is kept.
+DEFAULT_ROWS = [1_000, 10_000, 100_000]
+SAVE_SHEET = "Cartographie transmission"
+SAVE_EDITS = 20
+
+
+def filter_step(frames):
+    # What update_equipment_table does for each sheet: the section and
+    # filter column set to their first value
+    masks = {}
+    for sheet_name, df in frames.items():
+        if df.empty:
+            continue
+        filters = {}
+        if "Section" in df.columns:
+            filters["Section"] = df["Section"].dropna().iloc[0] if df["Section"].notna().any() else None
+        filter_col = SHEET_CONFIGS[sheet_name].get("filter_col")
+        if filter_col and df[filter_col].notna().any():
+            filters[filter_col] = df[filter_col].dropna().iloc[0]
+        masks[sheet_name] = filter_mask(df, filters)
+    return masks
+
+
+def table_step(frames, masks):
+    for sheet_name, mask in masks.items():
+        model = DataFrameModel()
+        model.set_frame(frames[sheet_name], list(frames[sheet_name].columns))
+        model.set_mask(mask)
+
+
+def dashboard_step(frames, indexes):
+    # What the dashboard does: the fleet alerts once the workbook is loaded,
+    # then the statistics of each sheet the first time it is shown
+    budget = BudgetRollup(frames)
+    alerts = FleetAlerts(frames, AlertEngine())
+    alerts.refresh()
+    alerts.items()
+    stats = {}
+    for sheet_name, df in frames.items():
+        if df.empty:
+            continue
+        stats[sheet_name] = SheetStats(sheet_name, df, indexes[sheet_name], budget, alerts)
+        stats[sheet_name].summary()
+    return stats
+
+
+def edit_step(frames, indexes, stats, rows):
+    # save_data on the frames: look the row up, write the cell, update the
+    # dashboard aggregates; returns the workbook edits it queues
+    df = frames[SAVE_SHEET]
+    index = indexes[SAVE_SHEET]
+    col = SHEET_CONFIGS[SAVE_SHEET]["numeric_cols"][2]
+    edits = []
+    for row in rows:
+        row = index.lookup(df.at[row, index.equipment_col], df.at[row, index.sous_ensemble_col])
+        old = df.at[row, col]
+        set_value(df, row, col, old + 1)
+        stats[SAVE_SHEET].apply_edit(row, col, old)
+        edits.append((SAVE_SHEET, *cell_coordinates(df, row, col), old, old + 1))
+    return edits
+
+
+def measure(func, memory, prepare=None):
+    # prepare, run untimed before each pass, returns func's arguments
+    args = prepare() if prepare else ()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    peak_mb = None
+    if memory:
+        args = prepare() if prepare else ()
+        tracemalloc.start()
+        try:
+            func(*args)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak_mb
+
+
+def copy_frames(frames):
+    return {sheet_name: df.copy() for sheet_name, df in frames.items()}
+
+
+def copy_workbook(path, directory):
+    # A fresh copy per pass, named like the workbook
+    target = os.path.join(directory, f"{time.perf_counter_ns()}_{os.path.basename(path)}")
+    shutil.copy(path, target)
+    return target
+
+
+def bench_workbook(path, rows, memory=True):
+    results = []
+
+    def step(name, func, prepare=None):
+        result, seconds, peak_mb = measure(func, memory, prepare)
+        results.append({"rows": rows, "step": name, "seconds": round(seconds, 5),
+                        "peak_mb": None if peak_mb is None else round(peak_mb, 2)})
+        print(f"{rows:>9} {name:<22} {seconds:9.3f} s" + ("" if peak_mb is None else f" {peak_mb:9.1f} MB"))
+        return result
+
+    frames = step("load", lambda: load_workbook(path, SHEET_CONFIGS, use_cache=False))
+    # Memory the loaded sheets hold, and what compaction saves on them
+    report = memory_report(frames)
+    frames_mb, saved_mb = float(report["MB"].sum()), float(report["saved MB"].sum())
+    results[-1].update(frames_mb=round(frames_mb, 2), saved_mb=round(saved_mb, 2))
+    print(f"{rows:>9} {'frames in memory':<22} {frames_mb:9.1f} MB ({saved_mb:.1f} MB saved by compaction)")
+    load_workbook(path, SHEET_CONFIGS)
+    step("load (cached)", lambda: load_workbook(path, SHEET_CONFIGS))
+    indexes = step("index", lambda: {sheet_name: SheetIndex(df) for sheet_name, df in frames.items() if not df.empty})
+    masks = step("filter", lambda: filter_step(frames))
+    if DataFrameModel is not None:
+        step("equipment table", lambda: table_step(frames, masks))
+    step("dashboard", lambda: dashboard_step(frames, indexes))
+    edit_rows = np.random.default_rng(0).choice(frames[SAVE_SHEET].index, SAVE_EDITS)
+
+    def fresh_frames():
+        copies = copy_frames(frames)
+        return copies, indexes, dashboard_step(copies, indexes), edit_rows
+    edits = step("save (frames)", edit_step, fresh_frames)
+    with tempfile.TemporaryDirectory() as directory:
+        step("save (workbook)", merge_cells, lambda: (copy_workbook(path, directory), edits))
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "-C", REPO, "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "openpyxl": openpyxl.__version__,
+    }
+
+
+def compare(results, baseline_path):
+    # Time ratio of every step against a previous run, slowest first
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["rows"], r["step"]): r for r in json.load(f)["results"]}
+    ratios = []
+    for result in results:
+        before = baseline.get((result["rows"], result["step"]))
+        if before and before["seconds"]:
+            ratios.append((result["seconds"] / before["seconds"], result, before))
+    print(f"\nAgainst {baseline_path}:")
+    for ratio, result, before in sorted(ratios, key=lambda item: -item[0]):
+        flag = "  <-- slower" if ratio > 1.2 else ""
+        print(f"{result['rows']:>9} {result['step']:<22} {before['seconds']:9.3f} s -> {result['seconds']:9.3f} s"
+              f" ({ratio:.2f}x){flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time loading, filtering, saving and the dashboard "
+                                                 "on synthetic ENGINS workbooks.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS,
+                        help="workbook sizes in data rows (default: 1000 10000 100000; up to 1000000)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "engins_bench"),
+                        help="where the generated workbooks are kept between runs")
+    parser.add_argument("--out", default="bench_results.json", help="JSON results file")
+    parser.add_argument("--compare", help="previous JSON results to compare with")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    results = []
+    for rows in args.rows:
+        path = os.path.join(args.workdir, f"engins_{rows}.xlsx")
+        if not os.path.exists(path):
+            print(f"Generating {path}...")
+            generate_workbook(path, rows)
+        results.extend(bench_workbook(path, rows, memory=not args.no_memory))
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=1)
+    print(f"Wrote {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
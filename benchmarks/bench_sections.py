@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingestion import tag_sections
+
+ROWS = 100_000
+MARKERS = ["BG", "YSF"]
+
+
+def make_sheet(rows, seed=0):
+    # Cartographie-like body: a BG/YSF marker row every ~200 rows
+    rng = np.random.default_rng(seed)
+    equipment = rng.choice(["Bull D11T", "Bull D9R", "Chargeuse 994F", "Niveleuse 16M"], rows).astype(object)
+    equipment[::200] = np.where(np.arange(len(equipment[::200])) % 2 == 0, "BG", "YSF")
+    return pd.DataFrame({
+        "Equipement": equipment,
+        "Sous-ensemble": rng.choice(["Moteur thermique", "Boite de vitesse", "Track CD"], rows),
+        "Sous-ensemble en attente révision": rng.integers(0, 5, rows),
+    })
+
+
+def legacy_sections(df):
+    # Row loop previously used by preprocess_sheet
+    df = df.copy()
+    df['Section'] = pd.NA
+    current_section = None
+    for idx, row in df.iterrows():
+        if row['Equipement'] in MARKERS:
+            current_section = row['Equipement']
+        else:
+            df.at[idx, 'Section'] = current_section
+    return df[~df['Equipement'].isin(MARKERS)]
+
+
+def vectorized_sections(df):
+    df = df.copy()
+    df['Section'] = tag_sections(df, 0, MARKERS)
+    return df[~df['Equipement'].isin(MARKERS)]
+
+
+def timed(func, df):
+    start = time.perf_counter()
+    result = func(df)
+    return result, time.perf_counter() - start
+
+
+def main(rows=ROWS):
+    df = make_sheet(rows)
+    legacy, legacy_time = timed(legacy_sections, df)
+    vectorized, vectorized_time = timed(vectorized_sections, df)
+    assert (legacy['Section'].astype(object).to_numpy() == vectorized['Section'].astype(object).to_numpy()).all()
+    print(f"rows: {rows}")
+    print(f"iterrows loop: {legacy_time:.3f} s")
+    print(f"vectorized:    {vectorized_time:.4f} s")
+    print(f"speedup:       {legacy_time / vectorized_time:.0f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
@@ -0,0 +1,56 @@
+import argparse
+import math
+import os
+import shutil
+import sys
+import tempfile
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from ingestion import load_workbook
+from sheet_configs import SHEET_CONFIGS
+from writeback import write_cells
+
+# Load -> save -> reload check of a workbook: the app's save (openpyxl)
+# drops the cached results of the formulas, so the totals of every numeric
+# column (Cout V2/V3, Cout V1/[V2], PERFORMANCE...) must come back the same
+# after it. Works on a copy; exits with 1 when a total differs.
+#   python benchmarks/check_roundtrip.py ENGINS.xlsx
+
+
+def column_totals(frames):
+    totals = {}
+    for sheet_name, df in frames.items():
+        for col in SHEET_CONFIGS[sheet_name]["numeric_cols"]:
+            if col in df.columns:
+                totals[(sheet_name, col)] = float(df[col].sum())
+    return totals
+
+
+def check_roundtrip(path):
+    # Returns the (sheet, column, before, after) totals that differ
+    before = column_totals(load_workbook(path, SHEET_CONFIGS, use_cache=False))
+    with tempfile.TemporaryDirectory() as directory:
+        copy = shutil.copy(path, os.path.join(directory, os.path.basename(path)))
+        # No edits: the workbook is only loaded and saved, as every save does
+        write_cells(copy, [])
+        after = column_totals(load_workbook(copy, SHEET_CONFIGS, use_cache=False))
+    return [(sheet_name, col, total, after.get((sheet_name, col), math.nan))
+            for (sheet_name, col), total in before.items()
+            if not math.isclose(total, after.get((sheet_name, col), math.nan), rel_tol=1e-9, abs_tol=1e-6)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that saving a workbook keeps its column totals.")
+    parser.add_argument("workbook", nargs="?", default=os.path.join(REPO, "ENGINS.xlsx"))
+    args = parser.parse_args(argv)
+    differences = check_roundtrip(args.workbook)
+    for sheet_name, col, before, after in differences:
+        print(f"{sheet_name:<28} {col:<28} {before:>18,.2f} -> {after:>18,.2f}")
+    print(f"{len(differences)} total(s) changed by a save of {args.workbook}")
+    sys.exit(1 if differences else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import argparse
+import datetime
+import os
+import sys
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from performance import CHANGE_SLOTS
+from sheet_configs import SHEET_CONFIGS
+
+# Synthetic ENGINS.xlsx of any size, laid out like the real workbook: the
+# Park and Cartographie sheets start one column right of a marker column
+# holding BG/YSF at each section start, the Programme sheets have title and
+# total rows above their headers, and the Performances sheets carry the wide
+# six-change history. Costs and PERFORMANCE are formulas, as in the real
+# workbook; openpyxl writes them without results, so loads go through the
+# recalculation of formulas.py like a workbook the app has saved.
+
+# Share of the rows given to each sheet, close to the real workbook
+SHEET_SHARES = {
+    "Park engin": 0.08,
+    "Cartographie moteur": 0.02,
+    "Cartographie transmission": 0.20,
+    "Cartographie Engin": 0.03,
+    "Performances BG": 0.40,
+    "Programme 2025 BG": 0.12,
+    "Performances YSF": 0.10,
+    "Programme 2025 YSF": 0.05,
+}
+# Rows of a section before the marker switches between BG and YSF
+SECTION_ROWS = 250
+
+EQUIPMENTS = ["Bull D11T", "Bull D9R", "Chargeuse 994F", "Niveleuse 16M", "Camion 785C", "Pelle 6060"]
+SOUS_ENSEMBLES = ["Moteur thermique", "Boite de vitesse", "Convertisseur", "Turbocompresseur",
+                  "Réducteur final", "Track CD", "Track CG", "Pompe à Eau principale", "Vérin de levage"]
+CRITICITIES = ["AA", "A", "B", "C", None]
+SITUATIONS = ["En service", "En panne", "Hors Service (Parc Point T)"]
+SECTIONS = ["MSE", "MTR", "ATE"]
+
+
+MODELS = [name.split()[-1] for name in EQUIPMENTS]
+
+
+def machines(rng, rows):
+    # Machine numbers such as "D11T4", typed like the Performances sheets
+    return np.char.add(rng.choice(MODELS, rows), rng.integers(1, 12, rows).astype(str))
+
+
+def with_markers(rows, values):
+    # Prepends the marker column: BG or YSF on the first row of each section
+    for i, row in enumerate(values):
+        marker = ("BG", "YSF")[(i // SECTION_ROWS) % 2] if i % SECTION_ROWS == 0 else None
+        yield [marker, *row]
+
+
+def park_rows(rng, rows):
+    equipment = rng.choice(EQUIPMENTS, rows)
+    series = rng.integers(10_000, 99_999, rows)
+    days = rng.integers(0, 8000, rows)
+    situation = rng.choice(SITUATIONS, rows)
+    start = datetime.datetime(2000, 1, 1)
+    values = ([equipment[i], f"C{series[i]}", start + datetime.timedelta(days=int(days[i])), equipment[i].split()[-1],
+               f"CAT0{series[i]}", situation[i]] for i in range(rows))
+    return [None, *SHEET_CONFIGS["Park engin"]["headers"]], with_markers(rows, values)
+
+
+def cartographie_rows(rng, rows, sheet_name):
+    equipment = rng.choice(EQUIPMENTS, rows)
+    sous_ensemble = rng.choice(SOUS_ENSEMBLES, rows)
+    criticity = rng.choice(np.array(CRITICITIES, dtype=object), rows)
+    stock = rng.integers(0, 8, (rows, 5))
+    values = ([equipment[i], sous_ensemble[i], criticity[i], *stock[i].tolist()] for i in range(rows))
+    return [None, *SHEET_CONFIGS[sheet_name]["headers"]], with_markers(rows, values)
+
+
+def performance_rows(rng, rows, sheet_name):
+    # Changes every 8-15k hours from a random start; dates are datetimes or
+    # "dd/mm/yyyy" strings, and later slots are left empty
+    equipment = machines(rng, rows)
+    sous_ensemble = rng.choice(SOUS_ENSEMBLES, rows)
+    changes = rng.integers(0, CHANGE_SLOTS + 1, rows)
+    first_counter = rng.integers(1_000, 30_000, rows)
+    lives = rng.integers(8_000, 15_000, (rows, CHANGE_SLOTS))
+    first_day = rng.integers(0, 2000, rows)
+    as_text = rng.random((rows, CHANGE_SLOTS)) < 0.3
+    start = datetime.datetime(2012, 1, 1)
+
+    def values():
+        for i in range(rows):
+            row = [str(equipment[i]), sous_ensemble[i]]
+            counter, day, last = int(first_counter[i]), int(first_day[i]), None
+            for k in range(CHANGE_SLOTS):
+                if k < changes[i]:
+                    date = start + datetime.timedelta(days=day)
+                    row += [date.strftime("%d/%m/%Y") if as_text[i, k] else date, f"G-OT-{1_000_000 + i * 7 + k}",
+                            counter]
+                    last = counter
+                    counter += int(lives[i, k])
+                    day += int(lives[i, k]) // 20
+                else:
+                    row += [None, None, None]
+            # Current counter half way through the running life, PERFORMANCE
+            # the hours run since the last change
+            current = None if last is None else last + int(lives[i, -1]) // 2
+            # Below the header row; the counter of change k (from 1) is column 2 + 3k
+            excel_row = i + 2
+            last_column = get_column_letter(2 + 3 * int(changes[i]))
+            current_column = get_column_letter(3 + 3 * CHANGE_SLOTS)
+            row += [current, None if last is None else f"={current_column}{excel_row}-{last_column}{excel_row}"]
+            yield row
+    return list(SHEET_CONFIGS[sheet_name]["headers"]), values()
+
+
+def programme_bg_rows(rng, rows):
+    headers = SHEET_CONFIGS["Programme 2025 BG"]["headers"]
+    quantities = rng.integers(0, 4, (rows, 3))
+    price = rng.integers(5_000, 900_000, rows) + 0.95
+    equipment = rng.choice(EQUIPMENTS, rows)
+    machine = machines(rng, rows)
+    sous_ensemble = rng.choice(SOUS_ENSEMBLES, rows)
+    section = rng.choice(SECTIONS, rows)
+    # First data row, below the title, the two total rows and the headers
+    first = 5
+
+    def values():
+        yield ["PROGRAMME PREVISIONNEL DE REVISION DES S/E 2025-BG"] + [None] * 8 + ["DATE : 11/02/2025", None]
+        yield [None] * 9 + ["Montant total v2", f"=SUM(H{first}:H{first + rows - 1})"]
+        yield [None] * 9 + ["Montant total v3", f"=SUM(I{first}:I{first + rows - 1})"]
+        yield headers
+        for i in range(rows):
+            r = first + i
+            yield [equipment[i].split()[0], str(machine[i]), sous_ensemble[i], *quantities[i].tolist(),
+                   float(price[i]), f"=G{r}*E{r}", f"=G{r}*F{r}", None, section[i]]
+    return None, values()
+
+
+def programme_ysf_rows(rng, rows):
+    headers = SHEET_CONFIGS["Programme 2025 YSF"]["headers"]
+    quantities = rng.integers(0, 3, (rows, 2))
+    price = rng.integers(5_000, 900_000, rows) + 0.38
+    threshold = rng.integers(10_000, 30_000, rows)
+    hours = rng.integers(0, 30_000, rows)
+    equipment = rng.choice(EQUIPMENTS, rows)
+    machine = machines(rng, rows)
+    sous_ensemble = rng.choice(SOUS_ENSEMBLES, rows)
+    section = rng.choice(SECTIONS, rows)
+
+    def values():
+        yield ["PROGRAMME PREVISIONNEL DE REVISION DES SE 2025-YFIA"] + [None] * 10 + ["DATE : 09/04/2024"]
+        yield [None] * 11 + ["Montant total v1 en HD"]
+        yield [None] * 11 + ["Montant total v2 en HD"]
+        yield headers
+        for i in range(rows):
+            r = 5 + i
+            yield [equipment[i].split()[0], str(machine[i]), f"REP{i}", sous_ensemble[i], int(threshold[i]),
+                   int(hours[i]), float(price[i]), int(quantities[i, 0]), f"=G{r}*H{r}",
+                   int(quantities[i, 1]), f"=G{r}*J{r}", None, section[i]]
+    return None, values()
+
+
+def sheet_rows(rng, sheet_name, rows):
+    # (header row, row iterator); a None header row means the iterator
+    # yields the rows above the headers and the headers itself
+    if sheet_name == "Park engin":
+        return park_rows(rng, rows)
+    if sheet_name.startswith("Cartographie"):
+        return cartographie_rows(rng, rows, sheet_name)
+    if sheet_name.startswith("Performances"):
+        return performance_rows(rng, rows, sheet_name)
+    if sheet_name == "Programme 2025 BG":
+        return programme_bg_rows(rng, rows)
+    return programme_ysf_rows(rng, rows)
+
+
+def generate_workbook(path, rows, seed=0):
+    # Writes a workbook of about `rows` data rows over every sheet of
+    # SHEET_CONFIGS; streamed, so memory stays flat up to 1M rows
+    rng = np.random.default_rng(seed)
+    wb = Workbook(write_only=True)
+    for sheet_name in SHEET_CONFIGS:
+        ws = wb.create_sheet(sheet_name)
+        headers, values = sheet_rows(rng, sheet_name, max(1, int(rows * SHEET_SHARES[sheet_name])))
+        if headers is not None:
+            ws.append(headers)
+        for row in values:
+            ws.append(row)
+    wb.save(path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic ENGINS workbook.")
+    parser.add_argument("rows", type=int, help="data rows over all sheets, e.g. 1000 to 1000000")
+    parser.add_argument("--out", default=None, help="workbook path (default: engins_<rows>.xlsx)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    print(generate_workbook(args.out or f"engins_{args.rows}.xlsx", args.rows, args.seed))
+
+
+if __name__ == "__main__":
+    main()
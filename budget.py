@@ -0,0 +1,93 @@
+import pandas as pd
+
+# How each Programme 2025 layout maps onto the budget table: the columns
+# holding the shared keys and, per version, its quantity and cost columns.
+# A version without a cost column is priced at quantity x unit quote.
+BUDGET_LAYOUTS = {
+    "Programme 2025 BG": {
+        "programme": "BG",
+        "keys": {"Type d'engin": "Type d'engin", "Equipement": "Equipement", "REP": None,
+                 "Sous-ensemble": "Sous-ensemble", "SECTION AFFECTATION": "SECTION AFFECTATION"},
+        "versions": {"V1": ("Qte v1", None), "V2": ("Qte v2", "Cout V2"), "V3": ("Qte v3", "Cout V3")}
+    },
+    "Programme 2025 YSF": {
+        "programme": "YSF",
+        "keys": {"Type d'engin": "Equipement", "Equipement": "Engin", "REP": "REP",
+                 "Sous-ensemble": "Sous ensemble", "SECTION AFFECTATION": "SECTION AFFECTATION"},
+        "versions": {"V1": ("Qte [V1]", "Cout V1"), "V2": ("Qte [V2]", "Cout [V2]")}
+    }
+}
+UNIT_QUOTE_COL = "Devis unitaire"
+KEY_COLUMNS = ["Type d'engin", "Equipement", "REP", "Sous-ensemble", "SECTION AFFECTATION"]
+# Blank keys are grouped under this label instead of being dropped
+MISSING_KEY = "(none)"
+BUDGET_GROUPS = ["SECTION AFFECTATION", "Type d'engin", "Equipement", "Sous-ensemble"]
+
+
+def budget_table(frames):
+    # Long table with one row per (sheet row, version): Programme, Version,
+    # the shared keys, Quantité, Devis unitaire, Cout and the source row label
+    parts = []
+    for sheet_name, layout in BUDGET_LAYOUTS.items():
+        df = frames.get(sheet_name)
+        if df is None or df.empty:
+            continue
+        keys = {}
+        for key, col in layout["keys"].items():
+            values = df[col] if col in df.columns else pd.Series(pd.NA, index=df.index, dtype=object)
+            # Sheet cells carry stray spaces ("Réducteur D  ")
+            keys[key] = values.astype("string").str.split().str.join(" ").fillna(MISSING_KEY).to_numpy()
+        quote = pd.to_numeric(df[UNIT_QUOTE_COL], errors="coerce").fillna(0).to_numpy(dtype=float)
+        for version, (qty_col, cost_col) in layout["versions"].items():
+            qty = pd.to_numeric(df[qty_col], errors="coerce").fillna(0).to_numpy(dtype=float)
+            cost = qty * quote if cost_col is None else \
+                pd.to_numeric(df[cost_col], errors="coerce").fillna(0).to_numpy(dtype=float)
+            parts.append(pd.DataFrame({"Programme": layout["programme"], "Version": version, **keys,
+                                       "Quantité": qty, UNIT_QUOTE_COL: quote, "Cout": cost,
+                                       "row": df.index.to_numpy()}))
+    if not parts:
+        return pd.DataFrame(columns=["Programme", "Version"] + KEY_COLUMNS + ["Quantité", UNIT_QUOTE_COL, "Cout", "row"])
+    table = pd.concat(parts, ignore_index=True)
+    for col in ["Programme", "Version"] + KEY_COLUMNS:
+        table[col] = table[col].astype("category")
+    return table
+
+
+class BudgetRollup:
+    # Budget table and its grouped totals, built on first use and kept until
+    # invalidate() is called after the Programme sheets change
+
+    def __init__(self, frames):
+        self.frames = frames
+        self._table = None
+        self._pivots = {}
+
+    def invalidate(self):
+        self._table = None
+        self._pivots = {}
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = budget_table(self.frames)
+        return self._table
+
+    def pivot(self, by):
+        # Cost per group (rows) and version (columns); by is a column name or
+        # a list of them, always nested under the programme
+        by = ["Programme"] + ([by] if isinstance(by, str) else list(by))
+        key = tuple(by)
+        if key not in self._pivots:
+            self._pivots[key] = self.table.pivot_table(index=by, columns="Version", values="Cout",
+                                                       aggfunc="sum", observed=True, fill_value=0)
+        return self._pivots[key]
+
+    def version_totals(self, sheet_name):
+        # {version: total cost} of one Programme sheet; versions are kept
+        # apart since they are alternative budgets, not parts of one
+        layout = BUDGET_LAYOUTS[sheet_name]
+        totals = self.pivot([])
+        if layout["programme"] not in totals.index:
+            return {}
+        row = totals.loc[layout["programme"]]
+        return {version: float(row.get(version, 0)) for version in layout["versions"]}
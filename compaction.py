@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+# Processed sheets are compacted once, right after preprocessing: text
+# columns of repeated labels (Equipement, Sous-ensemble, Criticité, TYPE,
+# SITUATION, SECTION AFFECTATION, Section...) become categoricals, and
+# numeric columns take the smallest integer or float dtype that holds every
+# value exactly. Cell edits go through set_value, which widens a column back
+# to float64 when a value does not fit its compact dtype.
+
+# A text column becomes categorical when it has at most this many distinct
+# values per filled cell (OT numbers, serial numbers stay plain text)
+CATEGORY_MAX_RATIO = 0.5
+INTEGER_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def is_label_column(values):
+    filled = values.dropna()
+    if filled.empty or pd.api.types.infer_dtype(filled, skipna=True) != "string":
+        return False
+    return filled.nunique() <= len(filled) * CATEGORY_MAX_RATIO
+
+
+def smallest_dtype(values):
+    # Smallest signed integer dtype for whole numbers, float32 for floats it
+    # represents exactly, else the array's own dtype
+    if values.dtype.kind not in "iuf" or len(values) == 0:
+        return values.dtype
+    if values.dtype.kind == "f":
+        finite = np.isfinite(values)
+        if not finite.all() or not np.array_equal(values, np.trunc(values)):
+            narrow = values.astype(np.float32)
+            return np.dtype(np.float32) if np.array_equal(narrow, values, equal_nan=True) else values.dtype
+    low, high = values.min(), values.max()
+    for dtype in INTEGER_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return values.dtype
+
+
+def compact_frame(df):
+    # Returns the compacted frame; the columns left as they are are shared
+    # with df, and attrs (the cell source) are kept
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if values.dtype == object:
+            if is_label_column(values):
+                columns[col] = values.astype("category")
+        elif values.dtype.kind in "iuf":
+            dtype = smallest_dtype(values.to_numpy())
+            if dtype != values.dtype:
+                columns[col] = values.astype(dtype)
+    if not columns:
+        return df
+    compact = pd.DataFrame({col: columns.get(col, df[col]) for col in df.columns}, index=df.index, copy=False)
+    compact.attrs = dict(df.attrs)
+    return compact
+
+
+def set_value(df, row, col, value):
+    # df.at[row, col] = value, for compacted frames: a numeric column whose
+    # dtype cannot hold the value exactly is widened to float64 first
+    dtype = df[col].dtype
+    if dtype.kind in "iuf" and dtype != np.float64:
+        number = float(value)
+        if dtype.kind == "f":
+            fits = np.isnan(number) or float(np.float32(number)) == number
+        else:
+            info = np.iinfo(dtype)
+            fits = number.is_integer() and info.min <= number <= info.max
+        if not fits:
+            df[col] = df[col].astype(np.float64)
+    df.at[row, col] = value
+
+
+def memory_usage(df):
+    # Bytes held by the frame, strings included
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def uncompacted_usage(df):
+    # Bytes the frame would hold with object labels and 64-bit numbers
+    total = int(df.index.memory_usage(deep=True))
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            total += int(values.astype(object).memory_usage(index=False, deep=True))
+        elif values.dtype.kind in "iuf":
+            total += 8 * len(values)
+        else:
+            total += int(values.memory_usage(index=False, deep=True))
+    return total
+
+
+def memory_report(frames):
+    # Per sheet: rows, MB held, MB without compaction and MB saved
+    rows = []
+    for sheet_name, df in frames.items():
+        used, uncompacted = memory_usage(df), uncompacted_usage(df)
+        rows.append({"sheet": sheet_name, "rows": len(df), "MB": used / 2 ** 20,
+                     "uncompacted MB": uncompacted / 2 ** 20, "saved MB": (uncompacted - used) / 2 ** 20})
+    return pd.DataFrame(rows, columns=["sheet", "rows", "MB", "uncompacted MB", "saved MB"])
@@ -0,0 +1,123 @@
+from alerts import AVAILABLE_COL, AWAITING_COL, IN_PROGRESS_COL, SEVERITIES
+from ateliers import ATELIER_COL, atelier_stock
+from budget import BUDGET_LAYOUTS
+from performance import fleet_summary
+from sheet_configs import CARTOGRAPHIE_SHEETS, PERFORMANCE_SHEETS
+
+
+class FleetAlerts:
+    # Alerts of every Cartographie sheet: refresh evaluates them all in one
+    # pass once the sheets are loaded, then apply_edit keeps them current by
+    # evaluating the edited row again
+
+    def __init__(self, frames, alert_engine):
+        self.frames = frames
+        self.alert_engine = alert_engine
+        # {(sheet, row): [(rule, severity, message)]}, None until refreshed
+        self.alerts = None
+
+    def refresh(self):
+        self.alerts = {}
+        self.add_alerts(self.alert_engine.evaluate(self.frames, CARTOGRAPHIE_SHEETS))
+
+    def apply_edit(self, sheet_name, row, col):
+        if self.alerts is not None and sheet_name in CARTOGRAPHIE_SHEETS and col in self.alert_engine.columns:
+            self.alerts.pop((sheet_name, row), None)
+            self.add_alerts(self.alert_engine.evaluate({sheet_name: self.frames[sheet_name].loc[[row]]},
+                                                       [sheet_name]))
+
+    def add_alerts(self, alerts):
+        for sheet_name, row, rule, severity, message in zip(alerts["sheet"], alerts["row"], alerts["rule"],
+                                                            alerts["severity"], alerts["message"]):
+            self.alerts.setdefault((sheet_name, row), []).append((rule, severity, message))
+
+    def items(self):
+        # (severity, sheet, message) rows, most severe first, then in sheet
+        # and row order within a severity
+        if self.alerts is None:
+            return []
+        order = {sheet_name: i for i, sheet_name in enumerate(CARTOGRAPHIE_SHEETS)}
+        items = [(severity, sheet_name, message)
+                 for sheet_name, row in sorted(self.alerts, key=lambda key: (order[key[0]], key[1]))
+                 for rule, severity, message in self.alerts[(sheet_name, row)]]
+        items.sort(key=lambda item: SEVERITIES.index(item[0]))
+        return items
+
+
+class SheetStats:
+    # Running dashboard aggregates of one processed sheet. They are computed
+    # once from the frame, then kept current by apply_edit in O(1) per cell,
+    # so a refresh after a save never rescans the sheet.
+
+    def __init__(self, sheet_name, df, index, budget=None, fleet_alerts=None):
+        # budget is the shared BudgetRollup, used for the Programme sheets;
+        # fleet_alerts the FleetAlerts the edits of this sheet are passed on to
+        self.sheet_name = sheet_name
+        self.df = df
+        self.budget = budget
+        self.fleet_alerts = fleet_alerts
+        self.equipment_col = index.equipment_col
+        self.sous_ensemble_col = index.sous_ensemble_col
+        self.total_equipments = len(df[self.equipment_col].unique()) if self.equipment_col else 0
+        self.total_sous_ensembles = int(df[self.sous_ensemble_col].count()) if self.sous_ensemble_col else 0
+
+        self.sums = {}
+        if sheet_name in CARTOGRAPHIE_SHEETS:
+            self.sums = {AWAITING_COL: df[AWAITING_COL].sum(), IN_PROGRESS_COL: df[IN_PROGRESS_COL].sum()}
+        # Stock per workshop, grouped once the atelier workbook has been
+        # joined (it may arrive after the stats are built), then kept by
+        # apply_edit like the sums
+        self.stock = None
+
+        # Change-history statistics, recomputed on demand after an edit
+        self.fleet = None
+
+    def apply_edit(self, row, col, old):
+        # Call once the cell has been written; old is its previous value
+        new = self.df.at[row, col]
+        self.fleet = None
+        if col in self.sums:
+            # As floats: compacted int8 columns would wrap around
+            self.sums[col] += float(new) - float(old)
+        if self.stock is not None and col in self.stock.columns:
+            atelier = self.df.at[row, ATELIER_COL]
+            if atelier in self.stock.index:
+                self.stock.at[atelier, col] += float(new) - float(old)
+        if self.fleet_alerts is not None:
+            self.fleet_alerts.apply_edit(self.sheet_name, row, col)
+
+    def summary(self):
+        stats = f"Total Equipments: {self.total_equipments}\n"
+        if self.sous_ensemble_col:
+            stats += f"Total Sous-ensembles: {self.total_sous_ensembles}\n"
+
+        # Sheet-specific statistics
+        if self.sheet_name in CARTOGRAPHIE_SHEETS:
+            stats += (
+                f"Sous-ensembles Awaiting Revision: {int(self.sums[AWAITING_COL])}\n"
+                f"Sous-ensembles In Progress: {int(self.sums[IN_PROGRESS_COL])}"
+            )
+            # Stock per workshop, once the atelier workbook has been joined
+            if ATELIER_COL in self.df.columns:
+                if self.stock is None:
+                    self.stock = atelier_stock(self.df).astype(float)
+                for atelier, stock in self.stock.iterrows():
+                    stock = stock.astype(int)
+                    stock_line = (f"{stock[AVAILABLE_COL]} available, {stock[AWAITING_COL]} awaiting, "
+                                  f"{stock[IN_PROGRESS_COL]} in progress")
+                    stats += f"\n{atelier}: {stock_line}"
+        elif self.sheet_name in BUDGET_LAYOUTS and self.budget is not None:
+            # One line per version: V1, V2 and V3 are alternative budgets
+            stats += "\n".join(f"Estimated Cost {version}: {total:,.2f}"
+                               for version, total in self.budget.version_totals(self.sheet_name).items())
+        elif self.sheet_name in PERFORMANCE_SHEETS and len(self.df):
+            if self.fleet is None:
+                self.fleet = fleet_summary(self.df)
+            fleet = self.fleet
+            stats += (
+                f"Sous-ensembles With Change History: {int((fleet['changes'] > 0).sum())}\n"
+                f"Recorded Changes: {int(fleet['changes'].sum())}\n"
+                f"Mean Life (h): {fleet['mean life'].mean():.0f}\n"
+                f"Sous-ensembles Past Mean Life: {int((fleet['remaining hours'] <= 0).sum())}"
+            )
+        return stats
@@ -0,0 +1,78 @@
+import tracemalloc
+
+from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtGui import QFont
+from PyQt6.QtWidgets import (QCheckBox, QDialog, QHBoxLayout, QMessageBox, QPlainTextEdit, QPushButton,
+                             QVBoxLayout)
+
+import profiling
+from compaction import memory_report
+
+
+class DiagnosticsDialog(QDialog):
+    # Hidden panel (Ctrl+Shift+D) switching the hot-path timings, cProfile
+    # and tracemalloc on and off, with the timing summary, the memory held
+    # by the loaded sheets and a dump button; dumped emits the files written
+    dumped = pyqtSignal(list)
+
+    def __init__(self, directory, frames, parent=None):
+        super().__init__(parent)
+        self.directory = directory
+        self.frames = frames
+        self.setWindowTitle("Diagnostics")
+        self.resize(760, 420)
+        layout = QVBoxLayout(self)
+
+        toggles = QHBoxLayout()
+        self.timings_check = QCheckBox("Record timings")
+        self.timings_check.setChecked(profiling.enabled())
+        self.timings_check.toggled.connect(lambda checked: profiling.enable() if checked else profiling.disable())
+        self.cpu_check = QCheckBox("cProfile (GUI thread)")
+        self.cpu_check.setChecked(profiling.profiling_cpu())
+        self.cpu_check.toggled.connect(
+            lambda checked: profiling.start_cpu_profile() if checked else profiling.stop_cpu_profile())
+        self.memory_check = QCheckBox("tracemalloc")
+        self.memory_check.setChecked(tracemalloc.is_tracing())
+        self.memory_check.toggled.connect(
+            lambda checked: profiling.start_memory_trace() if checked else profiling.stop_memory_trace())
+        for check in [self.timings_check, self.cpu_check, self.memory_check]:
+            toggles.addWidget(check)
+        toggles.addStretch()
+        layout.addLayout(toggles)
+
+        self.summary_text = QPlainTextEdit()
+        self.summary_text.setReadOnly(True)
+        self.summary_text.setFont(QFont("Consolas", 9))
+        layout.addWidget(self.summary_text)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        for label, slot in [("Refresh", self.refresh), ("Clear", self.clear), ("Dump to file", self.dump)]:
+            button = QPushButton(label)
+            button.clicked.connect(lambda checked, slot=slot: slot())
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+        self.refresh()
+
+    def refresh(self):
+        text = profiling.summary_text()
+        memory = memory_report(self.frames)
+        if len(memory):
+            text += f"\n\n{'sheet':<28} {'rows':>9} {'MB':>9} {'saved MB':>9}\n"
+            text += "\n".join(f"{row['sheet']:<28} {row['rows']:>9} {row['MB']:>9.2f} {row['saved MB']:>9.2f}"
+                              for row in memory.to_dict("records"))
+            text += f"\n{'total':<28} {memory['rows'].sum():>9} {memory['MB'].sum():>9.2f} " \
+                    f"{memory['saved MB'].sum():>9.2f}"
+        self.summary_text.setPlainText(text)
+
+    def clear(self):
+        profiling.clear()
+        self.refresh()
+
+    def dump(self):
+        try:
+            paths = profiling.dump(self.directory)
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Failed to write the diagnostics: {e}")
+            return
+        self.dumped.emit(paths)
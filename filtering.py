@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+
+def filter_mask(df, filters):
+    # Combine equality filters into one boolean mask over the frame's rows;
+    # a None value or a column missing from the frame means "All".
+    # Categorical columns are compared on their integer codes
+    mask = np.ones(len(df), dtype=bool)
+    for col, value in filters.items():
+        if value is None or col not in df.columns:
+            continue
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            code = values.cat.categories.get_indexer([value])[0]
+            if code < 0:
+                mask[:] = False
+            else:
+                mask &= values.cat.codes.to_numpy() == code
+        else:
+            mask &= (values == value).to_numpy(dtype=bool, na_value=False)
+    return mask
@@ -0,0 +1,349 @@
+import html
+import math
+import posixpath
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+
+import pandas as pd
+from openpyxl.formula.translate import Translator
+from openpyxl.utils import column_index_from_string, get_column_letter, range_boundaries
+
+# openpyxl keeps the formulas of a workbook it saves but drops their cached
+# results, which are what the loader reads: after one saved edit every cost
+# (=G5*E5) and PERFORMANCE (=U8-H8) cell would load as empty. The sheets
+# whose formulas lost their results are found in the workbook XML, and those
+# formulas are evaluated here, row arithmetic and table references included,
+# before the sheet is preprocessed. Excel itself recalculates them on open
+# (the app saves with fullCalcOnLoad). A formula the evaluator does not
+# support fails the load rather than loading as an empty cell.
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PACKAGE_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# A formula cell, its <f> attributes and text, and what follows the formula:
+# an empty or missing <v> means the result was not saved
+_FORMULA_CELL = re.compile(
+    r'<c r="([A-Z]{1,3})(\d+)"[^>]*?>\s*<f([^>]*?)(?:/>|>(.*?)</f>)\s*(<v>\s*</v>|<v\s*/>|<v>|</c>)', re.S)
+_ATTRIBUTE = re.compile(r'(\w+)="([^"]*)"')
+_TOKEN = re.compile(r"""
+    \s+
+  | (?P<table>[A-Za-z_\\][\w.]*\[(?:[^\[\]']|'.|\[(?:[^\[\]']|'.)*\])*\])
+  | (?P<function>[A-Za-z][A-Za-z0-9.]*)\(
+  | (?P<range>\$?[A-Z]{1,3}\$?\d+:\$?[A-Z]{1,3}\$?\d+)
+  | (?P<cell>\$?[A-Z]{1,3}\$?\d+)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<op>[-+*/^(),])
+""", re.X | re.S)
+
+
+class FormulaError(Exception):
+    # A formula this evaluator does not support (functions other than SUM,
+    # other sheets, text operators...) or a circular reference
+    pass
+
+
+class ExcelError(FormulaError):
+    # A formula Excel itself evaluates to an error (#VALUE!, #DIV/0!); the
+    # cell takes the error text, as pandas reads it from a workbook Excel saved
+    def __init__(self, text):
+        super().__init__(text)
+        self.text = text
+
+
+def _read_xml(archive, name):
+    return ET.fromstring(archive.read(name))
+
+
+def _sheet_parts(archive):
+    # {sheet name: worksheet part} from the workbook and its relationships
+    targets = {rel.get("Id"): rel.get("Target")
+               for rel in _read_xml(archive, "xl/_rels/workbook.xml.rels").iter(f"{PACKAGE_REL_NS}Relationship")}
+    parts = {}
+    for sheet in _read_xml(archive, "xl/workbook.xml").iter(f"{MAIN_NS}sheet"):
+        target = targets.get(sheet.get(f"{REL_NS}id"), "")
+        parts[sheet.get("name")] = target.lstrip("/") if target.startswith("/") else posixpath.join("xl", target)
+    return parts
+
+
+def _tables(archive):
+    # {table name (casefolded): (first row, first column, last row, last
+    # column, header rows, totals rows, column names)}, 0-based
+    tables = {}
+    for name in archive.namelist():
+        if not (name.startswith("xl/tables/") and name.endswith(".xml")):
+            continue
+        table = _read_xml(archive, name)
+        min_col, min_row, max_col, max_row = range_boundaries(table.get("ref"))
+        # Names escape characters such as line breaks as _x000a_
+        columns = [re.sub(r"_x([0-9A-Fa-f]{4})_", lambda match: chr(int(match.group(1), 16)), column.get("name"))
+                   for column in table.iter(f"{MAIN_NS}tableColumn")]
+        bounds = (min_row - 1, min_col - 1, max_row - 1, max_col - 1,
+                  int(table.get("headerRowCount", "1")), int(table.get("totalsRowCount", "0")), columns)
+        for key in [table.get("displayName"), table.get("name")]:
+            if key:
+                tables[key.casefold()] = bounds
+    return tables
+
+
+def sheet_formulas(xml):
+    # {(row, column): formula} of the formula cells (0-based) and the cells
+    # among them whose result was not saved; shared formulas are expanded
+    formulas, missing, shared = {}, set(), {}
+    for letters, row, attributes, text, after in _FORMULA_CELL.findall(xml):
+        cell = (int(row) - 1, column_index_from_string(letters) - 1)
+        attributes = dict(_ATTRIBUTE.findall(attributes))
+        text = html.unescape(text or "")
+        if attributes.get("t") == "shared":
+            if text:
+                shared[attributes.get("si")] = (text, f"{letters}{row}")
+            elif attributes.get("si") in shared:
+                origin_text, origin = shared[attributes["si"]]
+                text = Translator("=" + origin_text, origin=origin).translate_formula(f"{letters}{row}")[1:]
+        if not text or attributes.get("t") == "array":
+            continue
+        formulas[cell] = text
+        if after != "<v>":
+            missing.add(cell)
+    return formulas, missing
+
+
+def _number(value):
+    # A cell as Excel's arithmetic sees it: empty is 0, text is an error
+    if isinstance(value, str) and value.startswith("#"):
+        raise ExcelError(value)
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 0.0
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value))
+    except ValueError:
+        raise ExcelError("#VALUE!")
+
+
+def _unescape(name):
+    # Structured reference names escape [ ] # ' with a leading '
+    return re.sub(r"'(.)", r"\1", name)
+
+
+def _same_name(a, b):
+    return " ".join(a.split()).casefold() == " ".join(b.split()).casefold()
+
+
+class FormulaSheet:
+    # Evaluates the formulas of one sheet over its raw frame (the values
+    # pandas read, 0-based like the worksheet minus one)
+
+    def __init__(self, raw, formulas, missing, tables):
+        self.values = raw.to_numpy(dtype=object)
+        self.formulas = formulas
+        self.missing = missing
+        self.tables = tables
+        self.results = {}
+        self._evaluating = set()
+
+    def value(self, row, column):
+        cell = (row, column)
+        if cell in self.missing:
+            return self.evaluate(cell)
+        if row < self.values.shape[0] and column < self.values.shape[1]:
+            return self.values[row, column]
+        return None
+
+    def evaluate(self, cell):
+        # The result of a formula cell; raises FormulaError when it cannot
+        # be computed
+        if cell in self.results:
+            return self.results[cell]
+        if cell in self._evaluating:
+            raise FormulaError("circular reference")
+        self._evaluating.add(cell)
+        try:
+            result = _Parser(self, cell[0], self.formulas[cell]).parse()
+        except ExcelError as e:
+            result = e.text
+        except ZeroDivisionError:
+            result = "#DIV/0!"
+        except OverflowError:
+            result = "#NUM!"
+        finally:
+            self._evaluating.discard(cell)
+        self.results[cell] = result
+        return result
+
+    def table_cells(self, reference, row):
+        # Cells of a structured reference: Table[Column], Table[[#This Row],[Column]]
+        name, _, inner = reference.partition("[")
+        table = self.tables.get(name.casefold())
+        if table is None:
+            raise FormulaError(f"unknown table {name}")
+        first_row, first_col, last_row, _, header_rows, totals_rows, columns = table
+        items = re.findall(r"\[((?:[^\[\]']|'.)*)\]", inner[:-1]) if inner.startswith("[") else [inner[:-1]]
+        this_row = any(item.casefold() == "#this row" for item in items)
+        names = [_unescape(item) for item in items if not item.startswith("#")]
+        if len(names) != 1:
+            raise FormulaError(f"unsupported reference {reference}")
+        positions = [i for i, column in enumerate(columns) if _same_name(column, names[0])]
+        if not positions:
+            raise FormulaError(f"unknown column in {reference}")
+        column = first_col + positions[0]
+        rows = range(first_row + header_rows, last_row - totals_rows + 1)
+        if this_row:
+            if row not in rows:
+                raise ExcelError("#VALUE!")
+            return [(row, column)]
+        return [(r, column) for r in rows]
+
+
+class _Parser:
+    # Recursive descent over + - * / ^, unary signs, parentheses, numbers,
+    # cells, ranges and table references inside SUM
+
+    def __init__(self, sheet, row, formula):
+        self.sheet = sheet
+        self.row = row
+        self.tokens = []
+        position = 0
+        formula = formula.lstrip("=")
+        while position < len(formula):
+            match = _TOKEN.match(formula, position)
+            if match is None:
+                raise FormulaError(f"cannot read {formula!r}")
+            position = match.end()
+            if match.lastgroup:
+                self.tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        self.position = 0
+
+    def parse(self):
+        value = self.expression()
+        if self.position != len(self.tokens):
+            raise FormulaError("unexpected token")
+        return value
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def expression(self):
+        value = self.term()
+        while self.peek() in [("op", "+"), ("op", "-")]:
+            value = value + self.term() if self.take()[1] == "+" else value - self.term()
+        return value
+
+    def term(self):
+        value = self.factor()
+        while self.peek() in [("op", "*"), ("op", "/")]:
+            value = value * self.factor() if self.take()[1] == "*" else value / self.factor()
+        return value
+
+    def factor(self):
+        if self.peek() in [("op", "-"), ("op", "+")]:
+            sign = -1.0 if self.take()[1] == "-" else 1.0
+            return sign * self.factor()
+        value = self.primary()
+        if self.peek() == ("op", "^"):
+            self.take()
+            value = value ** self.factor()
+        return value
+
+    def cells(self, kind, text):
+        if kind == "cell":
+            min_col, min_row, _, _ = range_boundaries(text.replace("$", ""))
+            return [(min_row - 1, min_col - 1)]
+        if kind == "range":
+            min_col, min_row, max_col, max_row = range_boundaries(text.replace("$", ""))
+            return [(r, c) for r in range(min_row - 1, max_row) for c in range(min_col - 1, max_col)]
+        return self.sheet.table_cells(text, self.row)
+
+    def primary(self):
+        kind, text = self.take()
+        if kind == "number":
+            return float(text)
+        if kind in ["cell", "table"]:
+            cells = self.cells(kind, text)
+            if len(cells) != 1:
+                raise FormulaError(f"{text} is not a single cell")
+            return _number(self.sheet.value(*cells[0]))
+        if kind == "op" and text == "(":
+            value = self.expression()
+            if self.take() != ("op", ")"):
+                raise FormulaError("missing )")
+            return value
+        if kind == "function" and text.upper() == "SUM":
+            return self.sum()
+        raise FormulaError(f"unsupported {text!r}")
+
+    def sum(self):
+        # SUM ignores text and empty cells in ranges, as Excel does
+        total = 0.0
+        while True:
+            kind, text = self.peek()
+            if kind in ["range", "table"] or (kind == "cell" and self.tokens[self.position + 1:self.position + 2]
+                                              in [[("op", ",")], [("op", ")")]]):
+                self.take()
+                for cell in self.cells(kind, text):
+                    value = self.sheet.value(*cell)
+                    if isinstance(value, (int, float)) and not isinstance(value, bool) and not pd.isna(value):
+                        total += float(value)
+            else:
+                total += self.expression()
+            kind, text = self.take()
+            if (kind, text) == ("op", ")"):
+                return total
+            if (kind, text) != ("op", ","):
+                raise FormulaError("bad SUM arguments")
+
+
+class FormulaResults:
+    # The formula cells of a workbook that openpyxl saved without results;
+    # stale_sheets is empty for a workbook last saved by Excel
+
+    def __init__(self, path):
+        self.formulas = {}
+        with zipfile.ZipFile(path) as archive:
+            for sheet_name, part in _sheet_parts(archive).items():
+                if part not in archive.namelist():
+                    continue
+                formulas, missing = sheet_formulas(archive.read(part).decode("utf-8"))
+                if missing:
+                    self.formulas[sheet_name] = (formulas, missing)
+            self.tables = _tables(archive) if self.formulas else {}
+        self.stale_sheets = list(self.formulas)
+
+    def fill(self, sheet_name, raw):
+        # Returns raw with the missing results computed. Raises FormulaError
+        # naming the first cell that cannot be, with the number of them: a
+        # cost or PERFORMANCE cell must not silently load as empty
+        if sheet_name not in self.formulas:
+            return raw
+        formulas, missing = self.formulas[sheet_name]
+        sheet = FormulaSheet(raw, formulas, missing, self.tables)
+        results, failed = {}, []
+        for cell in sorted(missing):
+            try:
+                results[cell] = sheet.evaluate(cell)
+            except FormulaError as e:
+                failed.append((cell, e))
+        if failed:
+            (row, column), error = failed[0]
+            raise FormulaError(f"{len(failed)} formula(s) of sheet {sheet_name} cannot be recalculated, "
+                               f"first {get_column_letter(column + 1)}{row + 1} (={formulas[(row, column)]}): "
+                               f"{error}; open and save the workbook in Excel to restore their results")
+        rows = max(raw.shape[0], max(row for row, _ in results) + 1)
+        columns = max(raw.shape[1], max(column for _, column in results) + 1)
+        raw = raw.reindex(index=range(rows), columns=range(columns))
+        targets = {column for _, column in results}
+        filled = {column: raw[column].to_numpy(dtype=object, copy=True) for column in targets}
+        for (row, column), value in results.items():
+            filled[column][row] = value
+        for column, values in filled.items():
+            raw[column] = values
+        return raw
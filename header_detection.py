@@ -0,0 +1,77 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+import pandas as pd
+
+# Number of leading rows searched for the header row (metadata sits above it)
+HEADER_SCAN_ROWS = 10
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_header(value):
+    # Comparison key of a header cell: accents, case, newlines, punctuation
+    # and repeated whitespace are ignored ("Devis \nunitaire" == "Devis unitaire",
+    # "Equipement" == "équipement", "Sous ensemble" == "Sous-ensemble")
+    text = unicodedata.normalize("NFKD", str(value))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", text.casefold()).strip()
+
+
+class HeaderMatcher:
+    # Compiled form of a sheet's target headers. A candidate row is normalised
+    # once and each cell is looked up in a dict of header keys, so the cost of
+    # matching a row does not grow with the number of headers. Headers that
+    # find no exact key fall back to their prefix, when they have one
+    # ("compteur actuel" for "compteur actuel S45/2024", whose week changes
+    # every week), then to the containment test the detection used before
+    # (header inside a longer cell), which covers drifted headers.
+
+    def __init__(self, target_headers, prefixes=()):
+        # prefixes: (header, prefix) pairs
+        self.target_headers = list(target_headers)
+        self.prefixes = {header: normalize_header(prefix) for header, prefix in prefixes}
+        self.slots = {}
+        for slot, header in enumerate(self.target_headers):
+            # Repeated headers ("OT") take the matching cells left to right
+            self.slots.setdefault(normalize_header(header), []).append(slot)
+
+    def match(self, cells):
+        # Returns the sheet column of every target header (None when absent)
+        keys = ["" if pd.isna(cell) else normalize_header(cell) for cell in cells]
+        mapping = [None] * len(self.target_headers)
+        free = {key: list(slots) for key, slots in self.slots.items()}
+        taken = set()
+        for position, key in enumerate(keys):
+            if free.get(key):
+                mapping[free[key].pop(0)] = position
+                taken.add(position)
+
+        for slot, position in enumerate(mapping):
+            if position is None:
+                key = normalize_header(self.target_headers[slot])
+                prefix = self.prefixes.get(self.target_headers[slot])
+                for candidate, cell_key in enumerate(keys):
+                    if candidate in taken:
+                        continue
+                    if (prefix and cell_key.startswith(prefix)) or (key and key in cell_key):
+                        mapping[slot] = candidate
+                        taken.add(candidate)
+                        break
+        return mapping
+
+    def find(self, raw, scan_rows=HEADER_SCAN_ROWS):
+        # First row among the leading ones that holds every target header,
+        # with its column mapping; (None, None) when there is none
+        for i in range(min(scan_rows, len(raw))):
+            mapping = self.match(raw.iloc[i].values)
+            if None not in mapping:
+                return i, mapping
+        return None, None
+
+
+@lru_cache(maxsize=None)
+def compile_headers(target_headers, prefixes=()):
+    # One matcher per distinct header tuple, shared by every workbook loaded
+    return HeaderMatcher(target_headers, prefixes)
@@ -0,0 +1,213 @@
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pandas as pd
+
+from ingestion import load_workbook
+from performance import counter_reading_date
+from report import find_workbooks
+from sheet_configs import PERFORMANCE_SHEETS, SHEET_CONFIGS
+from sheet_index import EQUIPMENT_COLUMNS, SOUS_ENSEMBLE_COLUMNS, find_column
+from workbook_cache import workbook_fingerprint
+
+# Append-only history of the numeric cells of every sheet, one snapshot per
+# save or imported weekly workbook. Each (sheet, equipment, sous-ensemble,
+# column) gets a key id once; a snapshot stores one value per key, clustered
+# by key, so a year of weekly values of a key is one short index range and
+# no workbook is opened again.
+HISTORY_PATH = "engins_history.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    week TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    source TEXT NOT NULL,
+    workbook TEXT NOT NULL,
+    sha256 TEXT
+);
+CREATE INDEX IF NOT EXISTS snapshots_week ON snapshots (week);
+CREATE INDEX IF NOT EXISTS snapshots_sha256 ON snapshots (sha256);
+CREATE TABLE IF NOT EXISTS keys (
+    id INTEGER PRIMARY KEY,
+    column_name TEXT NOT NULL,
+    equipment TEXT NOT NULL,
+    sous_ensemble TEXT NOT NULL,
+    sheet TEXT NOT NULL,
+    UNIQUE (column_name, equipment, sous_ensemble, sheet)
+);
+CREATE TABLE IF NOT EXISTS cells (
+    key_id INTEGER NOT NULL REFERENCES keys (id),
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    value REAL,
+    PRIMARY KEY (key_id, snapshot_id)
+) WITHOUT ROWID;
+"""
+
+
+def history_path(workbook_path):
+    # The store lives next to the workbook it records
+    return os.path.join(os.path.dirname(os.path.abspath(workbook_path)), HISTORY_PATH)
+
+
+KEY_FIELDS = ["column_name", "equipment", "sous_ensemble", "sheet"]
+
+
+def week_start(day):
+    # Monday of the week holding day, as the ISO date string stored in "week"
+    day = pd.Timestamp(day).normalize()
+    return (day - pd.Timedelta(days=day.weekday())).date().isoformat()
+
+
+def workbook_week(path, frames):
+    # A weekly workbook is dated by the week in its "compteur actuel S46/2024"
+    # header, else by its modification time
+    for sheet_name in PERFORMANCE_SHEETS:
+        df = frames.get(sheet_name)
+        if df is not None and not df.empty:
+            day = counter_reading_date(df)
+            if not pd.isna(day):
+                return week_start(day)
+    return week_start(datetime.datetime.fromtimestamp(os.path.getmtime(path)))
+
+
+def long_cells(frames, sheet_configs=SHEET_CONFIGS):
+    # (column_name, equipment, sous_ensemble, sheet, value) of the numeric
+    # cells of every configured sheet; rows sharing a key (a sous-ensemble
+    # listed twice) are summed, and a missing key part is ""
+    parts = []
+    for sheet_name, df in frames.items():
+        columns = [col for col in sheet_configs.get(sheet_name, {}).get("numeric_cols", []) if col in df.columns]
+        if df.empty or not columns:
+            continue
+        equipment_col = find_column(df.columns, EQUIPMENT_COLUMNS)
+        sous_ensemble_col = find_column(df.columns, SOUS_ENSEMBLE_COLUMNS)
+        n = len(df)
+
+        def keys(col):
+            if col is None:
+                return np.full(n, "", dtype=object)
+            return df[col].astype("string").str.strip().fillna("").to_numpy(dtype=object)
+        values = df[columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        parts.append(pd.DataFrame({
+            "column_name": np.tile(columns, n),
+            "equipment": np.repeat(keys(equipment_col), len(columns)),
+            "sous_ensemble": np.repeat(keys(sous_ensemble_col), len(columns)),
+            "sheet": sheet_name,
+            "value": values.reshape(-1),
+        }))
+    if not parts:
+        return pd.DataFrame(columns=KEY_FIELDS + ["value"])
+    cells = pd.concat(parts, ignore_index=True)
+    return cells.groupby(KEY_FIELDS, sort=False, as_index=False)["value"].sum(min_count=1)
+
+
+class HistoryStore:
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        rows = self.connection.execute(f"SELECT id, {', '.join(KEY_FIELDS)} FROM keys")
+        self.key_ids = {row[1:]: row[0] for row in rows}
+
+    def close(self):
+        self.connection.close()
+
+    def snapshot(self, frames, week, source, workbook, sha256=None):
+        # Appends one snapshot in a single transaction and returns its id
+        cells = long_cells(frames)
+        keys = list(cells[KEY_FIELDS].itertuples(index=False, name=None))
+        values = cells["value"].astype(object).where(cells["value"].notna(), None).tolist()
+        with self.connection:
+            for key in keys:
+                if key not in self.key_ids:
+                    self.key_ids[key] = self.connection.execute(
+                        f"INSERT INTO keys ({', '.join(KEY_FIELDS)}) VALUES (?, ?, ?, ?)", key).lastrowid
+            snapshot_id = self.connection.execute(
+                "INSERT INTO snapshots (week, taken_at, source, workbook, sha256) VALUES (?, ?, ?, ?, ?)",
+                (week, datetime.datetime.now().isoformat(timespec="seconds"), source, workbook, sha256)).lastrowid
+            self.connection.executemany(
+                "INSERT INTO cells (key_id, snapshot_id, value) VALUES (?, ?, ?)",
+                sorted(zip([self.key_ids[key] for key in keys], [snapshot_id] * len(keys), values)))
+        return snapshot_id
+
+    def import_workbook(self, path, frames=None, use_cache=True):
+        # Snapshots a weekly workbook (frames: its sheets, when already
+        # loaded); a workbook already imported (same contents) is skipped
+        # and None is returned
+        sha256 = workbook_fingerprint(path)["sha256"]
+        if self.connection.execute("SELECT 1 FROM snapshots WHERE sha256 = ?", (sha256,)).fetchone():
+            return None
+        if frames is None:
+            frames = load_workbook(path, SHEET_CONFIGS, use_cache)
+        return self.snapshot(frames, workbook_week(path, frames), "import", os.path.basename(path), sha256)
+
+    def series(self, column, equipment=None, sous_ensemble=None, sheet=None, weeks=52, end=None):
+        # Weekly total of a column over the last weeks, optionally for one
+        # equipment / sous-ensemble / sheet; a week snapshotted several times
+        # uses its latest snapshot
+        end = week_start(end if end is not None else datetime.date.today())
+        start = week_start(pd.Timestamp(end) - pd.Timedelta(weeks=weeks - 1))
+        conditions = ["k.column_name = ?"]
+        params = [column]
+        for name, value in [("equipment", equipment), ("sous_ensemble", sous_ensemble), ("sheet", sheet)]:
+            if value is not None:
+                conditions.append(f"k.{name} = ?")
+                params.append(value)
+        query = f"""
+            SELECT s.week, SUM(c.value) AS value
+            FROM keys AS k
+            JOIN cells AS c ON c.key_id = k.id
+            JOIN (SELECT MAX(id) AS id, week FROM snapshots WHERE week BETWEEN ? AND ? GROUP BY week) AS s
+                ON c.snapshot_id = s.id
+            WHERE {" AND ".join(conditions)}
+            GROUP BY s.week ORDER BY s.week
+        """
+        return pd.read_sql_query(query, self.connection, params=[start, end, *params])
+
+    def snapshots(self):
+        return pd.read_sql_query("SELECT * FROM snapshots ORDER BY id", self.connection)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m history_store",
+                                     description="Import weekly ENGINS workbooks into the history store "
+                                                 "and query weekly series.")
+    parser.add_argument("--db", default=HISTORY_PATH, help=f"history database (default: {HISTORY_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="snapshot workbooks, or directories of workbooks")
+    importer.add_argument("paths", nargs="+")
+    query = commands.add_parser("series", help="weekly series of a numeric column")
+    query.add_argument("column")
+    query.add_argument("--equipment")
+    query.add_argument("--sous-ensemble")
+    query.add_argument("--sheet")
+    query.add_argument("--weeks", type=int, default=52)
+    query.add_argument("--end", help="last week (any date in it), default today")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.db)
+    try:
+        if args.command == "import":
+            for path in find_workbooks(args.paths):
+                try:
+                    snapshot_id = store.import_workbook(path)
+                except Exception as e:
+                    print(f"{path}: {type(e).__name__}: {e}", file=sys.stderr)
+                    continue
+                print(f"{path}: " + ("already imported" if snapshot_id is None else f"snapshot {snapshot_id}"))
+        else:
+            print(store.series(args.column, args.equipment, args.sous_ensemble, args.sheet, args.weeks,
+                               args.end).to_string(index=False))
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
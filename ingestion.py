@@ -0,0 +1,156 @@
+import logging
+
+import pandas as pd
+
+from compaction import compact_frame
+from formulas import FormulaResults
+from header_detection import compile_headers
+from profiling import span
+from sheet_configs import SHEET_CONFIGS
+from workbook_cache import cache_key, load_cache, save_cache
+
+WORKBOOK_PATH = "ENGINS.xlsx"
+# Workshop assignment of the Cartographie sub-assemblies
+ATELIER_WORKBOOK_PATH = "Cartographie SE par atelier.xlsx"
+
+logger = logging.getLogger(__name__)
+
+
+def frame_columns(headers):
+    # Column names of a processed frame: a header repeated in the sheet
+    # ("OT" after each change date) is numbered "OT 1", "OT 2"... so every
+    # column can be addressed on its own
+    counts = {col: headers.count(col) for col in headers}
+    seen = {}
+    columns = []
+    for col in headers:
+        if counts[col] > 1:
+            seen[col] = seen.get(col, 0) + 1
+            col = f"{col} {seen[col]}"
+        columns.append(col)
+    return columns
+
+
+def tag_sections(body, first_col, markers):
+    # The marker of a row is its first filled cell up to the first header
+    # column; rows opening a section carry one, the rows below inherit it
+    leading = body.iloc[:, :first_col + 1]
+    marker = leading.bfill(axis=1).iloc[:, 0]
+    return marker.where(marker.isin(markers)).ffill().to_numpy()
+
+
+def preprocess_sheet(raw, sheet_name, sheet_configs=SHEET_CONFIGS):
+    if raw.empty:
+        logger.warning("Sheet %s is empty. Skipping preprocessing.", sheet_name)
+        return pd.DataFrame()
+
+    # Check if the sheet is in the configuration
+    if sheet_name not in sheet_configs:
+        logger.warning("Unknown sheet: %s. Skipping preprocessing.", sheet_name)
+        return pd.DataFrame()
+
+    config = sheet_configs[sheet_name]
+    target_headers = config["headers"]
+
+    prefixes = tuple(config.get("header_prefixes", {}).items())
+    header_row, mapping = compile_headers(tuple(target_headers), prefixes).find(raw)
+    if header_row is None:
+        logger.warning("Could not find the expected section in sheet %s.", sheet_name)
+        return pd.DataFrame()
+
+    # Build the frame from the raw rows below the header, taking every target
+    # header (repeated ones included) from the column it was matched in
+    body = raw.iloc[header_row + 1:]
+    names = frame_columns(target_headers)
+    df_section = pd.concat([body.iloc[:, position] for position in mapping], axis=1, ignore_index=True)
+    df_section.columns = names
+    positions = dict(zip(names, mapping))
+    # Type the columns from the data rows only, as a header-aware read would
+    df_section = df_section.infer_objects()
+    df_section.index = pd.RangeIndex(len(df_section))
+
+    # Tag the rows with their section (BG, YSF...) before any row is dropped
+    markers = config.get("section_markers")
+    if markers:
+        df_section["Section"] = tag_sections(body, positions.get(target_headers[0], 0), markers)
+        # Drop rows that are section headers (BG or YSF)
+        df_section = df_section[~df_section[target_headers[0]].isin(markers)]
+
+    # Drop rows where the first column is NaN
+    df_section = df_section.dropna(subset=[target_headers[0]], how="all")
+    # Convert numeric columns to appropriate types
+    for col in config["numeric_cols"]:
+        if col in df_section.columns:
+            df_section[col] = pd.to_numeric(df_section[col], errors='coerce').fillna(0)
+
+    # Remember where the rows and columns come from so edits can be written
+    # back to their cells: row label i sits on sheet row header_row + 2 + i.
+    # The header text is the sheet's ("compteur actuel S46/2024")
+    headers = {name: str(raw.iat[header_row, position]).strip() for name, position in positions.items()}
+    df_section.attrs["source"] = {"header_row": header_row, "columns": positions, "headers": headers}
+    return df_section
+
+
+def cell_coordinates(df, row_label, col):
+    # 1-based (row, column) of a processed cell in its worksheet
+    source = df.attrs["source"]
+    return int(source["header_row"] + 2 + row_label), int(source["columns"][col] + 1)
+
+
+class WorkbookIngestor:
+    # Opens a workbook (or its cache) once and hands out the preprocessed
+    # sheets one at a time, so callers can publish each sheet as it is ready
+
+    def __init__(self, path=WORKBOOK_PATH, sheet_configs=SHEET_CONFIGS, use_cache=True):
+        self.path = path
+        self.sheet_configs = sheet_configs
+        self.use_cache = use_cache
+        self._key = None
+        self._cached = None
+        self._xls = None
+        self._formulas = None
+
+    def open(self):
+        # Returns the sheet names in workbook order. A warm start loads the
+        # preprocessed frames without touching openpyxl; the cache key changes
+        # with the workbook contents and the sheet configs
+        if self.use_cache:
+            self._key = cache_key(self.path, self.sheet_configs)
+            self._cached = load_cache(self.path, self._key)
+            if self._cached is not None:
+                return list(self._cached)
+        self._xls = pd.ExcelFile(self.path)
+        # Formulas saved without their results (by openpyxl) are recalculated
+        with span("formula scan"):
+            self._formulas = FormulaResults(self.path)
+        return list(self._xls.sheet_names)
+
+    def iter_sheets(self):
+        if self._cached is not None:
+            yield from self._cached.items()
+            return
+
+        # Parse every sheet of the workbook exactly once, without a header
+        processed_data = {}
+        try:
+            for sheet_name in self._xls.sheet_names:
+                with span("parse sheet", sheet_name):
+                    raw = self._xls.parse(sheet_name, header=None)
+                if sheet_name in self._formulas.stale_sheets:
+                    with span("recalculate formulas", sheet_name):
+                        raw = self._formulas.fill(sheet_name, raw)
+                with span("preprocess_sheet", sheet_name):
+                    df = preprocess_sheet(raw, sheet_name, self.sheet_configs)
+                with span("compact", sheet_name):
+                    processed_data[sheet_name] = compact_frame(df)
+                yield sheet_name, processed_data[sheet_name]
+        finally:
+            self._xls.close()
+        if self.use_cache:
+            save_cache(self.path, self._key, processed_data)
+
+
+def load_workbook(path=WORKBOOK_PATH, sheet_configs=SHEET_CONFIGS, use_cache=True):
+    ingestor = WorkbookIngestor(path, sheet_configs, use_cache)
+    ingestor.open()
+    return dict(ingestor.iter_sheets())
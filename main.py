@@ -1,12 +1,48 @@
+import datetime
+import logging
+import os
 import sys
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QComboBox, QPushButton, QLineEdit, QFrame, QMessageBox,
-                             QTableWidget, QTableWidgetItem, QTabWidget, QScrollArea, QCheckBox, QButtonGroup, QRadioButton)
+                             QTableView, QHeaderView, QAbstractItemView, QTabWidget, QCheckBox,
+                             QButtonGroup, QRadioButton, QSpinBox)
 
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QFont
-import pandas as pd
-import numpy as np
+from PyQt6.QtGui import QFont, QKeySequence, QShortcut
+
+from alerts import AlertEngine
+from ateliers import ATELIER_COL, AtelierIndex, attach_ateliers
+from budget import BUDGET_GROUPS, BUDGET_LAYOUTS, BudgetRollup
+from compaction import set_value
+from dashboard_stats import FleetAlerts, SheetStats
+from diagnostics import DiagnosticsDialog
+from filtering import filter_mask
+from history_store import HistoryStore, history_path, week_start
+from ingestion import ATELIER_WORKBOOK_PATH, WORKBOOK_PATH, cell_coordinates, frame_columns
+import profiling
+from profiling import span
+from save_queue import SaveQueue
+from scheduler import DEFAULT_HORIZON_WEEKS, fleet_table, weekly_forecast
+from sheet_configs import ATELIER_SHEET_CONFIGS, SHEET_CONFIGS, CARTOGRAPHIE_SHEETS, PERFORMANCE_SHEETS
+from sql_backend import SqlBackend, SqlIngestor
+from table_models import AlertListModel, DataFrameModel, SeverityDelegate
+from workers import WorkbookLoader
+from workflow_analytics import WorkflowAnalytics
+from workflow_store import DONE, WorkflowStore, workflow_path
+from writeback import cell_number, is_formula, same_value
+
+# (text, background) colours of the dashboard alert rows, per severity
+ALERT_COLOURS = {
+    "critical": ("#d63031", "#ffcccc"),
+    "warning": ("#8a5a00", "#fff3cd"),
+    "info": ("#0c5460", "#d1ecf1"),
+    "notice": ("#2d3436", "#e6ffed")
+}
+
+# With ENGINS_DB set, the sheets are read from and saved to that SQLite
+# database (imported from the workbook on first start) and the workbook is
+# only written by "Export to Excel"
+DATABASE_PATH = os.environ.get("ENGINS_DB")
 
 class EquipmentApp(QMainWindow):
     def __init__(self):
@@ -47,89 +83,32 @@ class EquipmentApp(QMainWindow):
         main_layout.setContentsMargins(20, 20, 20, 20)
         main_layout.setSpacing(15)
 
-        # Load the Excel file with multiple sheets
-        try:
-            self.excel_data = pd.read_excel("ENGINS.xlsx", sheet_name=None, header=None)
-        except FileNotFoundError:
-            self.excel_data = {}
-            QMessageBox.critical(self, "Error", "Excel file 'ENGINS.xlsx' not found.")
-            return
-
-        # Define expected headers for each sheet type
-        self.sheet_configs = {
-            "Park engin": {
-                "headers": ["Equipement", "MLE", "DMS", "TYPE", "N° DES SERIES", "SITUATION"],
-                "numeric_cols": [],
-                "filter_col": "SITUATION"
-            },
-            "Cartographie moteur": {
-                "headers": ["Equipement", "Sous-ensemble", "Criticité", "Quantité SE installée",
-                            "Sous-ensemble relais disponible (révisé)", "Sous-ensemble en attente révision",
-                            "Sous-ensemble encours de révision", "Corps de Sous-ensembles disponibles (révisable)"],
-                "numeric_cols": ["Quantité SE installée", "Sous-ensemble relais disponible (révisé)",
-                                 "Sous-ensemble en attente révision", "Sous-ensemble encours de révision",
-                                 "Corps de Sous-ensembles disponibles (révisable)"],
-                "filter_col": "Criticité"
-            },
-            "Cartographie transmission": {
-                "headers": ["Equipement", "Sous-ensemble", "Criticité", "Quantité SE installée",
-                            "Sous-ensemble relais disponible (révisé)", "Sous-ensemble en attente révision",
-                            "Sous-ensemble encours de révision", "Corps de Sous-ensembles disponibles (révisable)"],
-                "numeric_cols": ["Quantité SE installée", "Sous-ensemble relais disponible (révisé)",
-                                 "Sous-ensemble en attente révision", "Sous-ensemble encours de révision",
-                                 "Corps de Sous-ensembles disponibles (révisable)"],
-                "filter_col": "Criticité"
-            },
-            "Cartographie Engin": {
-                "headers": ["Equipement", "Sous-ensemble", "Criticité", "Quantité SE installée",
-                            "Sous-ensemble relais disponible (révisé)", "Sous-ensemble en attente révision",
-                            "Sous-ensemble encours de révision", "Corps de Sous-ensembles disponibles (révisable)"],
-                "numeric_cols": ["Quantité SE installée", "Sous-ensemble relais disponible (révisé)",
-                                 "Sous-ensemble en attente révision", "Sous-ensemble encours de révision",
-                                 "Corps de Sous-ensembles disponibles (révisable)"],
-                "filter_col": "Criticité"
-            },
-            "Performances BG": {
-                "headers": ["équipement", "Sous-ensemble", "date de changement 1", "OT", "Compteur de changement 1",
-                            "date de changement 2", "OT", "Compteur de changement 2", "date de changement 3", "OT",
-                            "Compteur de changement 3", "date de changement 4", "OT", "Compteur de changement 4",
-                            "date de changement 5", "OT", "Compteur de changement 5", "date de changement 6", "OT",
-                            "Compteur de changement 6", "compteur actuel S45/2024", "PERFORMANCE"],
-                "numeric_cols": ["Compteur de changement 1", "Compteur de changement 2", "Compteur de changement 3",
-                                 "Compteur de changement 4", "Compteur de changement 5", "Compteur de changement 6",
-                                 "compteur actuel S45/2024", "PERFORMANCE"],
-                "filter_col": None
-            },
-            "Performances YSF": {
-                "headers": ["équipement", "Sous-ensemble", "date de changement 1", "OT", "Compteur de changement 1",
-                            "date de changement 2", "OT", "Compteur de changement 2", "date de changement 3", "OT",
-                            "Compteur de changement 3", "date de changement 4", "OT", "Compteur de changement 4",
-                            "date de changement 5", "OT", "Compteur de changement 5", "date de changement 6", "OT",
-                            "Compteur de changement 6", "compteur actuel S45/2024", "PERFORMANCE"],
-                "numeric_cols": ["Compteur de changement 1", "Compteur de changement 2", "Compteur de changement 3",
-                                 "Compteur de changement 4", "Compteur de changement 5", "Compteur de changement 6",
-                                 "compteur actuel S45/2024", "PERFORMANCE"],
-                "filter_col": None
-            },
-            "Programme 2025 BG": {
-                "headers": ["Type d'engin", "Equipement", "Sous-ensemble", "Qte v1", "Qte v2", "Qte v3",
-                            "Devis unitaire", "Cout V2", "Cout V3", "Commentaire", "SECTION AFFECTATION"],
-                "numeric_cols": ["Qte v1", "Qte v2", "Qte v3", "Devis unitaire", "Cout V2", "Cout V3"],
-                "filter_col": "SECTION AFFECTATION"
-            },
-            "Programme 2025 YSF": {
-                "headers": ["Equipement", "Engin", "REP", "Sous ensemble", "Seuil HM", "HM cumulés",
-                            "Devis unitaire", "Qte [V1]", "Cout V1", "Qte [V2]", "Cout [V2]", "OBS",
-                            "SECTION AFFECTATION"],
-                "numeric_cols": ["Seuil HM", "HM cumulés", "Devis unitaire", "Qte [V1]", "Cout V1", "Qte [V2]", "Cout [V2]"],
-                "filter_col": "SECTION AFFECTATION"
-            }
-        }
-
-        # Preprocess sheets to extract relevant sections
+        # Sheets are parsed in the background and published as each one is ready
+        self.sheet_configs = SHEET_CONFIGS
         self.processed_data = {}
-        for sheet_name, df in self.excel_data.items():
-            self.processed_data[sheet_name] = self.preprocess_sheet(df, sheet_name)
+        self.sheet_indexes = {}
+        self.sheet_stats = {}
+        self.budget = BudgetRollup(self.processed_data)
+        self.alert_engine = AlertEngine()
+        self.fleet_alerts = FleetAlerts(self.processed_data, self.alert_engine)
+        self.sheet_names = []
+        # Workshop sheets, only used to tag the Cartographie rows with their atelier
+        self.atelier_data = {}
+
+        # Edits are queued and written to the workbook in the background
+        self.save_queue = SaveQueue(WORKBOOK_PATH, parent=self)
+        self.save_queue.status.connect(self.statusBar().showMessage)
+        # Every save and every newly seen workbook is snapshotted for the weekly history
+        self.history = HistoryStore(history_path(WORKBOOK_PATH))
+        self.workbook_loaded = False
+        self.save_queue.saved.connect(lambda count: self.snapshot_history("save"))
+        self.save_queue.conflicts.connect(self.on_save_conflicts)
+        # Workflow checklist state per sous-ensemble, saved on every click
+        self.workflow = WorkflowStore(workflow_path(WORKBOOK_PATH))
+        self.workflow_analytics = WorkflowAnalytics(self.workflow)
+        self.restoring_workflow = False
+        # Opened on first use, once the loader has imported the workbook if needed
+        self.database = None
 
         # Current sheet data
         self.df = None
@@ -162,69 +141,165 @@ class EquipmentApp(QMainWindow):
         self.tabs.addTab(self.tab_dashboard, "Dashboard")
         self.setup_dashboard_tab()
 
-        # Tab 3: Dashboard
+        # Tab 4: Replacement Forecast
+        self.tab_forecast = QWidget()
+        self.tabs.addTab(self.tab_forecast, "Replacement Forecast")
+        self.setup_forecast_tab()
+
+        # Tab 5: Budget
+        self.tab_budget = QWidget()
+        self.tabs.addTab(self.tab_budget, "Budget")
+        self.setup_budget_tab()
+
+        # Tab 6: Workflow
         self.tab_workflow = QWidget()
         self.tabs.addTab(self.tab_workflow, "Workflow")
         self.setup_workflow_tab()
 
-
-    def preprocess_sheet(self, df, sheet_name):
-        if df.empty:
-            print(f"Sheet {sheet_name} is empty. Skipping preprocessing.")
-            return pd.DataFrame()
-
-        # Check if the sheet is in the configuration
-        if sheet_name not in self.sheet_configs:
-            print(f"Unknown sheet: {sheet_name}. Skipping preprocessing.")
-            return pd.DataFrame()
-
-        config = self.sheet_configs[sheet_name]
-        target_headers = config["headers"]
-
-        # Find the header row by checking for a row that contains all target headers
-        header_row = None
-        for i in range(min(10, len(df))):  # Check up to the first 10 rows to skip metadata
-            row = df.iloc[i].astype(str).str.strip()
-            # Clean the row values to handle special characters and newlines
-            row = row.str.replace(r'\n', ' ').str.replace(r'\s+', ' ', regex=True)
-            if all(any(col in val for val in row.values) for col in target_headers):
-                header_row = i
+        # Hidden diagnostics panel with the hot-path timings
+        self.diagnostics = None
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self).activated.connect(self.show_diagnostics)
+
+        self.start_loading()
+
+    def show_diagnostics(self):
+        if self.diagnostics is None:
+            self.diagnostics = DiagnosticsDialog(os.path.dirname(os.path.abspath(WORKBOOK_PATH)),
+                                                 self.processed_data, self)
+            self.diagnostics.dumped.connect(
+                lambda paths: self.statusBar().showMessage(f"Diagnostics written to {', '.join(paths)}", 10000))
+        self.diagnostics.refresh()
+        self.diagnostics.show()
+        self.diagnostics.raise_()
+
+    def start_loading(self):
+        self.statusBar().showMessage(f"Loading {WORKBOOK_PATH}...")
+        ingestor = SqlIngestor(DATABASE_PATH, WORKBOOK_PATH, self.sheet_configs) if DATABASE_PATH else None
+        self.loader = WorkbookLoader(WORKBOOK_PATH, self.sheet_configs, self, ingestor)
+        self.loader.sheets_listed.connect(self.on_sheets_listed)
+        self.loader.sheet_loaded.connect(self.on_sheet_loaded)
+        self.loader.failed.connect(self.on_load_failed)
+        self.loader.finished.connect(self.on_load_finished)
+        self.atelier_loader = WorkbookLoader(ATELIER_WORKBOOK_PATH, ATELIER_SHEET_CONFIGS, self)
+        self.atelier_loader.sheet_loaded.connect(self.on_atelier_loaded)
+        self.atelier_loader.failed.connect(lambda message: self.statusBar().showMessage(message, 5000))
+        self.atelier_loader.finished.connect(self.join_ateliers)
+        self.loads_pending = 2
+        self.loader.start()
+        self.atelier_loader.start()
+
+    def sheet_combos(self):
+        # Each sheet combo with the handler that displays a sheet once it is ready
+        return [(self.sheet_combo_equipment, self.load_sheet_equipment),
+                (self.sheet_combo_update, self.load_sheet_update),
+                (self.sheet_combo_dashboard, lambda sheet_name: self.update_dashboard()),
+                (self.sheet_combo_workflow, self.load_sheet_workflow)]
+
+    def on_sheets_listed(self, sheet_names):
+        # List every sheet straight away, disabled until its data arrives
+        self.sheet_names = sheet_names
+        for combo, _ in self.sheet_combos():
+            combo.blockSignals(True)
+            combo.addItems(sheet_names)
+            for i in range(combo.count()):
+                combo.model().item(i).setEnabled(False)
+            combo.blockSignals(False)
+
+    def on_sheet_loaded(self, sheet_name, df, index):
+        self.processed_data[sheet_name] = df
+        self.sheet_indexes[sheet_name] = index
+        if sheet_name in BUDGET_LAYOUTS:
+            self.budget.invalidate()
+        self.statusBar().showMessage(
+            f"Loading {WORKBOOK_PATH}... {len(self.processed_data)}/{len(self.sheet_names)} sheets ready")
+        for combo, load in self.sheet_combos():
+            index = combo.findText(sheet_name)
+            if index >= 0:
+                combo.model().item(index).setEnabled(True)
+            if load and combo.currentText() == sheet_name:
+                load(sheet_name)
+
+    def on_load_failed(self, message):
+        self.statusBar().showMessage(message)
+        QMessageBox.critical(self, "Error", message)
+
+    def on_load_finished(self):
+        self.workbook_loaded = bool(self.processed_data)
+        if self.workbook_loaded:
+            self.fleet_alerts.refresh()
+        self.update_alerts()
+        self.update_forecast()
+        self.update_budget()
+        self.snapshot_history("import")
+        self.join_ateliers()
+        self.update_workflow_stats()
+        if self.processed_data:
+            self.statusBar().showMessage(f"Loaded {len(self.processed_data)} sheets from {WORKBOOK_PATH}", 5000)
+
+    def snapshot_history(self, source):
+        # History is a convenience: a failure is reported, never fatal
+        if not self.workbook_loaded:
+            return
+        try:
+            if source == "import":
+                self.history.import_workbook(WORKBOOK_PATH, self.processed_data)
+            else:
+                self.history.snapshot(self.processed_data, week_start(datetime.date.today()), source,
+                                      os.path.basename(WORKBOOK_PATH))
+        except Exception as e:
+            self.statusBar().showMessage(f"Could not record history: {e}", 5000)
+
+    def on_atelier_loaded(self, sheet_name, df, index):
+        if not df.empty:
+            self.atelier_data[sheet_name] = df
+
+    def join_ateliers(self):
+        # Called as each loader finishes and acts after the second one: the
+        # frames are only modified once the loaders (and their cache writes)
+        # are done with them
+        self.loads_pending -= 1
+        if self.loads_pending > 0 or not self.atelier_data:
+            return
+        index = AtelierIndex(self.atelier_data)
+        for sheet_name in CARTOGRAPHIE_SHEETS:
+            if sheet_name in self.processed_data and not self.processed_data[sheet_name].empty:
+                attach_ateliers(self.processed_data[sheet_name], index)
+        if self.sheet_combo_equipment.currentText() in CARTOGRAPHIE_SHEETS:
+            self.load_sheet_equipment(self.sheet_combo_equipment.currentText())
+        self.update_dashboard()
+
+    def closeEvent(self, event):
+        # Nothing queued by the Update Data tab may be lost on exit: the
+        # window stays open until the edits are written or the user cancels
+        while True:
+            try:
+                self.save_queue.flush_now()
                 break
+            except Exception as e:
+                answer = QMessageBox.critical(
+                    self, "Error",
+                    f"Failed to save {len(self.save_queue.pending)} change(s): {e}\n\n"
+                    "Close the workbook in Excel and retry, or cancel to keep the application open.",
+                    QMessageBox.StandardButton.Retry | QMessageBox.StandardButton.Cancel)
+                if answer != QMessageBox.StandardButton.Retry:
+                    event.ignore()
+                    return
+        # Let the loaders finish the sheet they are parsing before the window goes away
+        for loader in [self.loader, self.atelier_loader]:
+            loader.requestInterruption()
+            loader.wait()
+        self.history.close()
+        self.workflow.close()
+        if self.database is not None:
+            self.database.close()
+        # Timings recorded this session (ENGINS_PROFILE or --profile) are kept
+        if profiling.enabled() and profiling.records():
+            try:
+                profiling.dump(os.path.dirname(os.path.abspath(WORKBOOK_PATH)))
+            except OSError as e:
+                print(f"Warning: could not write the profiling dump: {e}")
+        super().closeEvent(event)
 
-        if header_row is not None:
-            # Read the sheet again, starting from the header row
-            df_section = pd.read_excel("ENGINS.xlsx", sheet_name=sheet_name, skiprows=header_row)
-            # Clean column names
-            df_section.columns = df_section.columns.str.strip().str.replace(r'\n', ' ').str.replace(r'\s+', ' ', regex=True)
-            # Ensure all expected headers are present, fill missing ones with NaN
-            for col in target_headers:
-                if col not in df_section.columns:
-                    df_section[col] = pd.NA
-            # Reorder columns to match target_headers
-            df_section = df_section[target_headers]
-            # Drop rows where the first column is NaN
-            df_section = df_section.dropna(subset=[target_headers[0]], how="all")
-            # Convert numeric columns to appropriate types
-            for col in config["numeric_cols"]:
-                if col in df_section.columns:
-                    df_section[col] = pd.to_numeric(df_section[col], errors='coerce').fillna(0)
-
-            # Add a Section column for BG and YSF in specific sheets
-            if sheet_name in ["Cartographie moteur", "Cartographie transmission", "Cartographie Engin"]:
-                df_section['Section'] = pd.NA
-                current_section = None
-                for idx, row in df_section.iterrows():
-                    if row['Equipement'] in ['BG', 'YSF']:
-                        current_section = row['Equipement']
-                    else:
-                        df_section.at[idx, 'Section'] = current_section
-                # Drop rows that are section headers (BG or YSF)
-                df_section = df_section[~df_section['Equipement'].isin(['BG', 'YSF'])]
-
-            return df_section
-        else:
-            print(f"Could not find the expected section in sheet {sheet_name}.")
-            return pd.DataFrame()
 
     # Tab 1: Equipment Overview
     def setup_equipment_tab(self):
@@ -265,7 +340,6 @@ class EquipmentApp(QMainWindow):
                 border: 1px solid #0984e3;
             }
         """)
-        self.sheet_combo_equipment.addItems(list(self.processed_data.keys()))
         self.sheet_combo_equipment.currentTextChanged.connect(self.load_sheet_equipment)
         sheet_layout.addWidget(self.sheet_combo_equipment)
         layout.addWidget(sheet_frame)
@@ -309,6 +383,23 @@ class EquipmentApp(QMainWindow):
         section_layout.addWidget(self.section_combo)
         layout.addWidget(section_frame)
 
+        # Atelier filter frame (for the Cartographie sheets)
+        atelier_frame = QFrame()
+        atelier_frame.setStyleSheet(section_frame.styleSheet())
+        atelier_layout = QHBoxLayout(atelier_frame)
+        atelier_label = QLabel("Filter by Atelier:")
+        atelier_label.setFont(QFont("Segoe UI", 12))
+        atelier_label.setStyleSheet("color: #2d3436;")
+        atelier_layout.addWidget(atelier_label)
+
+        self.atelier_combo = QComboBox()
+        self.atelier_combo.setFont(QFont("Segoe UI", 12))
+        self.atelier_combo.setStyleSheet(self.section_combo.styleSheet())
+        self.atelier_combo.addItem("All")
+        self.atelier_combo.currentTextChanged.connect(self.update_equipment_table)
+        atelier_layout.addWidget(self.atelier_combo)
+        layout.addWidget(atelier_frame)
+
         # Filter frame
         filter_frame = QFrame()
         filter_frame.setStyleSheet("""
@@ -348,20 +439,22 @@ class EquipmentApp(QMainWindow):
         filter_layout.addWidget(self.filter_combo)
         layout.addWidget(filter_frame)
 
-        # Table to display equipment data
-        self.equipment_table = QTableWidget()
+        # Table to display equipment data, served lazily by a model over the sheet's columns
+        self.equipment_model = DataFrameModel(self)
+        self.equipment_table = QTableView()
+        self.equipment_table.setModel(self.equipment_model)
         self.equipment_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #ffffff;
                 border: 1px solid #dfe6e9;
                 border-radius: 5px;
                 gridline-color: #dfe6e9;
                 color: #2d3436;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
             }
-            QTableWidget::item:alternate {
+            QTableView::item:alternate {
                 background-color: #f5f6fa;
             }
             QHeaderView::section {
@@ -373,6 +466,10 @@ class EquipmentApp(QMainWindow):
             }
         """)
         self.equipment_table.setAlternatingRowColors(True)
+        self.equipment_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        # Fixed row heights and a bounded sample for column widths keep large sheets cheap
+        self.equipment_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.equipment_table.horizontalHeader().setResizeContentsPrecision(200)
         layout.addWidget(self.equipment_table)
 
         # Load initial sheet
@@ -380,65 +477,67 @@ class EquipmentApp(QMainWindow):
             self.load_sheet_equipment(self.sheet_combo_equipment.currentText())
 
     def load_sheet_equipment(self, sheet_name):
-        if sheet_name:
-            self.df = self.processed_data[sheet_name]
-            self.current_sheet_config = self.sheet_configs.get(sheet_name, {})
-            if not self.df.empty:
-                # Update section dropdown for Cartographie sheets
-                if sheet_name in ["Cartographie moteur", "Cartographie transmission", "Cartographie Engin"] and 'Section' in self.df.columns:
-                    section_values = sorted(self.df['Section'].dropna().unique())
-                    self.section_combo.clear()
-                    self.section_combo.addItem("All")
-                    self.section_combo.addItems([str(val) for val in section_values if val in ["BG", "YSF"]])
-                else:
-                    self.section_combo.clear()
-                    self.section_combo.addItem("All")
+        if sheet_name in self.processed_data:
+            df = self.processed_data[sheet_name]
+            config = self.sheet_configs.get(sheet_name, {})
+            if not df.empty:
+                # Repopulate the filter combos without refreshing the table for each change
+                self.section_combo.blockSignals(True)
+                self.atelier_combo.blockSignals(True)
+                self.filter_combo.blockSignals(True)
+
+                # Update section dropdown for sheets split into sections
+                self.section_combo.clear()
+                self.section_combo.addItem("All")
+                if 'Section' in df.columns:
+                    section_values = sorted(df['Section'].dropna().unique())
+                    for val in section_values:
+                        self.section_combo.addItem(str(val), val)
+
+                # Update atelier dropdown once the workshops have been joined
+                self.atelier_combo.clear()
+                self.atelier_combo.addItem("All")
+                if ATELIER_COL in df.columns:
+                    for val in sorted(df[ATELIER_COL].dropna().unique()):
+                        self.atelier_combo.addItem(str(val), val)
 
                 # Update filter dropdown based on the filter column
-                filter_col = self.current_sheet_config.get("filter_col")
-                if filter_col and filter_col in self.df.columns:
-                    filter_values = sorted(self.df[filter_col].dropna().unique())
-                    self.filter_combo.clear()
-                    self.filter_combo.addItem("All")
-                    self.filter_combo.addItems([str(val) for val in filter_values])
-                else:
-                    self.filter_combo.clear()
-                    self.filter_combo.addItem("All")
-                self.update_equipment_table()
+                self.filter_combo.clear()
+                self.filter_combo.addItem("All")
+                filter_col = config.get("filter_col")
+                if filter_col and filter_col in df.columns:
+                    filter_values = sorted(df[filter_col].dropna().unique())
+                    for val in filter_values:
+                        self.filter_combo.addItem(str(val), val)
+
+                self.section_combo.blockSignals(False)
+                self.atelier_combo.blockSignals(False)
+                self.filter_combo.blockSignals(False)
+
+                columns = frame_columns(config.get("headers", []))
+                if ATELIER_COL in df.columns:
+                    columns.append(ATELIER_COL)
+                with span("equipment table", sheet_name):
+                    self.equipment_model.set_frame(df, columns)
+                    self.update_equipment_table()
+                    self.equipment_table.resizeColumnsToContents()
             else:
                 QMessageBox.critical(self, "Error", f"No valid data found in sheet {sheet_name}.")
 
     def update_equipment_table(self):
-        if self.df is None:
+        df = self.equipment_model.df
+        if df is None:
             return
 
-        # Filter by section
-        section_value = self.section_combo.currentText()
-        filtered_df = self.df
-        if section_value != "All" and 'Section' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['Section'] == section_value]
-
-        # Filter by additional filter column
-        filter_value = self.filter_combo.currentText()
-        filter_col = self.current_sheet_config.get("filter_col")
-        if filter_value != "All" and filter_col and filter_col in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df[filter_col] == filter_value]
-
-        # Set up table
-        self.equipment_table.clear()
-        columns = self.current_sheet_config.get("headers", [])
-        self.equipment_table.setColumnCount(len(columns))
-        self.equipment_table.setHorizontalHeaderLabels(columns)
-        self.equipment_table.setRowCount(len(filtered_df))
-
-        # Populate table
-        for row_idx, (_, row) in enumerate(filtered_df.iterrows()):
-            for col_idx, col in enumerate(columns):
-                item = QTableWidgetItem(str(row.get(col, "")))
-                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)  # Make cells read-only
-                self.equipment_table.setItem(row_idx, col_idx, item)
-
-        self.equipment_table.resizeColumnsToContents()
+        # Section, atelier and filter column combine into a single mask over the sheet;
+        # the combos carry the original cell values as item data ("All" has none)
+        config = self.sheet_configs.get(self.sheet_combo_equipment.currentText(), {})
+        filters = {"Section": self.section_combo.currentData(), ATELIER_COL: self.atelier_combo.currentData()}
+        filter_col = config.get("filter_col")
+        if filter_col:
+            filters[filter_col] = self.filter_combo.currentData()
+        with span("filter", self.sheet_combo_equipment.currentText()):
+            self.equipment_model.set_mask(filter_mask(df, filters))
 
     # Tab 2: Update Data
     def setup_update_tab(self):
@@ -479,7 +578,6 @@ class EquipmentApp(QMainWindow):
                 border: 1px solid #0984e3;
             }
         """)
-        self.sheet_combo_update.addItems(list(self.processed_data.keys()))
         self.sheet_combo_update.currentTextChanged.connect(self.load_sheet_update)
         sheet_layout.addWidget(self.sheet_combo_update)
         layout.addWidget(sheet_frame)
@@ -594,29 +692,49 @@ class EquipmentApp(QMainWindow):
             }
         """)
         save_button.clicked.connect(self.save_data)
-        layout.addWidget(save_button, alignment=Qt.AlignmentFlag.AlignCenter)
+
+        # Queued edits are written in the background; "Save All" writes them now
+        save_all_button = QPushButton("Save All")
+        save_all_button.setFont(QFont("Segoe UI", 12))
+        save_all_button.setStyleSheet(save_button.styleSheet())
+        save_all_button.clicked.connect(self.save_queue.flush)
+
+        buttons_row = QHBoxLayout()
+        buttons_row.addStretch()
+        buttons_row.addWidget(save_button)
+        if DATABASE_PATH:
+            # Saves go straight to the database; the workbook is written on demand
+            export_button = QPushButton("Export to Excel")
+            export_button.setFont(QFont("Segoe UI", 12))
+            export_button.setStyleSheet(save_button.styleSheet())
+            export_button.clicked.connect(self.export_workbook)
+            buttons_row.addWidget(export_button)
+        else:
+            buttons_row.addWidget(save_all_button)
+        buttons_row.addStretch()
+        layout.addLayout(buttons_row)
 
         # Load initial sheet
         if self.sheet_combo_update.currentText():
             self.load_sheet_update(self.sheet_combo_update.currentText())
 
     def load_sheet_update(self, sheet_name):
-        if sheet_name:
+        if sheet_name in self.processed_data:
             self.df = self.processed_data[sheet_name]
+            self.index = self.sheet_indexes[sheet_name]
             self.current_sheet_config = self.sheet_configs.get(sheet_name, {})
             if not self.df.empty:
-                # Update equipment dropdown
-                equipment_col = "Equipement" if "Equipement" in self.df.columns else "équipement"
-                equipment_list = sorted(self.df[equipment_col].dropna().unique())
+                self.equipment_combo.blockSignals(True)
                 self.equipment_combo.clear()
-                self.equipment_combo.addItems([str(e) for e in equipment_list])
+                self.equipment_combo.blockSignals(False)
                 self.sous_ensemble_combo.clear()
 
                 # Update data fields dynamically based on numeric columns
-                for i in reversed(range(self.data_layout.count())):
-                    widget = self.data_layout.itemAt(i).widget()
-                    if widget:
-                        widget.deleteLater()
+                # (each field is a row layout holding a label and an entry)
+                while self.data_layout.count():
+                    row_layout = self.data_layout.takeAt(0).layout()
+                    while row_layout is not None and row_layout.count():
+                        row_layout.takeAt(0).widget().deleteLater()
 
                 self.labels.clear()
                 numeric_cols = self.current_sheet_config.get("numeric_cols", [])
@@ -649,30 +767,44 @@ class EquipmentApp(QMainWindow):
                         self.data_layout.addLayout(row_layout)
 
                 self.clear_data_fields()
+
+                # Update equipment dropdown once the fields match the sheet
+                self.equipment_combo.addItems(self.index.equipments)
             else:
                 QMessageBox.critical(self, "Error", f"No valid data found in sheet {sheet_name}.")
 
     def update_sous_ensemble(self, equipment):
         if equipment and self.df is not None:
-            sous_ensemble_col = "Sous-ensemble" if "Sous-ensemble" in self.df.columns else "Sous ensemble"
-            if sous_ensemble_col in self.df.columns:
-                equipment_col = "Equipement" if "Equipement" in self.df.columns else "équipement"
-                sous_ensemble_list = sorted(self.df[self.df[equipment_col] == equipment][sous_ensemble_col].dropna().unique())
+            if self.index.sous_ensemble_col:
                 self.sous_ensemble_combo.clear()
-                self.sous_ensemble_combo.addItems([str(s) for s in sous_ensemble_list])
                 self.clear_data_fields()
+                self.sous_ensemble_combo.addItems(self.index.sous_ensemble_list(equipment))
 
     def display_data(self, sous_ensemble):
         equipment = self.equipment_combo.currentText()
         if equipment and sous_ensemble and self.df is not None:
-            equipment_col = "Equipement" if "Equipement" in self.df.columns else "équipement"
-            sous_ensemble_col = "Sous-ensemble" if "Sous-ensemble" in self.df.columns else "Sous ensemble"
-            if sous_ensemble_col in self.df.columns:
-                row = self.df[(self.df[equipment_col] == equipment) &
-                              (self.df[sous_ensemble_col] == sous_ensemble)]
-                if not row.empty:
-                    for col, entry in self.labels.items():
-                        entry.setText(str(row[col].values[0]))
+            row = self.index.lookup(equipment, sous_ensemble)
+            if row is not None:
+                if DATABASE_PATH:
+                    self.pull_row(self.sheet_combo_update.currentText(), row)
+                for col, entry in self.labels.items():
+                    entry.setText(str(self.df.at[row, col]))
+
+    def pull_row(self, sheet_name, row):
+        # With a shared database, the row about to be edited is read again so
+        # the form starts from what other instances saved
+        try:
+            _, current = self.sql_database().read_row(sheet_name, row, list(self.labels))
+        except Exception as e:
+            self.statusBar().showMessage(f"Could not refresh from {DATABASE_PATH}: {e}", 5000)
+            return
+        changed = False
+        for col, value in current.items():
+            if not same_value(self.df.at[row, col], value):
+                self.set_cell(sheet_name, row, col, cell_number(value))
+                changed = True
+        if changed:
+            self.refresh_after_edit(sheet_name)
 
     def clear_data_fields(self):
         for entry in self.labels.values():
@@ -684,37 +816,54 @@ class EquipmentApp(QMainWindow):
         sous_ensemble = self.sous_ensemble_combo.currentText()
 
         if sheet_name and equipment and sous_ensemble and self.df is not None:
-            equipment_col = "Equipement" if "Equipement" in self.df.columns else "équipement"
-            sous_ensemble_col = "Sous-ensemble" if "Sous-ensemble" in self.df.columns else "Sous ensemble"
-            if sous_ensemble_col in self.df.columns:
-                idx = self.df[(self.df[equipment_col] == equipment) &
-                              (self.df[sous_ensemble_col] == sous_ensemble)].index
-                if not idx.empty:
-                    # Validate inputs
+            if self.index.sous_ensemble_col:
+                row = self.index.lookup(equipment, sous_ensemble)
+                if row is not None:
+                    # Validate inputs before touching the data
+                    values = {}
                     for col, entry in self.labels.items():
                         try:
                             value = float(entry.text()) if entry.text() else 0
-                            if value < 0:
-                                QMessageBox.critical(self, "Error", f"Value for {col} cannot be negative.")
-                                return
-                            self.df.at[idx[0], col] = value
                         except ValueError:
                             QMessageBox.critical(self, "Error", f"Invalid value for {col}. Please enter a number.")
                             return
-
-                    try:
-                        with pd.ExcelWriter("ENGINS.xlsx", engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-                            for sheet, sheet_data in self.processed_data.items():
-                                if sheet == sheet_name:
-                                    # Remove the temporary 'Section' column before saving
-                                    sheet_data = self.df.drop(columns=['Section'], errors='ignore')
-                                sheet_data.to_excel(writer, sheet_name=sheet, index=False)
-                        QMessageBox.information(self, "Success", "Data saved successfully!")
-                        # Refresh the equipment table and dashboard
-                        self.load_sheet_equipment(self.sheet_combo_equipment.currentText())
-                        self.update_dashboard()
-                    except Exception as e:
-                        QMessageBox.critical(self, "Error", f"Failed to save data: {e}")
+                        if value < 0:
+                            QMessageBox.critical(self, "Error", f"Value for {col} cannot be negative.")
+                            return
+                        values[col] = value
+
+                    # Only the cells whose value changed are saved, each with the
+                    # value it replaces so edits made meanwhile by another
+                    # instance are merged instead of overwritten
+                    changes = {col: (self.df.at[row, col], value) for col, value in values.items()
+                               if self.df.at[row, col] != value}
+                    if not changes:
+                        return
+                    with span("save", sheet_name):
+                        conflicts = {}
+                        if DATABASE_PATH:
+                            try:
+                                _, _, conflicts = self.sql_database().update_cells(sheet_name, row, changes)
+                            except Exception as e:
+                                QMessageBox.critical(self, "Error", f"Failed to save data: {e}")
+                                return
+                        for col, (old, value) in changes.items():
+                            if not DATABASE_PATH:
+                                cell_row, cell_column = cell_coordinates(self.df, row, col)
+                                self.save_queue.enqueue((sheet_name, equipment, sous_ensemble, col),
+                                                        sheet_name, cell_row, cell_column, old, value)
+                            self.set_cell(sheet_name, row, col, cell_number(conflicts.get(col, value)))
+
+                    with span("refresh after save", sheet_name):
+                        self.refresh_after_edit(sheet_name)
+                    if DATABASE_PATH:
+                        if len(conflicts) < len(changes):
+                            self.statusBar().showMessage(f"Saved to {DATABASE_PATH}", 5000)
+                            self.snapshot_history("save")
+                        if conflicts:
+                            self.display_data(sous_ensemble)
+                            self.show_conflicts([(sheet_name, equipment, sous_ensemble, col, changes[col][1], current)
+                                                 for col, current in conflicts.items()])
                 else:
                     QMessageBox.critical(self, "Error", "Selected equipment and sous-ensemble not found in data.")
             else:
@@ -722,6 +871,78 @@ class EquipmentApp(QMainWindow):
         else:
             QMessageBox.critical(self, "Error", "Please select a sheet, equipment, and sous-ensemble.")
 
+    def set_cell(self, sheet_name, row, col, value):
+        df = self.processed_data[sheet_name]
+        old = df.at[row, col]
+        set_value(df, row, col, value)
+        if sheet_name in self.sheet_stats:
+            self.sheet_stats[sheet_name].apply_edit(row, col, old)
+        else:
+            self.fleet_alerts.apply_edit(sheet_name, row, col)
+
+    def refresh_after_edit(self, sheet_name):
+        # Refresh the equipment table, forecast, budget and dashboard
+        self.load_sheet_equipment(self.sheet_combo_equipment.currentText())
+        if sheet_name in PERFORMANCE_SHEETS:
+            self.fleet = None
+            self.update_forecast()
+        if sheet_name in BUDGET_LAYOUTS:
+            self.budget.invalidate()
+            self.update_budget()
+        if sheet_name in CARTOGRAPHIE_SHEETS:
+            self.update_workflow_stats()
+        self.update_dashboard()
+
+    def on_save_conflicts(self, conflicts):
+        # Cells another instance changed in the workbook before our queued
+        # edits reached it, and cells holding a formula: the workbook's
+        # values are kept and shown here. A formula cell goes back to the
+        # value it showed before the edit.
+        shown = []
+        for (sheet_name, equipment, sous_ensemble, col), value, current, base in conflicts:
+            row = self.sheet_indexes[sheet_name].lookup(equipment, sous_ensemble)
+            if row is not None:
+                self.set_cell(sheet_name, row, col, cell_number(base if is_formula(current) else current))
+            shown.append((sheet_name, equipment, sous_ensemble, col, value, current))
+        for sheet_name in dict.fromkeys(conflict[0] for conflict in shown):
+            self.refresh_after_edit(sheet_name)
+        self.display_data(self.sous_ensemble_combo.currentText())
+        self.show_conflicts(shown)
+
+    def show_conflicts(self, conflicts):
+        # conflicts: (sheet, equipment, sous-ensemble, column, our value, their value)
+        lines = [f"{sheet_name}: {equipment} - {sous_ensemble}, {col}: {cell_number(value):g} not saved, "
+                 + (f"the cell holds a formula ({current})" if is_formula(current)
+                    else f"now {cell_number(current):g}")
+                 for sheet_name, equipment, sous_ensemble, col, value, current in conflicts[:20]]
+        if len(conflicts) > 20:
+            lines.append(f"... and {len(conflicts) - 20} more")
+        QMessageBox.warning(self, "Conflicting changes",
+                            "These values were changed by someone else since they were loaded, or are "
+                            "computed by a formula; the workbook's values were kept:\n\n" + "\n".join(lines))
+
+    def sql_database(self):
+        if self.database is None:
+            self.database = SqlBackend(DATABASE_PATH)
+        return self.database
+
+    def export_workbook(self):
+        try:
+            count, kept = self.sql_database().export_workbook(WORKBOOK_PATH, self.sheet_configs)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to export data: {e}")
+            return
+        self.statusBar().showMessage(f"Exported {count} cells to {WORKBOOK_PATH}", 5000)
+        if kept:
+            # The workbook computes these cells; they are not replaced by values
+            lines = [f"{sheet_name}: {equipment} - {sous_ensemble}, {col}"
+                     for sheet_name, equipment, sous_ensemble, col in kept[:20]]
+            if len(kept) > 20:
+                lines.append(f"... and {len(kept) - 20} more")
+            QMessageBox.warning(self, "Formulas kept",
+                                f"These cells hold a formula in {WORKBOOK_PATH} and were not overwritten; "
+                                f"the workbook computes their values:\n\n" + "\n".join(lines))
+
     # Tab 3: Dashboard
     def setup_dashboard_tab(self):
         layout = QVBoxLayout(self.tab_dashboard)
@@ -761,7 +982,6 @@ class EquipmentApp(QMainWindow):
                 border: 1px solid #0984e3;
             }
         """)
-        self.sheet_combo_dashboard.addItems(list(self.processed_data.keys()))
         self.sheet_combo_dashboard.currentTextChanged.connect(self.update_dashboard)
         sheet_layout.addWidget(self.sheet_combo_dashboard)
         layout.addWidget(sheet_frame)
@@ -791,24 +1011,36 @@ class EquipmentApp(QMainWindow):
         dashboard_layout.addWidget(self.stats_text)
 
         # Alerts
-        self.alerts_label = QLabel("Alerts:")
+        self.alerts_label = QLabel("Fleet Alerts:")
         self.alerts_label.setFont(QFont("Segoe UI", 14, QFont.Weight.Bold))
         self.alerts_label.setStyleSheet("color: #2d3436; margin-top: 10px; margin-bottom: 5px;")
         dashboard_layout.addWidget(self.alerts_label)
 
-        self.alerts_area = QScrollArea()
-        self.alerts_area.setWidgetResizable(True)
-        self.alerts_area.setStyleSheet("""
-            QScrollArea {
+        # One view over a model whose list is swapped on refresh; rows are
+        # coloured by a delegate instead of one styled label per alert
+        self.alerts_model = AlertListModel(self)
+        self.alerts_view = QTableView()
+        self.alerts_view.setModel(self.alerts_model)
+        self.alerts_view.setItemDelegate(SeverityDelegate(ALERT_COLOURS, self.alerts_view))
+        self.alerts_view.setFont(QFont("Segoe UI", 12))
+        self.alerts_view.setStyleSheet("""
+            QTableView {
                 background-color: #f5f6fa;
                 border: 1px solid #dfe6e9;
                 border-radius: 5px;
             }
         """)
-        self.alerts_widget = QWidget()
-        self.alerts_layout = QVBoxLayout(self.alerts_widget)
-        self.alerts_area.setWidget(self.alerts_widget)
-        dashboard_layout.addWidget(self.alerts_area)
+        self.alerts_view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.alerts_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.alerts_view.setShowGrid(False)
+        self.alerts_view.setSortingEnabled(True)
+        self.alerts_view.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        self.alerts_view.verticalHeader().hide()
+        self.alerts_view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.alerts_view.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.alerts_view.horizontalHeader().setResizeContentsPrecision(200)
+        self.alerts_view.horizontalHeader().setStretchLastSection(True)
+        dashboard_layout.addWidget(self.alerts_view)
 
         layout.addWidget(self.dashboard_frame)
 
@@ -816,11 +1048,118 @@ class EquipmentApp(QMainWindow):
         if self.sheet_combo_dashboard.currentText():
             self.update_dashboard()
 
+    # Tab 4: Replacement Forecast
+    def setup_forecast_tab(self):
+        layout = QVBoxLayout(self.tab_forecast)
+        layout.setSpacing(10)
+
+        # What-if scenario: scale the estimated lives and usage rates
+        scenario_frame = QFrame()
+        scenario_frame.setStyleSheet("""
+            QFrame {
+                background-color: #ffffff;
+                border: 1px solid #dfe6e9;
+                border-radius: 5px;
+                padding: 10px;
+            }
+        """)
+        scenario_layout = QHBoxLayout(scenario_frame)
+        self.life_factor_spin = QSpinBox()
+        self.usage_factor_spin = QSpinBox()
+        self.horizon_spin = QSpinBox()
+        for text, spin, minimum, maximum, value, suffix in [
+                ("Life:", self.life_factor_spin, 10, 300, 100, " %"),
+                ("Usage:", self.usage_factor_spin, 10, 300, 100, " %"),
+                ("Horizon:", self.horizon_spin, 1, 520, DEFAULT_HORIZON_WEEKS, " weeks")]:
+            label = QLabel(text)
+            label.setFont(QFont("Segoe UI", 12))
+            label.setStyleSheet("color: #2d3436;")
+            scenario_layout.addWidget(label)
+            spin.setFont(QFont("Segoe UI", 12))
+            spin.setRange(minimum, maximum)
+            spin.setValue(value)
+            spin.setSuffix(suffix)
+            spin.valueChanged.connect(self.update_forecast)
+            scenario_layout.addWidget(spin)
+        layout.addWidget(scenario_frame)
+
+        # Fleet summaries are the costly part; scenarios only redo the estimates
+        self.fleet = None
+        self.forecast_model = DataFrameModel(self)
+        self.forecast_table = QTableView()
+        self.forecast_table.setModel(self.forecast_model)
+        self.forecast_table.setStyleSheet(self.equipment_table.styleSheet())
+        self.forecast_table.setAlternatingRowColors(True)
+        self.forecast_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.forecast_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        layout.addWidget(self.forecast_table)
+
+    def update_forecast(self):
+        # The fleet table is built once the workbook is loaded: a scenario
+        # changed while loading would cache it over the sheets read so far
+        if not self.workbook_loaded:
+            return
+        if self.fleet is None:
+            self.fleet = fleet_table(self.processed_data)
+        forecast = weekly_forecast(self.fleet, self.horizon_spin.value(),
+                                   life_factor=self.life_factor_spin.value() / 100,
+                                   usage_factor=self.usage_factor_spin.value() / 100)
+        for col in ["week", "due date"]:
+            forecast[col] = forecast[col].dt.date
+        forecast = forecast.round(1)
+        self.forecast_model.set_frame(forecast, list(forecast.columns))
+
+    # Tab 5: Budget
+    def setup_budget_tab(self):
+        layout = QVBoxLayout(self.tab_budget)
+        layout.setSpacing(10)
+
+        group_frame = QFrame()
+        group_frame.setStyleSheet("""
+            QFrame {
+                background-color: #ffffff;
+                border: 1px solid #dfe6e9;
+                border-radius: 5px;
+                padding: 10px;
+            }
+        """)
+        group_layout = QHBoxLayout(group_frame)
+        group_label = QLabel("Group by:")
+        group_label.setFont(QFont("Segoe UI", 12))
+        group_label.setStyleSheet("color: #2d3436;")
+        group_layout.addWidget(group_label)
+
+        self.budget_group_combo = QComboBox()
+        self.budget_group_combo.setFont(QFont("Segoe UI", 12))
+        self.budget_group_combo.setStyleSheet(self.sheet_combo_dashboard.styleSheet())
+        self.budget_group_combo.addItems(BUDGET_GROUPS)
+        self.budget_group_combo.currentTextChanged.connect(self.update_budget)
+        group_layout.addWidget(self.budget_group_combo)
+        layout.addWidget(group_frame)
+
+        # Cost per group and version; pivots are cached until a Programme sheet changes
+        self.budget_model = DataFrameModel(self)
+        self.budget_table = QTableView()
+        self.budget_table.setModel(self.budget_model)
+        self.budget_table.setStyleSheet(self.equipment_table.styleSheet())
+        self.budget_table.setAlternatingRowColors(True)
+        self.budget_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.budget_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        layout.addWidget(self.budget_table)
+
+    def update_budget(self):
+        pivot = self.budget.pivot(self.budget_group_combo.currentText())
+        frame = pivot.reset_index()
+        for version in pivot.columns:
+            frame[version] = frame[version].map("{:,.2f}".format)
+        frame.columns = [str(col) for col in frame.columns]
+        self.budget_model.set_frame(frame, list(frame.columns))
+
     def setup_workflow_tab(self):
         layout = QVBoxLayout(self.tab_workflow)
         layout.setSpacing(15)
 
-        # Sheet selection for dashboard
+        # Sheet selection for workflow
         sheet_frame = QFrame()
         sheet_frame.setStyleSheet("""
             QFrame {
@@ -836,9 +1175,9 @@ class EquipmentApp(QMainWindow):
         sheet_label.setStyleSheet("color: #2d3436;")
         sheet_layout.addWidget(sheet_label)
 
-        self.sheet_combo_dashboard = QComboBox()
-        self.sheet_combo_dashboard.setFont(QFont("Segoe UI", 12))
-        self.sheet_combo_dashboard.setStyleSheet("""
+        self.sheet_combo_workflow = QComboBox()
+        self.sheet_combo_workflow.setFont(QFont("Segoe UI", 12))
+        self.sheet_combo_workflow.setStyleSheet("""
             QComboBox {
                 background-color: #ffffff;
                 border: 1px solid #dfe6e9;
@@ -854,9 +1193,23 @@ class EquipmentApp(QMainWindow):
                 border: 1px solid #0984e3;
             }
         """)
-        self.sheet_combo_dashboard.addItems(list(self.processed_data.keys()))
-        self.sheet_combo_dashboard.currentTextChanged.connect(self.update_dashboard)
-        sheet_layout.addWidget(self.sheet_combo_dashboard)
+        self.sheet_combo_workflow.currentTextChanged.connect(self.load_sheet_workflow)
+        sheet_layout.addWidget(self.sheet_combo_workflow)
+
+        # The checklist belongs to one sous-ensemble of one equipment
+        self.workflow_equipment_combo = QComboBox()
+        self.workflow_sous_ensemble_combo = QComboBox()
+        for text, combo in [("Equipment:", self.workflow_equipment_combo),
+                            ("Sous-ensemble:", self.workflow_sous_ensemble_combo)]:
+            label = QLabel(text)
+            label.setFont(QFont("Segoe UI", 12))
+            label.setStyleSheet("color: #2d3436;")
+            sheet_layout.addWidget(label)
+            combo.setFont(QFont("Segoe UI", 12))
+            combo.setStyleSheet(self.sheet_combo_workflow.styleSheet())
+            sheet_layout.addWidget(combo)
+        self.workflow_equipment_combo.currentTextChanged.connect(self.update_workflow_sous_ensembles)
+        self.workflow_sous_ensemble_combo.currentTextChanged.connect(lambda text: self.load_checklist_states())
         layout.addWidget(sheet_frame)
 
         # Checklist for revision process
@@ -880,7 +1233,7 @@ class EquipmentApp(QMainWindow):
         self.checklist_widgets = {}
         self.radio_groups = {}
 
-        # Helper function to create a step label
+        # Helper function to create a step, ticked once it is done
         def create_step_label(text, indent=0):
             step_frame = QFrame()
             step_frame.setStyleSheet("""
@@ -893,10 +1246,10 @@ class EquipmentApp(QMainWindow):
             """)
             step_layout = QHBoxLayout(step_frame)
             step_layout.setContentsMargins(indent * 20, 2, 2, 2)
-            label = QLabel(text)
-            label.setFont(QFont("Segoe UI", 11))
-            label.setStyleSheet("color: #2d3436; border: none;")
-            step_layout.addWidget(label)
+            check = QCheckBox(text)
+            check.setFont(QFont("Segoe UI", 11))
+            check.setStyleSheet("color: #2d3436; border: none;")
+            step_layout.addWidget(check)
             return step_frame
 
         # Helper function to create a decision point with Oui/Non radio buttons
@@ -938,7 +1291,7 @@ class EquipmentApp(QMainWindow):
         # Step 1: Expert S/E à réviser
         step1 = create_step_label("Expert S/E à réviser")
         checklist_layout.addWidget(step1)
-        self.checklist_widgets["Expert S/E à réviser"] = step1
+        self.checklist_widgets["Expert S/E à réviser"] = step1.findChild(QCheckBox)
 
         # Decision 1: Besoin en PDR?
         decision1, group1, oui1, non1 = create_decision_point("Besoin en PDR?")
@@ -950,7 +1303,8 @@ class EquipmentApp(QMainWindow):
         oui_layout1 = QVBoxLayout(oui_frame1)
         step2 = create_step_label("Identification S/E et besoin en PDR, équipement, logistique", indent=1)
         oui_layout1.addWidget(step2)
-        self.checklist_widgets["Identification S/E et besoin en PDR, équipement, logistique"] = step2
+        self.checklist_widgets["Identification S/E et besoin en PDR, équipement, logistique"] = \
+            step2.findChild(QCheckBox)
 
         # Decision 2: Besoin en MEC?
         decision2, group2, oui2, non2 = create_decision_point("Besoin en MEC?", indent=1)
@@ -962,7 +1316,7 @@ class EquipmentApp(QMainWindow):
         oui_layout2 = QVBoxLayout(oui_frame2)
         step3 = create_step_label("Récupération équipement", indent=2)
         oui_layout2.addWidget(step3)
-        self.checklist_widgets["Récupération équipement"] = step3
+        self.checklist_widgets["Récupération équipement"] = step3.findChild(QCheckBox)
         oui_layout1.addWidget(oui_frame2)
         oui_frame2.setVisible(False)  # Initially hidden
 
@@ -972,11 +1326,11 @@ class EquipmentApp(QMainWindow):
         # Processus de préparation (common path)
         step4 = create_step_label("Processus de préparation")
         checklist_layout.addWidget(step4)
-        self.checklist_widgets["Processus de préparation"] = step4
+        self.checklist_widgets["Processus de préparation"] = step4.findChild(QCheckBox)
 
         step5 = create_step_label("Récupération Bon sortie OT une fois la fiche de préparation est en position sur le tableau de préparation.")
         checklist_layout.addWidget(step5)
-        self.checklist_widgets["Récupération Bon sortie OT"] = step5
+        self.checklist_widgets["Récupération Bon sortie OT"] = step5.findChild(QCheckBox)
 
         # Decision 3: S/E critique?
         decision3, group3, oui3, non3 = create_decision_point("S/E critique (Moteur thermique, moteur de roue, redacteur, Tracks...)")
@@ -988,7 +1342,7 @@ class EquipmentApp(QMainWindow):
         oui_layout3 = QVBoxLayout(oui_frame3)
         step6 = create_step_label("Établissement d'un planning de révision", indent=1)
         oui_layout3.addWidget(step6)
-        self.checklist_widgets["Établissement d'un planning de révision"] = step6
+        self.checklist_widgets["Établissement d'un planning de révision"] = step6.findChild(QCheckBox)
         checklist_layout.addWidget(oui_frame3)
         oui_frame3.setVisible(False)  # Initially hidden
 
@@ -1002,18 +1356,18 @@ class EquipmentApp(QMainWindow):
         oui_layout4 = QVBoxLayout(oui_frame4)
         step7 = create_step_label("Préparation G.O.", indent=1)
         oui_layout4.addWidget(step7)
-        self.checklist_widgets["Préparation G.O."] = step7
+        self.checklist_widgets["Préparation G.O."] = step7.findChild(QCheckBox)
         checklist_layout.addWidget(oui_frame4)
         oui_frame4.setVisible(False)  # Initially hidden
 
         # Final steps
         step8 = create_step_label("Lancement des travaux de révision S/E")
         checklist_layout.addWidget(step8)
-        self.checklist_widgets["Lancement des travaux de révision S/E"] = step8
+        self.checklist_widgets["Lancement des travaux de révision S/E"] = step8.findChild(QCheckBox)
 
         step9 = create_step_label("Instruction de la carte d'identification du S/E et la déplacer dans la zone (En cours de révision)")
         checklist_layout.addWidget(step9)
-        self.checklist_widgets["Instruction de la carte d'identification"] = step9
+        self.checklist_widgets["Instruction de la carte d'identification"] = step9.findChild(QCheckBox)
 
         # Connect radio buttons to show/hide relevant sections
         oui1.toggled.connect(lambda checked: oui_frame1.setVisible(checked))
@@ -1021,99 +1375,156 @@ class EquipmentApp(QMainWindow):
         oui3.toggled.connect(lambda checked: oui_frame3.setVisible(checked))
         oui4.toggled.connect(lambda checked: oui_frame4.setVisible(checked))
 
+        # Every tick and answer is recorded for the selected sous-ensemble
+        for step, check in self.checklist_widgets.items():
+            check.toggled.connect(lambda checked, step=step: self.save_checklist_state(step, DONE if checked else None))
+        for step, (group, oui, non) in self.radio_groups.items():
+            oui.toggled.connect(lambda checked, step=step: checked and self.save_checklist_state(step, "Oui"))
+            non.toggled.connect(lambda checked, step=step: checked and self.save_checklist_state(step, "Non"))
+
         # Load previous states if any
+        self.checklist_frame = checklist_frame
         self.load_checklist_states()
 
         layout.addWidget(checklist_frame)
 
+        # Revision flow measured from the recorded transitions
+        self.workflow_stats_label = QLabel()
+        self.workflow_stats_label.setFont(QFont("Segoe UI", 11))
+        self.workflow_stats_label.setStyleSheet("color: #2d3436;")
+        self.workflow_stats_label.setWordWrap(True)
+        layout.addWidget(self.workflow_stats_label)
+
+    def load_sheet_workflow(self, sheet_name):
+        index = self.sheet_indexes.get(sheet_name)
+        self.workflow_equipment_combo.blockSignals(True)
+        self.workflow_equipment_combo.clear()
+        if index is not None and index.sous_ensemble_col:
+            self.workflow_equipment_combo.addItems(index.equipments)
+        self.workflow_equipment_combo.blockSignals(False)
+        self.update_workflow_sous_ensembles(self.workflow_equipment_combo.currentText())
+
+    def update_workflow_sous_ensembles(self, equipment):
+        index = self.sheet_indexes.get(self.sheet_combo_workflow.currentText())
+        self.workflow_sous_ensemble_combo.blockSignals(True)
+        self.workflow_sous_ensemble_combo.clear()
+        if index is not None and index.sous_ensemble_col and equipment:
+            self.workflow_sous_ensemble_combo.addItems(index.sous_ensemble_list(equipment))
+        self.workflow_sous_ensemble_combo.blockSignals(False)
+        self.load_checklist_states()
+
     def save_checklist_state(self, step, state):
-        # Placeholder for storage
-        if step in self.checklist_widgets:
-            self.checklist_widgets[step].setEnabled(bool(state))
-        elif step in self.radio_groups:
-            group, oui, non = self.radio_groups[step]
-            if state == "Oui":
-                oui.setChecked(True)
-            elif state == "Non":
-                non.setChecked(True)
+        # Ticks and answers set by load_checklist_states are not new transitions
+        if self.restoring_workflow:
+            return
+        equipment = self.workflow_equipment_combo.currentText()
+        sous_ensemble = self.workflow_sous_ensemble_combo.currentText()
+        if not equipment or not sous_ensemble:
+            return
+        try:
+            self.workflow.set_state(equipment, sous_ensemble, step, state)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to save workflow state: {e}")
+            return
+        self.update_workflow_stats()
+
+    def update_workflow_stats(self):
+        # Only the transitions recorded since the last call are read
+        analytics = self.workflow_analytics
+        analytics.refresh()
+        wip = analytics.work_in_progress()
+        lines = [f"Revisions in preparation: {wip['S/E'].sum()}"]
+        if wip["S/E"].sum():
+            busiest = wip.loc[wip["S/E"].idxmax()]
+            lines[0] += f" (most waiting after \"{busiest['waiting after']}\": {busiest['S/E']})"
+        throughput = analytics.weekly_throughput()
+        if not throughput.empty:
+            last = throughput.iloc[-1]
+            lines.append(f"Week of {last['week']}: {last['started']} started, {last['finished']} passed to revision")
+        stats = analytics.step_statistics()
+        if stats["bottleneck"].any():
+            bottleneck = stats[stats["bottleneck"]].iloc[0]
+            lines.append(f"Slowest step: {bottleneck['step']} (median {bottleneck['p50 days']:.1f} days, "
+                         f"90% within {bottleneck['p90 days']:.1f} days)")
+        if self.processed_data and len(analytics.matrix):
+            check = analytics.in_progress_check(self.processed_data)
+            started = check[check["workflow"] != "not started"]
+            mismatches = int((~started["matches"]).sum())
+            lines.append(f"Sheet and workflow disagree on \"en cours de révision\" for {mismatches} "
+                         f"of the {len(started)} sous-ensembles in the workflow")
+        self.workflow_stats_label.setText("\n".join(lines))
 
     def load_checklist_states(self):
-        # Placeholder for loading
-        pass
+        # Shows the recorded state of the selected sous-ensemble; the
+        # checklist is disabled until one is selected
+        equipment = self.workflow_equipment_combo.currentText()
+        sous_ensemble = self.workflow_sous_ensemble_combo.currentText()
+        state = self.workflow.state(equipment, sous_ensemble) if equipment and sous_ensemble else {}
+        self.checklist_frame.setEnabled(bool(equipment and sous_ensemble))
+        self.restoring_workflow = True
+        try:
+            for step, check in self.checklist_widgets.items():
+                check.setChecked(state.get(step) == DONE)
+            for step, (group, oui, non) in self.radio_groups.items():
+                if state.get(step) == "Oui":
+                    oui.setChecked(True)
+                elif state.get(step) == "Non":
+                    non.setChecked(True)
+                else:
+                    # An exclusive group cannot be cleared otherwise
+                    group.setExclusive(False)
+                    oui.setChecked(False)
+                    non.setChecked(False)
+                    group.setExclusive(True)
+        finally:
+            self.restoring_workflow = False
 
     def update_dashboard(self):
+        self.update_alerts()
         sheet_name = self.sheet_combo_dashboard.currentText()
         if not sheet_name or sheet_name not in self.processed_data:
             return
 
         df = self.processed_data[sheet_name]
-        config = self.sheet_configs.get(sheet_name, {})
         if df.empty:
             self.stats_text.setText("No data available.")
             return
 
-        # Calculate statistics based on sheet type
-        equipment_col = "Equipement" if "Equipement" in df.columns else "équipement"
-        sous_ensemble_col = "Sous-ensemble" if "Sous-ensemble" in df.columns else "Sous ensemble"
-
-        total_equipments = len(df[equipment_col].unique()) if equipment_col in df.columns else 0
-        total_sous_ensembles = len(df[sous_ensemble_col].dropna()) if sous_ensemble_col in df.columns else 0
-
-        stats = f"Total Equipments: {total_equipments}\n"
-        if sous_ensemble_col in df.columns:
-            stats += f"Total Sous-ensembles: {total_sous_ensembles}\n"
-
-        # Sheet-specific statistics
-        if sheet_name in ["Cartographie moteur", "Cartographie transmission", "Cartographie Engin"]:
-            awaiting_revision = int(df["Sous-ensemble en attente révision"].sum())
-            in_progress = int(df["Sous-ensemble encours de révision"].sum())
-            stats += (
-                f"Sous-ensembles Awaiting Revision: {awaiting_revision}\n"
-                f"Sous-ensembles In Progress: {in_progress}"
-            )
-        elif sheet_name in ["Programme 2025 BG", "Programme 2025 YSF"]:
-            total_cost = 0
-            if "Cout V2" in df.columns:
-                total_cost += df["Cout V2"].sum()
-            if "Cout [V2]" in df.columns:
-                total_cost += df["Cout [V2]"].sum()
-            if "Cout V1" in df.columns:
-                total_cost += df["Cout V1"].sum()
-            stats += f"Total Estimated Cost: {total_cost:.2f}"
-
-        self.stats_text.setText(stats)
-
-        # Clear previous alerts
-        for i in reversed(range(self.alerts_layout.count())):
-            widget = self.alerts_layout.itemAt(i).widget()
-            if widget:
-                widget.deleteLater()
-
-        # Generate alerts for specific sheets
-        if sheet_name in ["Cartographie moteur", "Cartographie transmission", "Cartographie Engin"]:
-            critical_rows = df[
-                (df["Sous-ensemble relais disponible (révisé)"] == 0) &
-                (df["Sous-ensemble en attente révision"] > 0)
-            ]
-            for _, row in critical_rows.iterrows():
-                alert = f"Critical: {row['Equipement']} - {row['Sous-ensemble']} has 0 available and {row['Sous-ensemble en attente révision']} awaiting revision."
-                alert_label = QLabel(alert)
-                alert_label.setFont(QFont("Segoe UI", 12))
-                alert_label.setStyleSheet("color: #d63031; padding: 5px; background-color: #ffcccc; border-radius: 3px;")
-                self.alerts_layout.addWidget(alert_label)
-
-            if critical_rows.empty:
-                no_alert = QLabel("No critical alerts.")
-                no_alert.setFont(QFont("Segoe UI", 12))
-                no_alert.setStyleSheet("color: #2d3436; padding: 5px; background-color: #e6ffed; border-radius: 3px;")
-                self.alerts_layout.addWidget(no_alert)
+        with span("dashboard", sheet_name):
+            # Aggregates are built once per sheet and kept current by save_data
+            stats = self.sheet_stats.get(sheet_name)
+            if stats is None:
+                stats = self.sheet_stats[sheet_name] = SheetStats(sheet_name, df, self.sheet_indexes[sheet_name],
+                                                                  self.budget, self.fleet_alerts)
+            self.stats_text.setText(stats.summary())
+
+    def update_alerts(self):
+        # Alerts of the whole fleet (every Cartographie sheet), whichever
+        # sheet the dashboard shows
+        if not self.workbook_loaded:
+            alerts = [("notice", "", "Alerts are shown once the workbook is loaded.")]
         else:
-            no_alert = QLabel("Alerts not applicable for this sheet.")
-            no_alert.setFont(QFont("Segoe UI", 12))
-            no_alert.setStyleSheet("color: #2d3436; padding: 5px; background-color: #e6ffed; border-radius: 3px;")
-            self.alerts_layout.addWidget(no_alert)
+            alerts = self.fleet_alerts.items() or [("notice", "", "No alerts.")]
+        self.show_alerts(alerts)
+
+    def show_alerts(self, alerts):
+        # (severity, sheet, message) rows, swapped into the model in one reset;
+        # a sort picked in the header is kept across refreshes
+        self.alerts_model.set_alerts(alerts)
+        header = self.alerts_view.horizontalHeader()
+        self.alerts_model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
 
 def main():
+    # --profile records the hot-path timings from startup and, with
+    # --profile=cpu or --profile=memory, a cProfile or tracemalloc capture
+    for arg in sys.argv[1:]:
+        if arg == "--profile" or arg.startswith("--profile="):
+            profiling.enable()
+            if arg.endswith("=cpu"):
+                profiling.start_cpu_profile()
+            elif arg.endswith("=memory"):
+                profiling.start_memory_trace()
+    logging.basicConfig(format="%(levelname)s: %(message)s")
     app = QApplication(sys.argv)
     window = EquipmentApp()
     window.show()
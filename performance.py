@@ -0,0 +1,168 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from sheet_index import EQUIPMENT_COLUMNS, SOUS_ENSEMBLE_COLUMNS, find_column
+
+# Wide change history of the Performances sheets: six groups of
+# date / OT / counter, numbered by frame_columns
+CHANGE_SLOTS = 6
+DATE_COL = "date de changement {}"
+OT_COL = "OT {}"
+COUNTER_COL = "Compteur de changement {}"
+# The current counter header carries the week it was read ("S45/2024")
+CURRENT_COUNTER_PREFIX = "compteur actuel"
+_READING_WEEK = re.compile(r"S(\d{1,2})/(\d{4})")
+
+
+def current_counter_column(df):
+    for col in df.columns:
+        if str(col).casefold().startswith(CURRENT_COUNTER_PREFIX):
+            return col
+    return None
+
+
+def reading_date(column):
+    # Monday of the ISO week named in the current counter header, NaT if none
+    match = _READING_WEEK.search(str(column or ""))
+    if match is None:
+        return pd.NaT
+    week, year = int(match.group(1)), int(match.group(2))
+    try:
+        return pd.Timestamp.fromisocalendar(year, week, 1)
+    except ValueError:
+        return pd.NaT
+
+
+def counter_reading_date(df):
+    # Week of the current counter reading, from the sheet's own header
+    # ("compteur actuel S46/2024"); the frame column keeps the configured name
+    col = current_counter_column(df)
+    if col is None:
+        return pd.NaT
+    return reading_date(df.attrs.get("source", {}).get("headers", {}).get(col, col))
+
+
+def parse_dates(values):
+    # Date cells mix datetimes, "16/05/2019" strings and stray numbers;
+    # numbers are not trusted as dates
+    values = pd.Series(values, dtype=object)
+    values = values.mask(pd.to_numeric(values, errors="coerce").notna())
+    return pd.to_datetime(values, errors="coerce", dayfirst=True, format="mixed").to_numpy("datetime64[ns]")
+
+
+def change_matrices(df):
+    # (rows, CHANGE_SLOTS) arrays of change dates, OTs and counters; a counter
+    # of 0 is an empty cell (numeric columns are zero-filled on load)
+    slots = range(1, CHANGE_SLOTS + 1)
+    dates = np.column_stack([parse_dates(df[DATE_COL.format(k)]) for k in slots])
+    ots = np.column_stack([df[OT_COL.format(k)].to_numpy(dtype=object) for k in slots])
+    counters = np.column_stack([pd.to_numeric(df[COUNTER_COL.format(k)], errors="coerce").to_numpy(dtype=float)
+                                for k in slots])
+    counters[counters <= 0] = np.nan
+    return dates, ots, counters
+
+
+def change_events(df):
+    # Long table with one row per recorded change: a change exists when its
+    # date or its counter is filled in
+    equipment_col = find_column(df.columns, EQUIPMENT_COLUMNS)
+    sous_ensemble_col = find_column(df.columns, SOUS_ENSEMBLE_COLUMNS)
+    dates, ots, counters = change_matrices(df)
+    rows, slots = np.nonzero(~np.isnat(dates) | ~np.isnan(counters))
+    return pd.DataFrame({
+        "équipement": df[equipment_col].to_numpy(dtype=object)[rows],
+        "Sous-ensemble": df[sous_ensemble_col].to_numpy(dtype=object)[rows],
+        "change": slots + 1,
+        "date": dates[rows, slots],
+        "OT": ots[rows, slots],
+        "counter": counters[rows, slots],
+        "row": df.index.to_numpy()[rows],
+    })
+
+
+def _compact(values, valid):
+    # Moves the valid entries of each row to the left, keeping their order
+    order = np.argsort(~valid, axis=1, kind="stable")
+    return np.take_along_axis(values, order, axis=1), valid.sum(axis=1)
+
+
+def _last(values, counts, empty):
+    rows = np.arange(len(values))
+    result = values[rows, np.maximum(counts - 1, 0)]
+    result[counts == 0] = empty
+    return result
+
+
+def fleet_summary(df):
+    # Per sub-assembly life statistics computed for the whole sheet at once:
+    # hours between consecutive changes, mean life, hours run since the last
+    # change (what PERFORMANCE holds in Excel) and a projection of the next
+    # change from the usage rate observed between dated counter readings
+    equipment_col = find_column(df.columns, EQUIPMENT_COLUMNS)
+    sous_ensemble_col = find_column(df.columns, SOUS_ENSEMBLE_COLUMNS)
+    current_col = current_counter_column(df)
+    dates, _, counters = change_matrices(df)
+
+    # Hours between changes; resets and out-of-order counters are not lives
+    counter_valid = ~np.isnan(counters)
+    compact, counter_count = _compact(counters, counter_valid)
+    intervals = np.diff(compact, axis=1)
+    intervals[intervals <= 0] = np.nan
+    with np.errstate(invalid="ignore"):
+        life_count = np.sum(~np.isnan(intervals), axis=1)
+        mean_life = np.where(life_count > 0, np.nansum(intervals, axis=1) / np.maximum(life_count, 1), np.nan)
+    last_counter = _last(compact, counter_count, np.nan)
+
+    current = np.full(len(df), np.nan)
+    if current_col is not None:
+        current = pd.to_numeric(df[current_col], errors="coerce").to_numpy(dtype=float)
+        current[current <= 0] = np.nan
+    since_change = current - last_counter
+    since_change[since_change < 0] = np.nan
+
+    # Usage rate (hours per day) between the first and the last dated reading;
+    # the current counter counts as a reading when its week is known
+    dated = counter_valid & ~np.isnat(dates)
+    dated_dates, dated_count = _compact(dates, dated)
+    dated_counters, _ = _compact(counters, dated)
+    first_date = np.where(dated_count > 0, dated_dates[:, 0], np.datetime64("NaT"))
+    first_counter = np.where(dated_count > 0, dated_counters[:, 0], np.nan)
+    last_date = _last(dated_dates, dated_count, np.datetime64("NaT"))
+    last_dated_counter = _last(dated_counters, dated_count, np.nan)
+    read_on = counter_reading_date(df)
+    if not pd.isna(read_on):
+        has_reading = ~np.isnan(current)
+        last_date = np.where(has_reading, np.datetime64(read_on, "ns"), last_date)
+        last_dated_counter = np.where(has_reading, current, last_dated_counter)
+    days = (last_date - first_date) / np.timedelta64(1, "D")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        usage_rate = (last_dated_counter - first_counter) / days
+    usage_rate[~(usage_rate > 0)] = np.nan
+
+    next_counter = last_counter + mean_life
+    remaining = next_counter - current
+    due_in_days = remaining / usage_rate
+    due_in_days[~np.isfinite(due_in_days)] = np.nan
+    next_date = np.full(len(df), np.datetime64("NaT", "ns"))
+    if not pd.isna(read_on):
+        next_date = np.datetime64(read_on, "ns") + (due_in_days * 86400).astype("timedelta64[s]")
+    change_dated = ~np.isnat(dates)
+    change_dates, date_count = _compact(dates, change_dated)
+
+    return pd.DataFrame({
+        "équipement": df[equipment_col].to_numpy(dtype=object),
+        "Sous-ensemble": df[sous_ensemble_col].to_numpy(dtype=object),
+        "changes": np.sum(counter_valid | change_dated, axis=1),
+        "last change": _last(change_dates, date_count, np.datetime64("NaT")),
+        "last counter": last_counter,
+        "current counter": current,
+        "hours since change": since_change,
+        "lives": life_count,
+        "mean life": mean_life,
+        "usage rate": usage_rate,
+        "next change counter": next_counter,
+        "remaining hours": remaining,
+        "next change date": next_date,
+    }, index=df.index)
@@ -0,0 +1,163 @@
+import collections
+import contextlib
+import cProfile
+import datetime
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+# Timings of the app's hot paths (workbook load, preprocess_sheet, table
+# population, filtering, saves, dashboard refresh). Off by default: span()
+# then hands back one shared no-op context manager, so an instrumented call
+# costs a global lookup and a function call. When on, every span appends
+# (time, name, detail, seconds, thread) to a ring buffer holding the last
+# RING_SIZE records. Switched on by ENGINS_PROFILE=1, --profile on the
+# command line, or the diagnostics panel (Ctrl+Shift+D).
+RING_SIZE = 10_000
+PROFILE_ENV = "ENGINS_PROFILE"
+DUMP_PREFIX = "engins_profile_"
+TRACEMALLOC_TOP = 30
+
+_enabled = False
+_records = collections.deque(maxlen=RING_SIZE)
+_disabled = contextlib.nullcontext()
+_profiler = None
+
+
+class _Span:
+
+    __slots__ = ("name", "detail", "start")
+
+    def __init__(self, name, detail):
+        self.name = name
+        self.detail = detail
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        # deque.append is atomic, the loader and save threads record too
+        _records.append((time.time(), self.name, self.detail, seconds, threading.current_thread().name))
+        return False
+
+
+def span(name, detail=None):
+    if not _enabled:
+        return _disabled
+    return _Span(name, detail)
+
+
+def enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def clear():
+    _records.clear()
+
+
+def records():
+    return [{"at": datetime.datetime.fromtimestamp(at).isoformat(timespec="milliseconds"), "name": name,
+             "detail": detail, "seconds": round(seconds, 6), "thread": thread}
+            for at, name, detail, seconds, thread in list(_records)]
+
+
+def summary():
+    # Per span name: calls, total, mean, p50, p95 and max seconds, the
+    # costliest name first
+    times = collections.defaultdict(list)
+    for _, name, _, seconds, _ in list(_records):
+        times[name].append(seconds)
+    rows = []
+    for name, values in times.items():
+        values = np.array(values)
+        p50, p95 = np.percentile(values, [50, 95])
+        rows.append({"name": name, "count": len(values), "total": float(values.sum()),
+                     "mean": float(values.mean()), "p50": float(p50), "p95": float(p95),
+                     "max": float(values.max())})
+    return sorted(rows, key=lambda row: -row["total"])
+
+
+def summary_text():
+    rows = summary()
+    if not rows:
+        return "No timings recorded."
+    lines = [f"{'span':<28} {'calls':>7} {'total s':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}"]
+    for row in rows:
+        lines.append(f"{row['name']:<28} {row['count']:>7} {row['total']:>9.3f} {row['mean'] * 1000:>9.2f} "
+                     f"{row['p50'] * 1000:>9.2f} {row['p95'] * 1000:>9.2f} {row['max'] * 1000:>9.2f}")
+    return "\n".join(lines)
+
+
+def profiling_cpu():
+    return _profiler is not None
+
+
+def start_cpu_profile():
+    # cProfile only sees the thread it was started on (the GUI thread)
+    global _profiler
+    if _profiler is None:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def stop_cpu_profile():
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.disable()
+    return profiler
+
+
+def start_memory_trace():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def stop_memory_trace():
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def dump(directory="."):
+    # Writes the ring buffer and its summary to engins_profile_<time>.json,
+    # the cProfile stats (if running) to .prof, readable with pstats or
+    # snakeviz, and the top tracemalloc allocations (if tracing) to .txt;
+    # returns the files written
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    base = os.path.join(directory, DUMP_PREFIX + stamp)
+    paths = [base + ".json"]
+    with open(paths[0], "w", encoding="utf-8") as f:
+        json.dump({"summary": summary(), "records": records()}, f, indent=1, ensure_ascii=False)
+    if _profiler is not None:
+        # dump_stats stops the profiler; it keeps going after the dump
+        _profiler.dump_stats(base + ".prof")
+        _profiler.enable()
+        paths.append(base + ".prof")
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        stats = tracemalloc.take_snapshot().statistics("lineno")[:TRACEMALLOC_TOP]
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(f"current {current / 2 ** 20:.1f} MB, peak {peak / 2 ** 20:.1f} MB\n")
+            f.writelines(f"{stat}\n" for stat in stats)
+        paths.append(base + ".txt")
+    return paths
+
+
+if os.environ.get(PROFILE_ENV, "") not in ("", "0"):
+    enable()
@@ -0,0 +1,147 @@
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from alerts import AlertEngine
+from ateliers import ATELIER_COL, STOCK_COLUMNS, AtelierIndex, attach_ateliers
+from budget import BUDGET_LAYOUTS, BudgetRollup
+from compaction import memory_usage, uncompacted_usage
+from ingestion import ATELIER_WORKBOOK_PATH, load_workbook
+from scheduler import fleet_table, weekly_forecast
+from sheet_configs import ATELIER_SHEET_CONFIGS, CARTOGRAPHIE_SHEETS, SHEET_CONFIGS
+
+# Headless reports over one or many ENGINS workbooks, e.g. from cron:
+#   python -m report archive/ --out reports --format parquet --jobs 4
+# Only the engine modules are imported here, never PyQt6.
+
+FORMATS = ["csv", "json", "parquet"]
+REPORTS = ["sheets", "stock", "alerts", "budget", "forecast"]
+
+
+def find_workbooks(paths):
+    # Workbooks named on the command line, and the .xlsx files of the
+    # directories named there (Excel lock files "~$..." are skipped)
+    workbooks = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(name for name in os.listdir(path)
+                           if name.lower().endswith(".xlsx") and not name.startswith("~$"))
+            workbooks.extend(os.path.join(path, name) for name in names)
+        else:
+            workbooks.append(path)
+    return workbooks
+
+
+def workbook_reports(path, ateliers_path=None, use_cache=True):
+    # Every report of one workbook, as {report name: DataFrame}
+    frames = load_workbook(path, SHEET_CONFIGS, use_cache)
+    if ateliers_path and os.path.exists(ateliers_path):
+        index = AtelierIndex(load_workbook(ateliers_path, ATELIER_SHEET_CONFIGS, use_cache))
+        for sheet_name in CARTOGRAPHIE_SHEETS:
+            if sheet_name in frames and not frames[sheet_name].empty:
+                attach_ateliers(frames[sheet_name], index)
+
+    sheets = pd.DataFrame([{"sheet": sheet_name, "rows": len(df), "columns": len(df.columns),
+                            "bytes": memory_usage(df), "uncompacted bytes": uncompacted_usage(df)}
+                           for sheet_name, df in frames.items()])
+
+    stock = []
+    for sheet_name in CARTOGRAPHIE_SHEETS:
+        df = frames.get(sheet_name)
+        if df is None or df.empty:
+            continue
+        by = [ATELIER_COL] if ATELIER_COL in df.columns else []
+        totals = df.groupby(by)[STOCK_COLUMNS].sum().reset_index() if by else df[STOCK_COLUMNS].sum().to_frame().T
+        totals.insert(0, "sheet", sheet_name)
+        stock.append(totals)
+    stock = pd.concat(stock, ignore_index=True) if stock else pd.DataFrame()
+
+    budget = BudgetRollup(frames).pivot("SECTION AFFECTATION").stack().rename("Cout").reset_index()
+    # The pivot fills versions a programme does not have (YSF V3) with 0
+    versions = {(layout["programme"], version) for layout in BUDGET_LAYOUTS.values() for version in layout["versions"]}
+    budget = budget[[pair in versions for pair in zip(budget["Programme"], budget["Version"])]]
+
+    return {
+        "sheets": sheets,
+        "stock": stock,
+        "alerts": AlertEngine().evaluate(frames),
+        "budget": budget,
+        "forecast": weekly_forecast(fleet_table(frames)),
+    }
+
+
+def _run(path, ateliers_path, use_cache):
+    # Process pool entry point: failures are returned, not raised, so one
+    # bad workbook does not stop the batch
+    try:
+        return path, workbook_reports(path, ateliers_path, use_cache), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+def write_report(frame, target, fmt):
+    if fmt == "csv":
+        frame.to_csv(target, index=False, encoding="utf-8")
+    elif fmt == "json":
+        frame.to_json(target, orient="records", date_format="iso", force_ascii=False, indent=1)
+    else:
+        frame.to_parquet(target, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m report",
+                                     description="Write stock, alert, budget and forecast reports "
+                                                 "for ENGINS workbooks without starting the GUI.")
+    parser.add_argument("paths", nargs="+", help="workbooks, or directories of workbooks")
+    parser.add_argument("--out", default="reports", help="output directory (default: reports)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--ateliers", default=ATELIER_WORKBOOK_PATH,
+                        help="workshop workbook joined to the Cartographie sheets, if it exists")
+    parser.add_argument("--no-cache", action="store_true", help="parse the workbooks even if cached")
+    args = parser.parse_args(argv)
+    # Warnings of the engine modules (skipped sheets, unreadable caches) go
+    # to stderr, never into the output
+    logging.basicConfig(stream=sys.stderr, format="%(levelname)s: %(message)s")
+
+    workbooks = find_workbooks(args.paths)
+    if not workbooks:
+        print("No workbook found.", file=sys.stderr)
+        return 2
+
+    results = {name: [] for name in REPORTS}
+    failures = 0
+    jobs = max(1, min(args.jobs, len(workbooks)))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        runs = pool.map(_run, workbooks, [args.ateliers] * len(workbooks), [not args.no_cache] * len(workbooks))
+        for path, reports, error in runs:
+            if error is not None:
+                failures += 1
+                print(f"{path}: {error}", file=sys.stderr)
+                continue
+            for name, frame in reports.items():
+                frame.insert(0, "workbook", os.path.basename(path))
+                results[name].append(frame)
+
+    os.makedirs(args.out, exist_ok=True)
+    for name, frames in results.items():
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            continue
+        target = os.path.join(args.out, f"{name}.{args.format}")
+        try:
+            write_report(pd.concat(frames, ignore_index=True), target, args.format)
+        except ImportError as e:
+            # Parquet needs pyarrow (or fastparquet), which the GUI does not
+            print(f"Cannot write {target}: {e}", file=sys.stderr)
+            return 2
+        print(f"Wrote {target}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+from PyQt6.QtCore import QCoreApplication, QObject, QTimer, pyqtSignal
+
+from workers import SaveWorker
+from writeback import merge_cells
+
+# Edits are flushed once the operator has stopped typing for this long
+SAVE_DELAY_MS = 3000
+
+
+class SaveQueue(QObject):
+    # Collects edits from the Update Data tab and writes them in batches.
+    # Repeated edits of the same (sheet, equipment, sous-ensemble, column)
+    # collapse into the last value; a batch is written in a SaveWorker after
+    # SAVE_DELAY_MS of inactivity or when flush() is called. Each edit keeps
+    # the value it replaced: cells another instance changed meanwhile, and
+    # cells holding a formula, are not overwritten but reported by
+    # conflicts, as (key, value, current, base).
+    status = pyqtSignal(str)
+    saved = pyqtSignal(int)
+    conflicts = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, path, delay_ms=SAVE_DELAY_MS, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.pending = {}
+        self.worker = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.flush)
+
+    def enqueue(self, key, sheet_name, row, column, base, value):
+        # key: (sheet, equipment, sous-ensemble, column); row/column: 1-based
+        # cell; base: the value shown before the edit. Collapsed edits keep
+        # the base of the first one, the value last saved.
+        if key in self.pending:
+            base = self.pending[key][3]
+        self.pending[key] = (sheet_name, row, column, base, value)
+        self.status.emit(f"{len(self.pending)} change(s) waiting to be saved")
+        self.timer.start()
+
+    def is_busy(self):
+        return self.worker is not None and self.worker.isRunning()
+
+    def flush(self):
+        self.timer.stop()
+        if not self.pending or self.is_busy():
+            # A running batch flushes again when it finishes
+            return
+        batch = self.pending
+        self.pending = {}
+        self.status.emit(f"Saving {len(batch)} change(s) to {self.path}...")
+        self.worker = SaveWorker(self.path, list(batch.values()), self)
+        self.worker.saved.connect(self.on_saved)
+        self.worker.conflicts.connect(lambda conflicts: self.on_conflicts(batch, conflicts))
+        self.worker.failed.connect(lambda message: self.on_failed(batch, message))
+        self.worker.finished.connect(self.on_finished)
+        self.worker.start()
+
+    def on_saved(self, count):
+        self.status.emit(f"Saved {count} change(s) to {self.path}")
+        if count:
+            self.saved.emit(count)
+
+    def on_conflicts(self, batch, conflicts):
+        keys = list(batch)
+        self.conflicts.emit([(keys[i], batch[keys[i]][4], current, batch[keys[i]][3]) for i, current in conflicts])
+
+    def on_failed(self, batch, message):
+        # Put the batch back unless newer edits of the same cells arrived
+        # meanwhile, and retry after the usual delay (the workbook may be
+        # locked by Excel)
+        for key, edit in batch.items():
+            if key in self.pending:
+                # The newer edit was based on this unsaved one
+                self.pending[key] = self.pending[key][:3] + (edit[3],) + self.pending[key][4:]
+            else:
+                self.pending[key] = edit
+        self.status.emit(f"Failed to save {len(batch)} change(s): {message}")
+        self.failed.emit(message)
+        self.timer.start()
+
+    def on_finished(self):
+        if self.pending and not self.timer.isActive():
+            self.flush()
+
+    def flush_now(self):
+        # Used on shutdown: let the running batch finish, deliver its result,
+        # then write whatever is still pending on the calling thread. The
+        # edits stay queued until the write succeeds: when it raises (the
+        # workbook is locked by Excel), the caller can retry
+        self.timer.stop()
+        if self.worker is not None:
+            self.worker.wait()
+            QCoreApplication.processEvents()
+        if self.pending:
+            batch = self.pending
+            try:
+                written, conflicts = merge_cells(self.path, list(batch.values()))
+            except Exception:
+                # Still queued, and retried after the usual delay if the
+                # application stays open
+                self.timer.start()
+                raise
+            self.pending = {}
+            if conflicts:
+                self.on_conflicts(batch, conflicts)
+            if written:
+                self.saved.emit(written)
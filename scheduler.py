@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+from performance import counter_reading_date, fleet_summary
+from sheet_configs import PERFORMANCE_SHEETS
+
+# Weight, in lives, given to the peer average when blending it with the
+# sub-assembly's own history (credibility weighting: a sub-assembly with two
+# recorded lives counts as much as its peers)
+PEER_WEIGHT = 2
+DEFAULT_HORIZON_WEEKS = 52
+
+FORECAST_COLUMNS = ["week", "rank", "sheet", "équipement", "Sous-ensemble", "due date",
+                    "remaining hours", "estimated life", "life source", "hours since change", "usage rate"]
+FORECAST_DTYPES = {"week": "datetime64[ns]", "rank": "int64", "due date": "datetime64[ns]",
+                   "remaining hours": "float64", "estimated life": "float64", "hours since change": "float64",
+                   "usage rate": "float64"}
+
+
+def equipment_type(names):
+    # Peer type of a machine: its name without the unit number
+    # ("D11T3" -> "d11t", "camion HP 23" -> "camion hp")
+    return names.astype(str).str.replace(r"\s*\d+$", "", regex=True).str.strip().str.casefold()
+
+
+def fleet_table(frames):
+    # Fleet summaries of every Performances sheet, stacked; this is the costly
+    # part, so what-if forecasts reuse one table
+    tables = []
+    for sheet_name in PERFORMANCE_SHEETS:
+        df = frames.get(sheet_name)
+        if df is None or df.empty:
+            continue
+        fleet = fleet_summary(df)
+        fleet.insert(0, "sheet", sheet_name)
+        fleet["read on"] = counter_reading_date(df)
+        tables.append(fleet)
+    if not tables:
+        return pd.DataFrame()
+    fleet = pd.concat(tables, ignore_index=True)
+    fleet["type"] = equipment_type(fleet["équipement"])
+    return fleet
+
+
+def _group_mean(codes, values, weights, exclude_self=False):
+    # Weighted mean of values per group, broadcast back to the rows; with
+    # exclude_self each row only sees the other members of its group
+    present = ~np.isnan(values) & (weights > 0)
+    weighted = np.where(present, values * weights, 0.0)
+    weights = np.where(present, weights, 0.0)
+    sums = np.bincount(codes, weights=weighted)[codes]
+    counts = np.bincount(codes, weights=weights)[codes]
+    if exclude_self:
+        sums, counts = sums - weighted, counts - weights
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def remaining_life(fleet, life_factor=1.0, usage_factor=1.0, peer_weight=PEER_WEIGHT):
+    # Estimated life and remaining hours of every sub-assembly, blending its
+    # own mean life with the mean life of the same sub-assembly on machines
+    # of the same type. life_factor and usage_factor scale the estimated
+    # lives and usage rates for what-if scenarios.
+    sous_ensembles = fleet["Sous-ensemble"].astype(str).str.casefold().str.split().str.join(" ")
+    peer_codes = pd.factorize(fleet["type"] + "\x1f" + sous_ensembles)[0]
+    own_lives = fleet["lives"].to_numpy(dtype=float)
+    own_life = fleet["mean life"].to_numpy(dtype=float)
+    peer_life = _group_mean(peer_codes, own_life, own_lives, exclude_self=True)
+
+    own_weight = np.where(np.isnan(own_life), 0.0, own_lives)
+    peer_weight = np.where(np.isnan(peer_life), 0.0, peer_weight)
+    total = own_weight + peer_weight
+    with np.errstate(invalid="ignore", divide="ignore"):
+        life = (own_weight * np.nan_to_num(own_life) + peer_weight * np.nan_to_num(peer_life)) / total
+    life = np.where(total > 0, life, np.nan) * life_factor
+    source = np.select([(own_weight > 0) & (peer_weight > 0), own_weight > 0, peer_weight > 0],
+                       ["blended", "own", "peers"], "")
+
+    # A machine runs all its sub-assemblies, so a missing usage rate falls
+    # back to the rate seen on the machine's other rows, then on its type
+    rate = fleet["usage rate"].to_numpy(dtype=float)
+    machine_codes = pd.factorize(fleet["sheet"] + "\x1f" + fleet["équipement"].astype(str))[0]
+    type_codes = pd.factorize(fleet["type"])[0]
+    ones = np.ones(len(fleet))
+    rate = np.where(np.isnan(rate), _group_mean(machine_codes, rate, ones), rate)
+    rate = np.where(np.isnan(rate), _group_mean(type_codes, rate, ones), rate)
+    rate = rate * usage_factor
+
+    since_change = fleet["hours since change"].to_numpy(dtype=float)
+    remaining = life - since_change
+    with np.errstate(invalid="ignore", divide="ignore"):
+        due_in_days = np.where(rate > 0, np.maximum(remaining, 0) / rate, np.nan)
+    read_on = fleet["read on"].to_numpy(dtype="datetime64[ns]")
+    due_date = read_on + (due_in_days * 86400).astype("timedelta64[s]")
+
+    return pd.DataFrame({
+        "sheet": fleet["sheet"].to_numpy(),
+        "équipement": fleet["équipement"].to_numpy(),
+        "Sous-ensemble": fleet["Sous-ensemble"].to_numpy(),
+        "estimated life": life,
+        "life source": source,
+        "hours since change": since_change,
+        "usage rate": rate,
+        "remaining hours": remaining,
+        "due date": due_date,
+    })
+
+
+def weekly_forecast(fleet, horizon_weeks=DEFAULT_HORIZON_WEEKS, **scenario):
+    # Replacements due within the horizon, grouped by the week (Monday) they
+    # fall due and ranked inside each week by due date, then by how far the
+    # sub-assembly is past its estimated life. Overdue sub-assemblies are
+    # due in the week of the counter reading.
+    if fleet.empty:
+        # Typed like a forecast, so callers can use .dt on the date columns
+        return pd.DataFrame({col: pd.Series(dtype=FORECAST_DTYPES.get(col, object)) for col in FORECAST_COLUMNS})
+    estimates = remaining_life(fleet, **scenario)
+    due = estimates[estimates["due date"].notna()]
+    start = fleet["read on"].min()
+    due = due[due["due date"] < start + pd.Timedelta(weeks=horizon_weeks)]
+    due = due.sort_values(["due date", "remaining hours"], kind="stable")
+    due.insert(0, "week", due["due date"].dt.to_period("W-SUN").dt.start_time)
+    due.insert(1, "rank", due.groupby("week").cumcount().to_numpy() + 1)
+    return due[FORECAST_COLUMNS].reset_index(drop=True)
@@ -0,0 +1,107 @@
+# Expected layout of each sheet of ENGINS.xlsx: the headers to look for, the
+# columns holding numbers and the column used by the "Filter by" combo.
+# "section_markers" lists the values (in the first header column or the
+# unlabelled columns left of it) that open a section such as BG or YSF; the
+# rows that follow are tagged with it in a "Section" column.
+# "header_prefixes" lets a header whose end changes (the week of "compteur
+# actuel S45/2024") match on its prefix; the frame keeps the configured name
+# and the sheet's own header text is kept in attrs["source"]["headers"].
+SHEET_CONFIGS = {
+    "Park engin": {
+        "headers": ["Equipement", "MLE", "DMS", "TYPE", "N° DES SERIES", "SITUATION"],
+        "numeric_cols": [],
+        "filter_col": "SITUATION",
+        "section_markers": ["BG", "YSF"]
+    },
+    "Cartographie moteur": {
+        "headers": ["Equipement", "Sous-ensemble", "Criticité", "Quantité SE installée",
+                    "Sous-ensemble relais disponible (révisé)", "Sous-ensemble en attente révision",
+                    "Sous-ensemble encours de révision", "Corps de Sous-ensembles disponibles (révisable)"],
+        "numeric_cols": ["Quantité SE installée", "Sous-ensemble relais disponible (révisé)",
+                         "Sous-ensemble en attente révision", "Sous-ensemble encours de révision",
+                         "Corps de Sous-ensembles disponibles (révisable)"],
+        "filter_col": "Criticité",
+        "section_markers": ["BG", "YSF"]
+    },
+    "Cartographie transmission": {
+        "headers": ["Equipement", "Sous-ensemble", "Criticité", "Quantité SE installée",
+                    "Sous-ensemble relais disponible (révisé)", "Sous-ensemble en attente révision",
+                    "Sous-ensemble encours de révision", "Corps de Sous-ensembles disponibles (révisable)"],
+        "numeric_cols": ["Quantité SE installée", "Sous-ensemble relais disponible (révisé)",
+                         "Sous-ensemble en attente révision", "Sous-ensemble encours de révision",
+                         "Corps de Sous-ensembles disponibles (révisable)"],
+        "filter_col": "Criticité",
+        "section_markers": ["BG", "YSF"]
+    },
+    "Cartographie Engin": {
+        "headers": ["Equipement", "Sous-ensemble", "Criticité", "Quantité SE installée",
+                    "Sous-ensemble relais disponible (révisé)", "Sous-ensemble en attente révision",
+                    "Sous-ensemble encours de révision", "Corps de Sous-ensembles disponibles (révisable)"],
+        "numeric_cols": ["Quantité SE installée", "Sous-ensemble relais disponible (révisé)",
+                         "Sous-ensemble en attente révision", "Sous-ensemble encours de révision",
+                         "Corps de Sous-ensembles disponibles (révisable)"],
+        "filter_col": "Criticité",
+        "section_markers": ["BG", "YSF"]
+    },
+    "Performances BG": {
+        "headers": ["équipement", "Sous-ensemble", "date de changement 1", "OT", "Compteur de changement 1",
+                    "date de changement 2", "OT", "Compteur de changement 2", "date de changement 3", "OT",
+                    "Compteur de changement 3", "date de changement 4", "OT", "Compteur de changement 4",
+                    "date de changement 5", "OT", "Compteur de changement 5", "date de changement 6", "OT",
+                    "Compteur de changement 6", "compteur actuel S45/2024", "PERFORMANCE"],
+        "numeric_cols": ["Compteur de changement 1", "Compteur de changement 2", "Compteur de changement 3",
+                         "Compteur de changement 4", "Compteur de changement 5", "Compteur de changement 6",
+                         "compteur actuel S45/2024", "PERFORMANCE"],
+        "header_prefixes": {"compteur actuel S45/2024": "compteur actuel"},
+        "filter_col": None
+    },
+    "Performances YSF": {
+        "headers": ["équipement", "Sous-ensemble", "date de changement 1", "OT", "Compteur de changement 1",
+                    "date de changement 2", "OT", "Compteur de changement 2", "date de changement 3", "OT",
+                    "Compteur de changement 3", "date de changement 4", "OT", "Compteur de changement 4",
+                    "date de changement 5", "OT", "Compteur de changement 5", "date de changement 6", "OT",
+                    "Compteur de changement 6", "compteur actuel S45/2024", "PERFORMANCE"],
+        "numeric_cols": ["Compteur de changement 1", "Compteur de changement 2", "Compteur de changement 3",
+                         "Compteur de changement 4", "Compteur de changement 5", "Compteur de changement 6",
+                         "compteur actuel S45/2024", "PERFORMANCE"],
+        "header_prefixes": {"compteur actuel S45/2024": "compteur actuel"},
+        "filter_col": None
+    },
+    "Programme 2025 BG": {
+        "headers": ["Type d'engin", "Equipement", "Sous-ensemble", "Qte v1", "Qte v2", "Qte v3",
+                    "Devis unitaire", "Cout V2", "Cout V3", "Commentaire", "SECTION AFFECTATION"],
+        "numeric_cols": ["Qte v1", "Qte v2", "Qte v3", "Devis unitaire", "Cout V2", "Cout V3"],
+        "filter_col": "SECTION AFFECTATION"
+    },
+    "Programme 2025 YSF": {
+        "headers": ["Equipement", "Engin", "REP", "Sous ensemble", "Seuil HM", "HM cumulés",
+                    "Devis unitaire", "Qte [V1]", "Cout V1", "Qte [V2]", "Cout [V2]", "OBS",
+                    "SECTION AFFECTATION"],
+        "numeric_cols": ["Seuil HM", "HM cumulés", "Devis unitaire", "Qte [V1]", "Cout V1", "Qte [V2]", "Cout [V2]"],
+        "filter_col": "SECTION AFFECTATION"
+    }
+}
+
+# Sheets that carry the BG/YSF stock cartography
+CARTOGRAPHIE_SHEETS = ["Cartographie moteur", "Cartographie transmission", "Cartographie Engin"]
+
+# Sheets that carry the six-change history of each sub-assembly
+PERFORMANCE_SHEETS = ["Performances BG", "Performances YSF"]
+
+# Layout of "Cartographie SE par atelier.xlsx": each workshop sheet lists the
+# sub-assemblies it revises, with the Cartographie stock columns (no
+# Criticité). "Atelier Mécanique" is a plant inventory that shares no
+# (Equipement, Sous-ensemble) key with ENGINS.xlsx and is not loaded.
+ATELIER_SHEET_CONFIGS = {
+    sheet_name: {
+        "headers": ["Equipement", "Sous-ensemble", "Quantité SE installée",
+                    "Sous-ensemble relais disponible (révisé)", "Sous-ensemble en attente révision",
+                    "Sous-ensemble encours de révision", "Corps de Sous-ensembles disponibles (révisable)"],
+        "numeric_cols": ["Quantité SE installée", "Sous-ensemble relais disponible (révisé)",
+                         "Sous-ensemble en attente révision", "Sous-ensemble encours de révision",
+                         "Corps de Sous-ensembles disponibles (révisable)"],
+        "filter_col": None,
+        "section_markers": ["BG", "YSF"]
+    }
+    for sheet_name in ["Atelier Moteurs", "Atelier transmission", "Atelier ENGINS"]
+}
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+# Spellings of the key columns across the sheet layouts
+EQUIPMENT_COLUMNS = ["Equipement", "équipement"]
+SOUS_ENSEMBLE_COLUMNS = ["Sous-ensemble", "Sous ensemble"]
+
+
+def find_column(columns, candidates):
+    for col in candidates:
+        if col in columns:
+            return col
+    return None
+
+
+class SheetIndex:
+    # Hash index of a processed sheet on (Equipement, Sous-ensemble).
+    # Keys are the values as shown in the combos (str), rows are index labels;
+    # when a pair appears twice the first row wins, as the mask lookups did.
+    # Edits only touch numeric columns, so the index stays valid as long as
+    # the key columns are not rewritten; rebuild it if they are.
+
+    def __init__(self, df):
+        self.equipment_col = find_column(df.columns, EQUIPMENT_COLUMNS)
+        self.sous_ensemble_col = find_column(df.columns, SOUS_ENSEMBLE_COLUMNS)
+        self.rows = {}
+        self.sous_ensembles = {}
+        self.equipments = []
+        if self.equipment_col is None:
+            return
+
+        equipments = df[self.equipment_col]
+        self.equipments = [str(e) for e in sorted(equipments.dropna().unique())]
+        if self.sous_ensemble_col is None:
+            return
+
+        sous_ensembles = df[self.sous_ensemble_col]
+        if isinstance(equipments.dtype, pd.CategoricalDtype) and isinstance(sous_ensembles.dtype, pd.CategoricalDtype):
+            pairs = self._category_pairs(df.index, equipments, sous_ensembles)
+        else:
+            pairs = zip(df.index, equipments.to_numpy(), sous_ensembles.to_numpy())
+        for label, equipment, sous_ensemble in pairs:
+            if pd.isna(equipment) or pd.isna(sous_ensemble):
+                continue
+            key = (str(equipment), str(sous_ensemble))
+            if key not in self.rows:
+                self.rows[key] = label
+                self.sous_ensembles.setdefault(key[0], []).append(key[1])
+        for names in self.sous_ensembles.values():
+            names.sort()
+
+    @staticmethod
+    def _category_pairs(labels, equipments, sous_ensembles):
+        # The first row of each (equipment, sous-ensemble) code pair, in row
+        # order: duplicated pairs are dropped on the integer codes before
+        # any label is turned into a string
+        equipment_codes = equipments.cat.codes.to_numpy().astype(np.int64)
+        sous_ensemble_codes = sous_ensembles.cat.codes.to_numpy().astype(np.int64)
+        filled = np.flatnonzero((equipment_codes >= 0) & (sous_ensemble_codes >= 0))
+        pairs = equipment_codes[filled] * len(sous_ensembles.cat.categories) + sous_ensemble_codes[filled]
+        first = np.sort(filled[np.unique(pairs, return_index=True)[1]])
+        equipment_names = equipments.cat.categories.to_numpy(dtype=object)
+        sous_ensemble_names = sous_ensembles.cat.categories.to_numpy(dtype=object)
+        return zip(labels[first], equipment_names[equipment_codes[first]],
+                   sous_ensemble_names[sous_ensemble_codes[first]])
+
+    def sous_ensemble_list(self, equipment):
+        return self.sous_ensembles.get(equipment, [])
+
+    def lookup(self, equipment, sous_ensemble):
+        return self.rows.get((equipment, sous_ensemble))
@@ -0,0 +1,201 @@
+import datetime
+import json
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from compaction import compact_frame
+from ingestion import WORKBOOK_PATH, cell_coordinates, load_workbook
+from sheet_configs import SHEET_CONFIGS
+from sheet_index import EQUIPMENT_COLUMNS, SOUS_ENSEMBLE_COLUMNS, find_column
+from writeback import merge_cell, write_cells
+
+# Optional storage backend: the processed sheets live in an SQLite database
+# (one table per sheet, keyed by the frame's row label) and the workbook is
+# only read on import and written on export. WAL mode lets readers (the
+# report CLI, a second window) work while the app writes.
+ROW_COL = "_row"
+# Bumped by every save of a row, so instances sharing the database can tell
+# which rows changed since they read them
+VERSION_COL = "_version"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sheets (
+    position INTEGER NOT NULL,
+    name TEXT PRIMARY KEY,
+    source TEXT
+);
+"""
+
+
+def quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def layout(df):
+    # Where the rows and columns of a frame sit in the workbook; the header
+    # texts are left out, the week in "compteur actuel S46/2024" changes
+    source = df.attrs.get("source") or {}
+    return source.get("header_row"), source.get("columns")
+
+
+def _sql_values(df):
+    # Dates are stored as ISO text, which parse_dates reads back like the
+    # strings already found in the sheets
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].map(lambda v: v.isoformat(sep=" ")
+                                  if isinstance(v, (datetime.datetime, datetime.date)) else v)
+        elif pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime("%Y-%m-%d %H:%M:%S").astype(object).where(df[col].notna(), None)
+    return df
+
+
+class SqlBackend:
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def sheet_names(self):
+        return [name for name, in self.connection.execute("SELECT name FROM sheets ORDER BY position")]
+
+    def is_empty(self):
+        return not self.sheet_names()
+
+    def import_frames(self, frames):
+        # Replaces the stored sheets with the given processed frames
+        with self.connection:
+            for name in self.sheet_names():
+                self.connection.execute(f"DROP TABLE IF EXISTS {quote(name)}")
+            self.connection.execute("DELETE FROM sheets")
+            for position, (sheet_name, df) in enumerate(frames.items()):
+                self.connection.execute("INSERT INTO sheets (position, name, source) VALUES (?, ?, ?)",
+                                        (position, sheet_name, json.dumps(df.attrs.get("source"))))
+                if df.empty:
+                    continue
+                _sql_values(df).to_sql(sheet_name, self.connection, index=True, index_label=ROW_COL)
+                table = quote(sheet_name)
+                self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {VERSION_COL} INTEGER NOT NULL DEFAULT 0")
+                self.connection.execute(f"CREATE UNIQUE INDEX {quote(sheet_name + ' rows')} ON {table} ({ROW_COL})")
+                keys = [find_column(df.columns, EQUIPMENT_COLUMNS), find_column(df.columns, SOUS_ENSEMBLE_COLUMNS)]
+                keys = [quote(col) for col in keys if col is not None]
+                if keys:
+                    self.connection.execute(
+                        f"CREATE INDEX {quote(sheet_name + ' keys')} ON {table} ({', '.join(keys)})")
+
+    def import_workbook(self, path=WORKBOOK_PATH, sheet_configs=SHEET_CONFIGS):
+        self.import_frames(load_workbook(path, sheet_configs, use_cache=False))
+
+    def load_sheet(self, sheet_name):
+        source = self.connection.execute("SELECT source FROM sheets WHERE name = ?", (sheet_name,)).fetchone()
+        if source is None:
+            raise KeyError(sheet_name)
+        if not self.connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                       (sheet_name,)).fetchone():
+            return pd.DataFrame()
+        df = pd.read_sql_query(f"SELECT * FROM {quote(sheet_name)} ORDER BY {ROW_COL}", self.connection,
+                               index_col=ROW_COL)
+        df = df.drop(columns=VERSION_COL)
+        df.index.name = None
+        if source[0] is not None:
+            df.attrs["source"] = json.loads(source[0])
+        return df
+
+    def read_row(self, sheet_name, row, columns):
+        # (version, {column: value}) of one row as currently stored
+        values = self.connection.execute(
+            f"SELECT {VERSION_COL}, {', '.join(quote(col) for col in columns)} FROM {quote(sheet_name)} "
+            f"WHERE {ROW_COL} = ?", (int(row),)).fetchone()
+        if values is None:
+            raise KeyError(f"No row {row} in sheet {sheet_name}")
+        return values[0], dict(zip(columns, values[1:]))
+
+    def update_cells(self, sheet_name, row, changes):
+        # Optimistic save of one row in one transaction. changes maps each
+        # column to (base, value), base being the value the edit started
+        # from: a column another instance changed since keeps its value and
+        # is returned as a conflict, the others are merged. Returns the row
+        # version, the applied {column: value} and the {column: current
+        # value} conflicts.
+        with self.connection:
+            # Taking the write lock first keeps the read and the update atomic
+            self.connection.execute("BEGIN IMMEDIATE")
+            version, current = self.read_row(sheet_name, row, list(changes))
+            applied = {col: value for col, (base, value) in changes.items() if merge_cell(base, value, current[col])}
+            conflicts = {col: current[col] for col in changes if col not in applied}
+            if applied:
+                assignments = ", ".join(f"{quote(col)} = ?" for col in applied)
+                self.connection.execute(
+                    f"UPDATE {quote(sheet_name)} SET {assignments}, {VERSION_COL} = {VERSION_COL} + 1 "
+                    f"WHERE {ROW_COL} = ?", (*applied.values(), int(row)))
+                version += 1
+        return version, applied, conflicts
+
+    def export_workbook(self, path=WORKBOOK_PATH, sheet_configs=SHEET_CONFIGS):
+        # Writes back the stored numeric cells (the only ones the app edits)
+        # that differ from the workbook, so untouched cells are left as they
+        # are. Cells holding a formula keep it. Returns the number of cells
+        # written and the (sheet, equipment, sous-ensemble, column) of the
+        # formulas kept
+        workbook = load_workbook(path, sheet_configs)
+        edits = []
+        # (sheet, row, column) of each edit -> (sheet, equipment, sous-ensemble, column)
+        labels = {}
+        for sheet_name in self.sheet_names():
+            df = self.load_sheet(sheet_name)
+            current = workbook.get(sheet_name)
+            if df.empty or current is None:
+                continue
+            if layout(df) != layout(current) or not df.index.equals(current.index):
+                raise ValueError(f"The layout of sheet {sheet_name} changed since it was imported; "
+                                 f"import the workbook again before exporting.")
+            keys = [find_column(df.columns, EQUIPMENT_COLUMNS), find_column(df.columns, SOUS_ENSEMBLE_COLUMNS)]
+            for col in sheet_configs.get(sheet_name, {}).get("numeric_cols", []):
+                if col not in df.columns:
+                    continue
+                stored = pd.to_numeric(df[col], errors="coerce")
+                # Recalculated formulas may differ from Excel's results in the last bits
+                changed = ~np.isclose(stored.to_numpy(dtype=float), current[col].to_numpy(dtype=float),
+                                      rtol=1e-9, atol=1e-9, equal_nan=True)
+                changed = pd.Series(changed, index=stored.index)
+                for row, value in stored[changed].items():
+                    cell_row, cell_column = cell_coordinates(df, row, col)
+                    edits.append((sheet_name, cell_row, cell_column, None if pd.isna(value) else value))
+                    labels[edits[-1][:3]] = (sheet_name, *(df.at[row, key] if key else "" for key in keys), col)
+        kept = write_cells(path, edits) if edits else []
+        return len(edits) - len(kept), [labels[edit[:3]] for edit in kept]
+
+
+class SqlIngestor:
+    # WorkbookIngestor's interface over the database, so WorkbookLoader can
+    # publish stored sheets the same way. The connection is opened by open(),
+    # on the loader thread that uses it.
+
+    def __init__(self, path, workbook_path=WORKBOOK_PATH, sheet_configs=SHEET_CONFIGS):
+        self.path = path
+        self.workbook_path = workbook_path
+        self.sheet_configs = sheet_configs
+        self.backend = None
+
+    def open(self):
+        self.backend = SqlBackend(self.path)
+        if self.backend.is_empty():
+            # First start on this database: the workbook is imported once
+            self.backend.import_workbook(self.workbook_path, self.sheet_configs)
+        return self.backend.sheet_names()
+
+    def iter_sheets(self):
+        try:
+            for sheet_name in self.backend.sheet_names():
+                # Stored sheets are read back with wide dtypes
+                yield sheet_name, compact_frame(self.backend.load_sheet(sheet_name))
+        finally:
+            self.backend.close()
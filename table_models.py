@@ -0,0 +1,125 @@
+import numpy as np
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QBrush, QColor, QPalette
+from PyQt6.QtWidgets import QStyledItemDelegate
+
+from alerts import SEVERITIES
+
+
+class DataFrameModel(QAbstractTableModel):
+    # Read-only table model serving cells lazily from a DataFrame's column
+    # arrays; filtering swaps the array of visible row positions
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.df = None
+        self._headers = []
+        self._arrays = []
+        self._rows = np.empty(0, dtype=np.intp)
+
+    def set_frame(self, df, columns):
+        self.beginResetModel()
+        self.df = df
+        self._headers = list(columns)
+        self._arrays = []
+        for position, col in enumerate(self._headers):
+            if position < len(df.columns) and df.columns[position] == col:
+                self._arrays.append(df.iloc[:, position].to_numpy())
+            elif col in df.columns:
+                self._arrays.append(df.iloc[:, list(df.columns).index(col)].to_numpy())
+            else:
+                self._arrays.append(np.full(len(df), "", dtype=object))
+        self._rows = np.arange(len(df))
+        self.endResetModel()
+
+    def set_mask(self, mask):
+        self.beginResetModel()
+        self._rows = np.flatnonzero(mask)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            return str(self._arrays[index.column()][self._rows[index.row()]])
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self._headers[section]
+        return str(section + 1)
+
+
+class AlertListModel(QAbstractTableModel):
+    # Alerts as (severity, sheet, message) rows; set_alerts swaps the whole
+    # list in a single reset, and the view only asks for the visible rows
+    HEADERS = ["Severity", "Sheet", "Message"]
+    SEVERITY_ROLE = Qt.ItemDataRole.UserRole
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._alerts = []
+
+    def set_alerts(self, alerts):
+        self.beginResetModel()
+        self._alerts = list(alerts)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._alerts)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        alert = self._alerts[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return str(alert[index.column()])
+        if role == self.SEVERITY_ROLE:
+            return alert[0]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # Severity sorts by rank (critical first), the other columns as text
+        if column == 0:
+            def key(alert):
+                return SEVERITIES.index(alert[0]) if alert[0] in SEVERITIES else len(SEVERITIES)
+        else:
+            def key(alert):
+                return str(alert[column])
+        self.layoutAboutToBeChanged.emit()
+        self._alerts.sort(key=key, reverse=order == Qt.SortOrder.DescendingOrder)
+        self.layoutChanged.emit()
+
+
+class SeverityDelegate(QStyledItemDelegate):
+    # Colours every cell of an alert row from its severity;
+    # colours maps a severity to its (text, background) colours
+
+    def __init__(self, colours, parent=None):
+        super().__init__(parent)
+        self.colours = {severity: (QColor(text), QBrush(QColor(background)))
+                        for severity, (text, background) in colours.items()}
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        colours = self.colours.get(index.data(AlertListModel.SEVERITY_ROLE))
+        if colours is not None:
+            text, background = colours
+            option.backgroundBrush = background
+            option.palette.setColor(QPalette.ColorRole.Text, text)
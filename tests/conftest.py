@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The modules live at the repository root (python main.py), not in a package
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+sys.path.insert(0, os.path.join(REPO, "benchmarks"))
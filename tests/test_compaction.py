@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from compaction import compact_frame, set_value
+
+
+def frame():
+    df = pd.DataFrame({
+        "Equipement": ["EQ1", "EQ1", "EQ2", "EQ2"],
+        "OT": ["OT1", "OT2", "OT3", "OT4"],
+        "Qty": [1, 2, 3, 127],
+        "Hours": [10, 20, 300, 40000],
+        "Cost": [0.5, 1.25, 2.0, 3.5],
+        "Rate": [0.1, 0.2, 0.3, 0.4],
+    })
+    df.attrs["source"] = {"header_row": 1}
+    return df
+
+
+def test_compact_frame_picks_the_smallest_exact_dtypes():
+    df = compact_frame(frame())
+    assert isinstance(df["Equipement"].dtype, pd.CategoricalDtype)
+    # One value per row: left as text
+    assert df["OT"].dtype == object
+    assert [df[col].dtype for col in ["Qty", "Hours", "Cost", "Rate"]] == [np.int8, np.int32, np.float32, np.float64]
+    assert df.attrs["source"] == {"header_row": 1}
+    pd.testing.assert_frame_equal(df.astype(frame().dtypes), frame())
+
+
+def test_set_value_widens_int8_to_float64():
+    df = compact_frame(frame())
+    set_value(df, 0, "Qty", 200)
+    assert df["Qty"].dtype == np.float64
+    assert df["Qty"].tolist() == [200.0, 2.0, 3.0, 127.0]
+    # A fraction does not fit an integer column either
+    set_value(df, 1, "Hours", 2.5)
+    assert (df["Hours"].dtype, df.at[1, "Hours"]) == (np.float64, 2.5)
+
+
+def test_set_value_keeps_the_dtype_when_the_value_fits():
+    df = compact_frame(frame())
+    set_value(df, 0, "Qty", -128)
+    set_value(df, 0, "Cost", 0.75)
+    set_value(df, 1, "Cost", np.nan)
+    assert (df["Qty"].dtype, df["Cost"].dtype) == (np.int8, np.float32)
+    assert df.at[0, "Qty"] == -128
+    # 0.1 has no exact float32 form
+    set_value(df, 2, "Cost", 0.1)
+    assert (df["Cost"].dtype, df.at[2, "Cost"]) == (np.float64, 0.1)
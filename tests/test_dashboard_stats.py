@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from alerts import AVAILABLE_COL, AWAITING_COL, IN_PROGRESS_COL
+from ateliers import ATELIER_COL, atelier_stock
+from compaction import compact_frame, set_value
+from dashboard_stats import SheetStats
+from sheet_index import SheetIndex
+
+SHEET = "Cartographie moteur"
+
+
+def cartographie():
+    return compact_frame(pd.DataFrame({
+        "Equipement": ["EQ1", "EQ1", "EQ2", "EQ3"],
+        "Sous-ensemble": ["Moteur", "Turbo", "Moteur", "Moteur"],
+        AVAILABLE_COL: [1, 2, 0, 5],
+        AWAITING_COL: [0, 1, 1, 0],
+        IN_PROGRESS_COL: [1, 0, 0, 2],
+    }))
+
+
+def edit(stats, row, col, value):
+    old = stats.df.at[row, col]
+    set_value(stats.df, row, col, value)
+    stats.apply_edit(row, col, old)
+
+
+def test_atelier_stock_is_kept_by_edits():
+    df = cartographie()
+    stats = SheetStats(SHEET, df, SheetIndex(df))
+    # The atelier workbook is joined after the stats were built
+    df[ATELIER_COL] = ["Moteurs", "Moteurs", "Moteurs", np.nan]
+    first = stats.summary()
+    assert "Moteurs: 3 available, 2 awaiting, 1 in progress" in first
+    stock = stats.stock
+    edit(stats, 0, AVAILABLE_COL, 300)
+    edit(stats, 2, AWAITING_COL, 4)
+    # A row no workshop lists is not in the stock
+    edit(stats, 3, IN_PROGRESS_COL, 7)
+    assert "Moteurs: 302 available, 5 awaiting, 1 in progress" in stats.summary()
+    # Updated in place, not grouped again
+    assert stats.stock is stock
+    pd.testing.assert_frame_equal(stats.stock, atelier_stock(df).astype(float))
+    assert stats.sums == {AWAITING_COL: 5.0, IN_PROGRESS_COL: 8.0}
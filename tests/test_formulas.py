@@ -0,0 +1,111 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from openpyxl.worksheet.table import Table
+
+from check_roundtrip import REPO, check_roundtrip
+from formulas import FormulaError, FormulaResults, FormulaSheet, sheet_formulas
+
+
+def evaluate(rows, formulas, tables=None):
+    # Results of formulas {"C1": "A1+B1"} over the raw values rows
+    cells = {}
+    for name, text in formulas.items():
+        column, row = name[0], int(name[1:])
+        cells[(row - 1, ord(column) - ord("A"))] = text
+    sheet = FormulaSheet(pd.DataFrame(rows), cells, set(cells), tables or {})
+    return {name: sheet.evaluate(cell) for name, cell in zip(formulas, cells)}
+
+
+def test_operator_precedence_and_signs():
+    results = evaluate([[2.0, 3.0, None]], {"C1": "A1+B1*2^2", "D1": "-(A1+B1)/2", "E1": "=2^-1+.5e1"})
+    assert results == {"C1": 14.0, "D1": -2.5, "E1": 5.5}
+
+
+def test_empty_cells_are_zero_and_text_is_an_error():
+    results = evaluate([[None, "abc", 0.0]], {"D1": "A1*3+1", "E1": "B1+1", "F1": "1/C1"})
+    assert results == {"D1": 1.0, "E1": "#VALUE!", "F1": "#DIV/0!"}
+
+
+def test_sum_skips_text_in_ranges_and_chains_formulas():
+    rows = [[1.0, None], [2.0, None], ["n/a", None], [4.0, None]]
+    results = evaluate(rows, {"B1": "SUM(A1:A4)", "B2": "SUM(A1,A2,B1*2)", "B3": "B2-B1"})
+    assert results == {"B1": 7.0, "B2": 17.0, "B3": 10.0}
+
+
+def test_unsupported_function_and_circular_reference_raise():
+    with pytest.raises(FormulaError, match="unsupported"):
+        evaluate([[1.0]], {"B1": "IF(A1,1,2)"})
+    with pytest.raises(FormulaError, match="cannot read"):
+        evaluate([[1.0]], {"B1": "A1>0"})
+    with pytest.raises(FormulaError, match="circular"):
+        evaluate([[None, None]], {"A1": "B1+1", "B1": "A1+1"})
+    with pytest.raises(FormulaError):
+        evaluate([[1.0]], {"B1": "Other!A1*2"})
+
+
+def test_structured_references():
+    # Table Costs over A1:C4 (header row 1, totals row 4); the column
+    # names are matched whatever their line breaks and case
+    tables = {"costs": (0, 0, 3, 2, 1, 1, ["Qty", "Devis\nunitaire", "Cout V1/[V2]"])}
+    rows = [["Qty", "Devis unitaire", "Cout"], [2.0, 10.0, None], [3.0, 5.0, None], [None, None, None]]
+    results = evaluate(rows, {
+        "C2": "Costs[[#This Row],[Qty]]*Costs[[#This Row],[devis unitaire]]",
+        "C3": "Costs[[#This Row],[Qty]]*Costs[[#This Row],[Devis unitaire]]",
+        "A4": "SUM(Costs[Qty])",
+        "C4": "SUM(Costs[Cout V1/'[V2']])",
+        "B4": "Costs[[#This Row],[Qty]]",
+    }, tables)
+    assert results == {"C2": 20.0, "C3": 15.0, "A4": 5.0, "C4": 35.0, "B4": "#VALUE!"}
+    with pytest.raises(FormulaError, match="unknown column"):
+        evaluate(rows, {"C2": "Costs[[#This Row],[Price]]"}, tables)
+    with pytest.raises(FormulaError, match="unknown table"):
+        evaluate(rows, {"C2": "Prices[Qty]"}, tables)
+
+
+def test_sheet_formulas_expands_shared_formulas_and_finds_missing_results():
+    xml = ('<sheetData><row r="1"><c r="C1"><f t="shared" ref="C1:C3" si="0">A1*B1</f><v>6</v></c></row>'
+           '<row r="2"><c r="C2"><f t="shared" si="0"/><v></v></c></row>'
+           '<row r="3"><c r="C3"><f t="shared" si="0"/></c><c r="D3"><f>SUM(C1:C3)&gt;0</f></c></row></sheetData>')
+    formulas, missing = sheet_formulas(xml)
+    assert formulas == {(0, 2): "A1*B1", (1, 2): "A2*B2", (2, 2): "A3*B3", (2, 3): "SUM(C1:C3)>0"}
+    assert missing == {(1, 2), (2, 2), (2, 3)}
+
+
+def openpyxl_workbook(path, formula):
+    # A sheet of quantities and prices with a Costs table, saved by openpyxl,
+    # i.e. without the results of its formulas
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Costs"
+    ws.append(["Qty", "Price", "Cost"])
+    ws.append([2, 10, "=Costs[[#This Row],[Qty]]*Costs[[#This Row],[Price]]"])
+    ws.append([3, 5, formula])
+    ws.add_table(Table(displayName="Costs", ref="A1:C3"))
+    wb.save(path)
+    return path
+
+
+def test_fill_recalculates_a_workbook_saved_by_openpyxl(tmp_path):
+    path = openpyxl_workbook(str(tmp_path / "costs.xlsx"), "=A3*B3")
+    results = FormulaResults(path)
+    assert results.stale_sheets == ["Costs"]
+    raw = pd.read_excel(path, header=None)
+    assert raw[2].iloc[1:].isna().all()
+    assert results.fill("Costs", raw)[2].iloc[1:].tolist() == [20.0, 15.0]
+
+
+def test_fill_raises_on_an_unsupported_formula(tmp_path):
+    # The cell must not load as empty (NaN -> 0 in the numeric columns)
+    path = openpyxl_workbook(str(tmp_path / "costs.xlsx"), "=ROUND(A3*B3,0)")
+    with pytest.raises(FormulaError, match=r"1 formula\(s\) of sheet Costs.*C3 \(=ROUND\(A3\*B3,0\)\)"):
+        FormulaResults(path).fill("Costs", pd.read_excel(path, header=None))
+
+
+@pytest.mark.skipif(not os.path.exists(os.path.join(REPO, "ENGINS.xlsx")), reason="needs ENGINS.xlsx")
+def test_saving_engins_keeps_every_column_total(tmp_path):
+    path = shutil.copy(os.path.join(REPO, "ENGINS.xlsx"), tmp_path / "ENGINS.xlsx")
+    assert check_roundtrip(str(path)) == []
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from header_detection import HeaderMatcher, normalize_header
+
+HEADERS = ["Equipement", "Sous-ensemble", "compteur actuel S45/2024", "Date", "OT", "Date", "OT"]
+PREFIXES = [("compteur actuel S45/2024", "compteur actuel")]
+
+
+def test_normalize_header_ignores_accents_case_and_punctuation():
+    assert normalize_header("  Devis \nunitaire ") == normalize_header("devis unitaire")
+    assert normalize_header("Équipement") == "equipement"
+    assert normalize_header("Sous ensemble") == normalize_header("Sous-ensemble")
+
+
+def test_exact_matches_take_repeated_headers_left_to_right():
+    cells = ["OT", "Date", "equipement", "SOUS ENSEMBLE", "Compteur actuel S45/2024", "Date", "OT"]
+    assert HeaderMatcher(HEADERS, PREFIXES).match(cells) == [2, 3, 4, 1, 0, 5, 6]
+
+
+def test_prefix_matches_another_week():
+    cells = ["Equipement", "Sous-ensemble", "compteur actuel S46/2024", "Date", "OT", "Date", "OT"]
+    assert HeaderMatcher(HEADERS, PREFIXES).match(cells)[2] == 2
+    # Without its prefix the week's header is not found
+    assert HeaderMatcher(HEADERS).match(cells)[2] is None
+
+
+def test_containment_matches_a_drifted_header():
+    matcher = HeaderMatcher(["Equipement", "Devis unitaire"])
+    assert matcher.match(["Equipement (code)", np.nan, "Devis unitaire HT"]) == [0, 2]
+    # A cell already taken by an exact match is not reused
+    assert HeaderMatcher(["Equipement", "Equipement bis"]).match(["Equipement", "x"]) == [0, None]
+
+
+def test_find_skips_metadata_rows():
+    raw = pd.DataFrame([
+        ["Parc engins", None, None],
+        [None, "Semaine 46", None],
+        ["Equipement", "Sous ensemble", "compteur actuel S46/2024"],
+        ["EQ1", "Moteur", 1200],
+    ])
+    matcher = HeaderMatcher(["Equipement", "Sous-ensemble", "compteur actuel S45/2024"], PREFIXES)
+    assert matcher.find(raw) == (2, [0, 1, 2])
+    assert matcher.find(raw.iloc[3:]) == (None, None)
@@ -0,0 +1,83 @@
+import pytest
+from openpyxl import Workbook, load_workbook
+from PyQt6.QtCore import QCoreApplication
+
+from save_queue import SaveQueue
+
+KEY = ("Sheet", "EQ1", "SE1", "Qty")
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def workbook(path, value):
+    wb = Workbook()
+    wb.active.title = "Sheet"
+    wb["Sheet"]["B2"] = value
+    wb.save(path)
+    return str(path)
+
+
+def cell(path):
+    wb = load_workbook(path)
+    try:
+        return wb["Sheet"]["B2"].value
+    finally:
+        wb.close()
+
+
+def test_enqueue_coalesces_edits_and_keeps_the_first_base(app, tmp_path):
+    path = workbook(tmp_path / "book.xlsx", 1)
+    queue = SaveQueue(path)
+    queue.enqueue(KEY, "Sheet", 2, 2, 1, 2)
+    queue.enqueue(KEY, "Sheet", 2, 2, 2, 3)
+    assert queue.pending == {KEY: ("Sheet", 2, 2, 1, 3)}
+    # The workbook still holds the first base, so the collapsed edit merges
+    saved = []
+    queue.saved.connect(saved.append)
+    queue.flush_now()
+    assert (queue.pending, saved, cell(path)) == ({}, [1], 3)
+
+
+def test_failed_batch_is_requeued_under_a_newer_edit(app, tmp_path):
+    missing = str(tmp_path / "missing.xlsx")
+    queue = SaveQueue(missing)
+    failures = []
+    queue.failed.connect(failures.append)
+    queue.enqueue(KEY, "Sheet", 2, 2, 1, 2)
+    queue.flush()
+    assert queue.pending == {}
+    # Edited again while the batch is being written
+    queue.enqueue(KEY, "Sheet", 2, 2, 2, 5)
+    queue.worker.wait()
+    QCoreApplication.processEvents()
+    assert len(failures) == 1
+    # The newer value, based on what the workbook last held
+    assert queue.pending == {KEY: ("Sheet", 2, 2, 1, 5)}
+    queue.timer.stop()
+
+
+def test_flush_now_keeps_the_edits_when_the_write_fails(app, tmp_path):
+    path = str(tmp_path / "book.xlsx")
+    queue = SaveQueue(path)
+    queue.enqueue(KEY, "Sheet", 2, 2, 1, 2)
+    with pytest.raises(FileNotFoundError):
+        queue.flush_now()
+    assert queue.pending == {KEY: ("Sheet", 2, 2, 1, 2)}
+    # A retry once the workbook is available writes them
+    workbook(path, 1)
+    queue.flush_now()
+    assert (queue.pending, cell(path)) == ({}, 2)
+
+
+def test_flush_now_reports_cells_changed_by_another_instance(app, tmp_path):
+    path = workbook(tmp_path / "book.xlsx", 7)
+    queue = SaveQueue(path)
+    conflicts = []
+    queue.conflicts.connect(conflicts.extend)
+    queue.enqueue(KEY, "Sheet", 2, 2, 1, 2)
+    queue.flush_now()
+    assert conflicts == [(KEY, 2, 7, 1)]
+    assert (queue.pending, cell(path)) == ({}, 7)
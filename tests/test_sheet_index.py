@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sheet_index import SheetIndex
+
+
+def frame(categorical):
+    df = pd.DataFrame({
+        "équipement": ["EQ2", "EQ1", "EQ1", "EQ2", None, "EQ1"],
+        "Sous ensemble": ["Turbo", "Moteur", "Boite", "Turbo", "Moteur", np.nan],
+        "Qty": [1, 2, 3, 4, 5, 6],
+    }, index=[10, 11, 12, 13, 14, 15])
+    if categorical:
+        df = df.astype({"équipement": "category", "Sous ensemble": "category"})
+    return df
+
+
+@pytest.mark.parametrize("categorical", [False, True])
+def test_lookup_takes_the_first_row_of_each_pair(categorical):
+    index = SheetIndex(frame(categorical))
+    assert (index.equipment_col, index.sous_ensemble_col) == ("équipement", "Sous ensemble")
+    assert index.equipments == ["EQ1", "EQ2"]
+    assert index.sous_ensemble_list("EQ1") == ["Boite", "Moteur"]
+    assert index.sous_ensemble_list("EQ3") == []
+    # EQ2 / Turbo is on rows 10 and 13: the first one wins
+    assert index.rows == {("EQ2", "Turbo"): 10, ("EQ1", "Moteur"): 11, ("EQ1", "Boite"): 12}
+    assert index.lookup("EQ2", "Turbo") == 10
+    assert index.lookup("EQ2", "Moteur") is None
+
+
+def test_sheet_without_sous_ensembles():
+    index = SheetIndex(pd.DataFrame({"Equipement": ["B", "A", "B"]}))
+    assert (index.equipments, index.rows, index.sous_ensemble_col) == (["A", "B"], {}, None)
+    assert SheetIndex(pd.DataFrame({"Other": [1]})).equipments == []
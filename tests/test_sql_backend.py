@@ -0,0 +1,67 @@
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from sql_backend import SqlBackend
+
+CONFIGS = {"Costs": {"headers": ["Equipement", "Sous-ensemble", "Qty", "Cost"], "numeric_cols": ["Qty", "Cost"]}}
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    # A metadata row above the headers, and costs computed by formulas
+    path = str(tmp_path / "ENGINS.xlsx")
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Costs"
+    ws.append(["Programme 2025"])
+    ws.append(CONFIGS["Costs"]["headers"])
+    ws.append(["EQ1", "Moteur", 1, "=C3*10"])
+    ws.append(["EQ2", "Turbo", 2, "=C4*10"])
+    wb.save(path)
+    return path
+
+
+@pytest.fixture
+def backends(tmp_path, workbook):
+    # Two instances sharing one database
+    database = str(tmp_path / "engins.sqlite")
+    first = SqlBackend(database)
+    first.import_workbook(workbook, CONFIGS)
+    second = SqlBackend(database)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_import_keeps_the_processed_values(backends):
+    df = backends[0].load_sheet("Costs")
+    assert df["Cost"].tolist() == [10, 20]
+    assert df.attrs["source"]["header_row"] == 1
+
+
+def test_update_cells_reports_columns_changed_by_another_instance(backends):
+    first, second = backends
+    assert first.update_cells("Costs", 0, {"Qty": (1, 5)}) == (1, {"Qty": 5}, {})
+    # second still shows Qty 1: its edit of Qty conflicts, its edit of Cost
+    # (unchanged since it was read) is merged in the same save
+    version, applied, conflicts = second.update_cells("Costs", 0, {"Qty": (1, 7), "Cost": (10, 12)})
+    assert (version, applied, conflicts) == (2, {"Cost": 12}, {"Qty": 5})
+    assert first.read_row("Costs", 0, ["Qty", "Cost"]) == (2, {"Qty": 5, "Cost": 12})
+    # An edit to the value already stored is not a conflict
+    assert second.update_cells("Costs", 0, {"Qty": (1, 5)}) == (3, {"Qty": 5}, {})
+    with pytest.raises(KeyError):
+        first.update_cells("Costs", 9, {"Qty": (0, 1)})
+
+
+def test_export_writes_changed_cells_and_keeps_formulas(backends, workbook):
+    first, _ = backends
+    first.update_cells("Costs", 0, {"Qty": (1, 3)})
+    first.update_cells("Costs", 1, {"Cost": (20, 25)})
+    written, kept = first.export_workbook(workbook, CONFIGS)
+    assert (written, kept) == (1, [("Costs", "EQ2", "Turbo", "Cost")])
+    ws = load_workbook(workbook)["Costs"]
+    assert [ws["C3"].value, ws["D3"].value, ws["D4"].value] == [3, "=C3*10", "=C4*10"]
+    # Nothing left to write; the stored cost of EQ1 now differs from its
+    # formula (=C3*10 -> 30), which is reported too
+    assert first.export_workbook(workbook, CONFIGS) == (0, [("Costs", "EQ1", "Moteur", "Cost"),
+                                                            ("Costs", "EQ2", "Turbo", "Cost")])
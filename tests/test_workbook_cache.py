@@ -0,0 +1,28 @@
+import logging
+import os
+
+import pandas as pd
+
+from workbook_cache import cache_file, load_cache, save_cache
+
+KEY = {"format": 0, "workbook": "sha", "configs": "sha"}
+
+
+def test_cache_round_trip_leaves_no_temporary_file(tmp_path):
+    path = str(tmp_path / "ENGINS.xlsx")
+    frames = {"Sheet": pd.DataFrame({"Qty": [1, 2]})}
+    save_cache(path, KEY, frames)
+    assert os.listdir(os.path.dirname(cache_file(path))) == ["ENGINS.xlsx.pkl"]
+    pd.testing.assert_frame_equal(load_cache(path, KEY)["Sheet"], frames["Sheet"])
+    assert load_cache(path, dict(KEY, format=1)) is None
+
+
+def test_unreadable_cache_is_logged_not_printed(tmp_path, caplog, capsys):
+    path = str(tmp_path / "ENGINS.xlsx")
+    os.makedirs(os.path.dirname(cache_file(path)))
+    with open(cache_file(path), "wb") as f:
+        f.write(b"not a pickle")
+    with caplog.at_level(logging.WARNING, logger="workbook_cache"):
+        assert load_cache(path, KEY) is None
+    assert "Ignoring unreadable cache" in caplog.text
+    assert capsys.readouterr().out == ""
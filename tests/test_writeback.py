@@ -0,0 +1,111 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from check_roundtrip import REPO
+from writeback import LOCK_SUFFIX, merge_cell, merge_cells, workbook_lock, write_cells
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = str(tmp_path / "ENGINS.xlsx")
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Sheet"
+    ws.append(["Qty", "Cost", "Total"])
+    ws.append([1, 9, "=A2*B2"])
+    wb.save(path)
+    return path
+
+
+def cells(path):
+    wb = load_workbook(path)
+    try:
+        return [cell.value for cell in wb["Sheet"][2]]
+    finally:
+        wb.close()
+
+
+def test_merge_cell():
+    # Unchanged since the edit started, or already holding the new value
+    assert merge_cell(1, 2, 1.0)
+    assert merge_cell(None, 2, 0)
+    assert merge_cell(1, 2, 2)
+    # Changed by another instance, or a formula
+    assert not merge_cell(1, 2, 3)
+    assert not merge_cell(1, 2, "=A2*2")
+
+
+def test_merge_cells_writes_unchanged_cells_only(workbook):
+    edits = [("Sheet", 2, 1, 1, 4), ("Sheet", 2, 2, 5, 6), ("Sheet", 2, 3, 9, 10)]
+    assert merge_cells(workbook, edits) == (1, [(1, 9), (2, "=A2*B2")])
+    assert cells(workbook) == [4, 9, "=A2*B2"]
+    assert not os.path.exists(workbook + LOCK_SUFFIX)
+
+
+def test_write_cells_keeps_formulas(workbook):
+    assert write_cells(workbook, [("Sheet", 2, 2, 7), ("Sheet", 2, 3, 70)]) == [("Sheet", 2, 3, 70)]
+    assert cells(workbook) == [1, 7, "=A2*B2"]
+
+
+def hold_lock(path):
+    # Another instance holding the lock until it is killed
+    code = ("import sys, time\nfrom writeback import workbook_lock\n"
+            "with workbook_lock(sys.argv[1]):\n    print('locked', flush=True)\n    time.sleep(60)\n")
+    holder = subprocess.Popen([sys.executable, "-c", code, path], cwd=REPO, stdout=subprocess.PIPE, text=True)
+    assert holder.stdout.readline() == "locked\n"
+    return holder
+
+
+def test_lock_left_by_a_crashed_instance_is_taken_over(workbook):
+    holder = hold_lock(workbook)
+    try:
+        with pytest.raises(TimeoutError):
+            with workbook_lock(workbook, timeout=0.5):
+                pass
+    finally:
+        holder.kill()
+        holder.wait()
+    # The lock file is still there, but nobody holds it any more
+    assert os.path.exists(workbook + LOCK_SUFFIX)
+    started = time.monotonic()
+    with workbook_lock(workbook, timeout=0.5):
+        assert time.monotonic() - started < 0.5
+    assert not os.path.exists(workbook + LOCK_SUFFIX)
+
+
+def test_lock_excludes_processes_and_threads(tmp_path):
+    # Unprotected read-modify-write of a counter: no increment may be lost
+    path = str(tmp_path / "counter")
+    with open(path, "w") as f:
+        f.write("0")
+    code = ("import sys, time\nfrom writeback import workbook_lock\n"
+            "for _ in range(20):\n"
+            "    with workbook_lock(sys.argv[1]):\n"
+            "        value = int(open(sys.argv[1]).read())\n"
+            "        time.sleep(0.001)\n"
+            "        open(sys.argv[1], 'w').write(str(value + 1))\n")
+
+    def increment():
+        for _ in range(20):
+            with workbook_lock(path):
+                with open(path) as f:
+                    value = int(f.read())
+                time.sleep(0.001)
+                with open(path, "w") as f:
+                    f.write(str(value + 1))
+
+    processes = [subprocess.Popen([sys.executable, "-c", code, path], cwd=REPO) for _ in range(4)]
+    threads = [threading.Thread(target=increment) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [process.wait() for process in processes] == [0] * 4
+    with open(path) as f:
+        assert int(f.read()) == 6 * 20
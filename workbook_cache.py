@@ -0,0 +1,75 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+
+# Preprocessed sheets are stored next to the workbook, one file per workbook
+CACHE_DIR = ".engins_cache"
+
+# Bump whenever preprocess_sheet produces differently shaped frames
+CACHE_FORMAT = 8
+
+logger = logging.getLogger(__name__)
+
+
+def workbook_fingerprint(path):
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+
+
+def config_fingerprint(sheet_configs):
+    payload = json.dumps(sheet_configs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_key(path, sheet_configs):
+    return {"format": CACHE_FORMAT, "workbook": workbook_fingerprint(path),
+            "configs": config_fingerprint(sheet_configs)}
+
+
+def cache_file(path):
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, CACHE_DIR, name + ".pkl")
+
+
+def load_cache(path, key):
+    # The key is pickled ahead of the frames so a stale cache is rejected
+    # without deserialising the data
+    try:
+        with open(cache_file(path), "rb") as f:
+            if pickle.load(f) != key:
+                return None
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Ignoring unreadable cache for %s: %s", path, e)
+        return None
+
+
+def save_cache(path, key, data):
+    # Written to a temporary file of its own, then moved in place: instances
+    # loading the same workbook never write into each other's file
+    target = cache_file(path)
+    tmp = None
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(target), prefix=os.path.basename(target) + ".",
+                                         suffix=".tmp", delete=False) as f:
+            tmp = f.name
+            pickle.dump(key, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, target)
+    except OSError as e:
+        logger.warning("Could not write cache for %s: %s", path, e)
+        if tmp is not None:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
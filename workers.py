@@ -0,0 +1,59 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from ingestion import WorkbookIngestor
+from profiling import span
+from sheet_index import SheetIndex
+from writeback import merge_cells
+
+
+class WorkbookLoader(QThread):
+    # Parses the workbook off the GUI thread and publishes every sheet as
+    # soon as it has been preprocessed
+    sheets_listed = pyqtSignal(list)
+    sheet_loaded = pyqtSignal(str, object, object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, path, sheet_configs, parent=None, ingestor=None):
+        super().__init__(parent)
+        # Any object with open() and iter_sheets() can stand in for the
+        # workbook, e.g. the SQL backend's SqlIngestor
+        self.ingestor = ingestor or WorkbookIngestor(path, sheet_configs)
+
+    def run(self):
+        try:
+            with span("workbook load"):
+                self.sheets_listed.emit(self.ingestor.open())
+                for sheet_name, df in self.ingestor.iter_sheets():
+                    # The lookup index is built here too, off the GUI thread
+                    with span("sheet index", sheet_name):
+                        index = SheetIndex(df)
+                    self.sheet_loaded.emit(sheet_name, df, index)
+                    if self.isInterruptionRequested():
+                        return
+        except FileNotFoundError:
+            self.failed.emit(f"Excel file '{self.ingestor.path}' not found.")
+        except Exception as e:
+            self.failed.emit(f"Failed to load '{self.ingestor.path}': {e}")
+
+
+class SaveWorker(QThread):
+    # Merges one batch of cell edits into the workbook off the GUI thread;
+    # the edits another instance got to first are reported in conflicts
+    saved = pyqtSignal(int)
+    conflicts = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, path, edits, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.edits = edits
+
+    def run(self):
+        try:
+            with span("save workbook", f"{len(self.edits)} cells"):
+                written, conflicts = merge_cells(self.path, self.edits)
+            if conflicts:
+                self.conflicts.emit(conflicts)
+            self.saved.emit(written)
+        except Exception as e:
+            self.failed.emit(str(e))
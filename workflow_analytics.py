@@ -0,0 +1,164 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from alerts import IN_PROGRESS_COL
+from ateliers import join_keys
+from sheet_configs import CARTOGRAPHIE_SHEETS
+from sheet_index import EQUIPMENT_COLUMNS, SOUS_ENSEMBLE_COLUMNS, find_column
+from workflow_store import WORKFLOW_STEPS
+
+# Revision flow measured from the workflow journal. Every S/E is one row of
+# a completion matrix (the time each step was last ticked or answered, NaT
+# while it is not); lead times, WIP and throughput are column operations on
+# that matrix, and new journal events only rewrite the cells they touch.
+STEPS = [step for step, _ in WORKFLOW_STEPS]
+# Ticking the identification card step moves the S/E to "en cours de révision"
+FINAL_STEP = STEPS[-1]
+PERCENTILES = [50, 90]
+KEY_COLUMNS = ["equipment", "sous_ensemble"]
+
+
+def completion_matrix(events, matrix=None):
+    # Applies journal events (oldest first) to a completion matrix, or to an
+    # empty one: only the last event of each (S/E, step) matters
+    if matrix is None:
+        matrix = pd.DataFrame(columns=STEPS, dtype="datetime64[ns]",
+                              index=pd.MultiIndex.from_tuples([], names=KEY_COLUMNS))
+    if events.empty:
+        return matrix
+    last = events.drop_duplicates(KEY_COLUMNS + ["step"], keep="last")
+    last = last[last["step"].isin(STEPS)]
+    keys = pd.MultiIndex.from_frame(last[KEY_COLUMNS])
+    matrix = matrix.reindex(matrix.index.union(keys.unique(), sort=False))
+    values = matrix.to_numpy(dtype="datetime64[ns]")
+    times = pd.to_datetime(last["at"]).to_numpy(dtype="datetime64[ns]")
+    values[matrix.index.get_indexer(keys), matrix.columns.get_indexer(last["step"])] = np.where(
+        last["value"].notna().to_numpy(), times, np.datetime64("NaT"))
+    return pd.DataFrame(values, index=matrix.index, columns=STEPS)
+
+
+def lead_times(matrix):
+    # Days each step took, from the completion of the previous step done
+    # for the same S/E (steps skipped by a "Non" path are not counted);
+    # NaN where the step is not done, is the first one done or was ticked
+    # before the step preceding it
+    values = matrix.to_numpy(dtype="datetime64[ns]")
+    previous = pd.DataFrame(values).shift(1, axis=1).ffill(axis=1).to_numpy(dtype="datetime64[ns]")
+    days = (values - previous) / np.timedelta64(1, "D")
+    days[days < 0] = np.nan
+    return pd.DataFrame(days, index=matrix.index, columns=STEPS)
+
+
+def step_statistics(matrix):
+    # Per step: S/E through it, mean and percentile lead times in days; the
+    # bottleneck is the step with the highest upper percentile
+    days = lead_times(matrix).to_numpy(dtype=float)
+    counts = np.sum(~np.isnan(days), axis=0)
+    with warnings.catch_warnings():
+        # A step nobody went through yet has no lead time
+        warnings.simplefilter("ignore", RuntimeWarning)
+        means = np.nanmean(days, axis=0)
+        quantiles = np.nanpercentile(days, PERCENTILES, axis=0)
+    stats = pd.DataFrame({"step": STEPS, "count": counts, "mean days": means})
+    for percentile, values in zip(PERCENTILES, quantiles):
+        stats[f"p{percentile} days"] = values
+    upper = stats[f"p{PERCENTILES[-1]} days"]
+    stats["bottleneck"] = upper.notna() & (upper == upper.max())
+    return stats
+
+
+def work_in_progress(matrix):
+    # Revisions started but whose final step is not done, counted by the
+    # last step done (the one they wait after)
+    values = matrix.to_numpy(dtype="datetime64[ns]")
+    done = ~np.isnat(values)
+    open_rows = done.any(axis=1) & ~done[:, STEPS.index(FINAL_STEP)]
+    last_done = len(STEPS) - 1 - np.argmax(done[:, ::-1], axis=1)
+    counts = np.bincount(last_done[open_rows], minlength=len(STEPS))
+    return pd.DataFrame({"waiting after": STEPS, "S/E": counts})
+
+
+def weekly_throughput(matrix):
+    # Revisions started (first step done) and passed to "en cours de
+    # révision" (final step done) per week, weeks starting on Monday
+    weeks = {}
+    for name, times in [("started", matrix.min(axis=1)), ("finished", matrix[FINAL_STEP])]:
+        times = pd.to_datetime(times).dropna().dt.normalize()
+        monday = times - pd.to_timedelta(times.dt.weekday, unit="D")
+        weeks[name] = monday.dt.strftime("%Y-%m-%d").value_counts()
+    table = pd.DataFrame(weeks).reindex(columns=list(weeks)).fillna(0).astype(int).sort_index()
+    table.index.name = "week"
+    return table.reset_index()
+
+
+def in_progress_check(matrix, frames, sheets=CARTOGRAPHIE_SHEETS):
+    # The Cartographie "Sous-ensemble encours de révision" count of every
+    # S/E next to the workflow's view of it; "matches" is False where the
+    # workflow passed an S/E to revision and the sheet shows none in
+    # progress, or the other way round
+    parts = []
+    for sheet_name in sheets:
+        df = frames.get(sheet_name)
+        if df is None or df.empty or IN_PROGRESS_COL not in df.columns:
+            continue
+        keys = join_keys(df)
+        if keys is None:
+            continue
+        parts.append(pd.DataFrame({
+            "sheet": sheet_name,
+            "Equipement": df[find_column(df.columns, EQUIPMENT_COLUMNS)].to_numpy(),
+            "Sous-ensemble": df[find_column(df.columns, SOUS_ENSEMBLE_COLUMNS)].to_numpy(),
+            "key": keys.to_numpy(),
+            IN_PROGRESS_COL: df[IN_PROGRESS_COL].to_numpy(),
+        }))
+    if not parts:
+        return pd.DataFrame(columns=["sheet", "Equipement", "Sous-ensemble", IN_PROGRESS_COL,
+                                     "workflow", "matches"])
+    table = pd.concat(parts, ignore_index=True)
+
+    workflow = matrix.index.to_frame(index=False).rename(
+        columns={"equipment": "Equipement", "sous_ensemble": "Sous-ensemble"})
+    values = matrix.to_numpy(dtype="datetime64[ns]")
+    done = ~np.isnat(values)
+    status = np.where(done[:, STEPS.index(FINAL_STEP)], "in revision",
+                      np.where(done.any(axis=1), "preparing", "not started"))
+    status = pd.Series(status, index=join_keys(workflow).to_numpy()) if len(workflow) else pd.Series(dtype=object)
+    status = status[~status.index.duplicated(keep="last")]
+
+    table["workflow"] = table["key"].map(status).fillna("not started")
+    in_progress = pd.to_numeric(table[IN_PROGRESS_COL], errors="coerce").fillna(0) > 0
+    table["matches"] = in_progress == (table["workflow"] == "in revision")
+    return table.drop(columns="key")
+
+
+class WorkflowAnalytics:
+    # Keeps the completion matrix of a WorkflowStore current by reading only
+    # the events journaled since the last refresh
+
+    def __init__(self, store):
+        self.store = store
+        self.last_id = 0
+        self.matrix = completion_matrix(pd.DataFrame())
+
+    def refresh(self):
+        # Returns the number of new events applied
+        events = self.store.events(after_id=self.last_id)
+        if events.empty:
+            return 0
+        self.matrix = completion_matrix(events, self.matrix)
+        self.last_id = int(events["id"].max())
+        return len(events)
+
+    def step_statistics(self):
+        return step_statistics(self.matrix)
+
+    def work_in_progress(self):
+        return work_in_progress(self.matrix)
+
+    def weekly_throughput(self):
+        return weekly_throughput(self.matrix)
+
+    def in_progress_check(self, frames):
+        return in_progress_check(self.matrix, frames)
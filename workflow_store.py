@@ -0,0 +1,146 @@
+import datetime
+import os
+import sqlite3
+
+import pandas as pd
+
+# State of the revision workflow (the Workflow tab's checklist) per
+# equipment and sous-ensemble, with a journal of every transition. The
+# current state is one row per (equipment, sous-ensemble, step), clustered
+# by its key, so restoring a sous-ensemble's checklist is one index range.
+WORKFLOW_PATH = "engins_workflow.sqlite"
+
+# Steps in workflow order; a step is either ticked (DONE) or not, a
+# decision is "Oui", "Non" or unanswered
+DONE = "done"
+DECISIONS = ["Oui", "Non"]
+WORKFLOW_STEPS = [
+    ("Expert S/E à réviser", "step"),
+    ("Besoin en PDR?", "decision"),
+    ("Identification S/E et besoin en PDR, équipement, logistique", "step"),
+    ("Besoin en MEC?", "decision"),
+    ("Récupération équipement", "step"),
+    ("Processus de préparation", "step"),
+    ("Récupération Bon sortie OT", "step"),
+    ("S/E critique", "decision"),
+    ("Établissement d'un planning de révision", "step"),
+    ("Intervention spécifique", "decision"),
+    ("Préparation G.O.", "step"),
+    ("Lancement des travaux de révision S/E", "step"),
+    ("Instruction de la carte d'identification", "step"),
+]
+STEP_KINDS = dict(WORKFLOW_STEPS)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workflow_state (
+    equipment TEXT NOT NULL,
+    sous_ensemble TEXT NOT NULL,
+    step TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (equipment, sous_ensemble, step)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS workflow_events (
+    id INTEGER PRIMARY KEY,
+    equipment TEXT NOT NULL,
+    sous_ensemble TEXT NOT NULL,
+    step TEXT NOT NULL,
+    value TEXT,
+    previous TEXT,
+    at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS workflow_events_key ON workflow_events (equipment, sous_ensemble, at);
+CREATE INDEX IF NOT EXISTS workflow_events_at ON workflow_events (at);
+"""
+
+
+def workflow_path(workbook_path):
+    # The store lives next to the workbook, like the history store
+    return os.path.join(os.path.dirname(os.path.abspath(workbook_path)), WORKFLOW_PATH)
+
+
+def _key(equipment, sous_ensemble):
+    return str(equipment).strip(), str(sous_ensemble).strip()
+
+
+def check_value(step, value):
+    # None clears a step or a decision
+    kind = STEP_KINDS.get(step)
+    if kind is None:
+        raise ValueError(f"Unknown workflow step {step!r}")
+    allowed = [DONE] if kind == "step" else DECISIONS
+    if value is not None and value not in allowed:
+        raise ValueError(f"Invalid value {value!r} for workflow {kind} {step!r}")
+
+
+class WorkflowStore:
+
+    def __init__(self, path=WORKFLOW_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # WAL: readers (reports, another window) never wait for a click to be
+        # recorded, and a commit is an append to the journal
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def state(self, equipment, sous_ensemble):
+        # {step: value} of the steps ticked and decisions taken for one S/E
+        rows = self.connection.execute(
+            "SELECT step, value FROM workflow_state WHERE equipment = ? AND sous_ensemble = ?",
+            _key(equipment, sous_ensemble))
+        return dict(rows)
+
+    def set_state(self, equipment, sous_ensemble, step, value, at=None):
+        # Records one transition in a single transaction; returns False when
+        # the step already had this value (nothing is journaled)
+        check_value(step, value)
+        key = _key(equipment, sous_ensemble)
+        at = (at or datetime.datetime.now()).isoformat(timespec="seconds")
+        with self.connection:
+            previous = self.connection.execute(
+                "SELECT value FROM workflow_state WHERE equipment = ? AND sous_ensemble = ? AND step = ?",
+                (*key, step)).fetchone()
+            previous = previous[0] if previous else None
+            if previous == value:
+                return False
+            if value is None:
+                self.connection.execute(
+                    "DELETE FROM workflow_state WHERE equipment = ? AND sous_ensemble = ? AND step = ?",
+                    (*key, step))
+            else:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO workflow_state (equipment, sous_ensemble, step, value, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)", (*key, step, value, at))
+            self.connection.execute(
+                "INSERT INTO workflow_events (equipment, sous_ensemble, step, value, previous, at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (*key, step, value, previous, at))
+        return True
+
+    def states(self):
+        # Current state of every S/E, one row per step set
+        return pd.read_sql_query("SELECT * FROM workflow_state ORDER BY equipment, sous_ensemble",
+                                 self.connection)
+
+    def events(self, equipment=None, sous_ensemble=None, since=None, after_id=None):
+        # The journal, oldest first, optionally for one S/E, from a date or
+        # after the event id last read (for incremental readers)
+        conditions, params = [], []
+        if equipment is not None:
+            conditions.append("equipment = ?")
+            params.append(str(equipment).strip())
+        if sous_ensemble is not None:
+            conditions.append("sous_ensemble = ?")
+            params.append(str(sous_ensemble).strip())
+        if since is not None:
+            conditions.append("at >= ?")
+            params.append(pd.Timestamp(since).isoformat(timespec="seconds"))
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(int(after_id))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return pd.read_sql_query(f"SELECT * FROM workflow_events {where} ORDER BY at, id", self.connection,
+                                 params=params)
@@ -0,0 +1,152 @@
+import math
+import os
+import time
+from contextlib import contextmanager
+
+from openpyxl import load_workbook
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Several app instances may save into the same (shared) workbook: a save
+# holds an OS lock on a file next to it while it loads, patches and writes
+# the workbook. The operating system releases the lock when its holder
+# exits, so a crashed instance leaves at most an unlocked file behind,
+# which the next save simply locks again.
+LOCK_SUFFIX = ".lock"
+LOCK_TIMEOUT_SECONDS = 30
+
+
+def _try_lock(fd):
+    # Non-blocking exclusive lock, held per open file (flock, and msvcrt on
+    # the first byte), so two threads of one instance exclude each other too
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _is_lock_file(fd, lock_path):
+    # The holder we waited for removes the file on release: a lock taken on
+    # the removed file does not exclude the instances opening a new one
+    try:
+        return os.path.samestat(os.fstat(fd), os.stat(lock_path))
+    except FileNotFoundError:
+        return False
+
+
+@contextmanager
+def workbook_lock(path, timeout=LOCK_TIMEOUT_SECONDS):
+    lock_path = path + LOCK_SUFFIX
+    deadline = time.monotonic() + timeout
+    while True:
+        fd = os.open(lock_path, os.O_CREAT | os.O_RDWR)
+        if _try_lock(fd) and _is_lock_file(fd, lock_path):
+            break
+        os.close(fd)
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"'{path}' is being saved by another instance ({lock_path})")
+        time.sleep(0.2)
+    try:
+        yield
+    finally:
+        # The file is removed while still locked, then closing it releases
+        # the lock. Windows removes no open file, ours included: there it is
+        # removed once closed, unless another instance has opened it since
+        if fcntl is None:
+            os.close(fd)
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+        if fcntl is not None:
+            os.close(fd)
+
+
+def save_workbook(wb, path):
+    # openpyxl saves formulas without their results: Excel is told to
+    # recalculate them on open, and the loader recalculates them (formulas.py)
+    wb.calculation.fullCalcOnLoad = True
+    wb.save(path)
+
+
+def write_cells(path, edits):
+    # Patch the given cells in place and save the workbook once. Everything
+    # else (metadata rows above the headers, formulas, tables, styling of the
+    # other sheets) is left as openpyxl read it. A cell holding a formula is
+    # not overwritten with a value: those edits are returned.
+    # edits: iterable of (sheet_name, row, column, value) with 1-based coordinates
+    kept = []
+    with workbook_lock(path):
+        wb = load_workbook(path)
+        try:
+            for edit in edits:
+                sheet_name, row, column, value = edit
+                cell = wb[sheet_name].cell(row=row, column=column)
+                if is_formula(cell.value):
+                    kept.append(edit)
+                else:
+                    cell.value = value
+            save_workbook(wb, path)
+        finally:
+            wb.close()
+    return kept
+
+
+def cell_number(value):
+    # A numeric cell as the loader shows it: empty and non-numeric cells are 0
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(value) else value
+
+
+def same_value(a, b):
+    return math.isclose(cell_number(a), cell_number(b), rel_tol=1e-9, abs_tol=1e-9)
+
+
+def is_formula(value):
+    return isinstance(value, str) and value.startswith("=")
+
+
+def merge_cell(base, value, current):
+    # Optimistic merge of one cell edit: it applies when the cell still holds
+    # the value the edit was based on (nobody else changed it) or already
+    # holds the new value. A formula is never replaced by a value: the edit
+    # is reported as a conflict and the formula kept.
+    if is_formula(current):
+        return False
+    return same_value(current, base) or same_value(current, value)
+
+
+def merge_cells(path, edits):
+    # Like write_cells, but each edit carries the value it was based on:
+    # (sheet_name, row, column, base, value). Edits of cells changed by
+    # another instance since are not written; they are returned as
+    # (index in edits, current value), along with the number written.
+    conflicts = []
+    with workbook_lock(path):
+        wb = load_workbook(path)
+        try:
+            written = 0
+            for i, (sheet_name, row, column, base, value) in enumerate(edits):
+                cell = wb[sheet_name].cell(row=row, column=column)
+                if merge_cell(base, value, cell.value):
+                    cell.value = value
+                    written += 1
+                else:
+                    conflicts.append((i, cell.value))
+            if written:
+                save_workbook(wb, path)
+        finally:
+            wb.close()
+    return written, conflicts